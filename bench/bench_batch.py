@@ -0,0 +1,32 @@
+'''Time the batch calculation runner (physmath.batch) on a table of unit
+   convertions, run serially and across process pools.
+'''
+
+import random
+
+from benchutil import measure
+
+from physmath.batch import run_batch
+
+convertions = [('mi', 'cm'), ('C', 'F'), ('L', 'gal'), ('kg', 'lb'), ('ft', 'm'), ('yd3', 'gal')]
+
+def make_rows(count, seed=0):
+    rand = random.Random(seed)
+    rows = []
+    for i in xrange(count):
+        unit, to_unit = rand.choice(convertions)
+        rows.append(dict(value='%.3gs %s' % (rand.uniform(1, 1000), unit), to_unit=to_unit))
+    return rows
+
+def main(count=5000):
+    rows = make_rows(count)
+    print '%-24s %12s' % ('mode', 'rows / s')
+    for label, kwds in [('serial', {}),
+                        ('serial, rendered', dict(render=True)),
+                        ('2 processes', dict(processes=2)),
+                        ('4 processes', dict(processes=4))]:
+        per_run = measure(lambda: list(run_batch('convert', rows, **kwds)), number=1, repeat=1)
+        print '%-24s %12.0f' % (label, count / per_run)
+
+if __name__ == '__main__':
+    main()
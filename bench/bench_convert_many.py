@@ -0,0 +1,24 @@
+'''Benchmark converting many quantities: convert() per PhysNum against
+   convert_many on the same list, and on a PhysNumArray
+'''
+
+from benchutil import measure
+
+from physmath.sigfig import SigFig
+from physmath.physnum import PhysNum, PhysNumArray
+from physmath.units import parse_unit
+from physmath.convert import convert, convert_many
+
+def main(count=10000):
+    mi, ft, cm = parse_unit('mi'), parse_unit('ft'), parse_unit('cm')
+    values = [SigFig('%d.%02d' % (i % 97 + 1, i % 100)) for i in xrange(count)]
+    nums = [PhysNum(value, mi if i % 2 else ft) for i, value in enumerate(values)]
+    array = PhysNumArray(values, mi)
+    print '%d SigFig quantities, per value:' % (count,)
+    for name, func in [('convert() each', lambda: [convert(num, cm) for num in nums]),
+                       ('convert_many list', lambda: convert_many(nums, cm)),
+                       ('convert_many PhysNumArray', lambda: convert_many(array, cm))]:
+        print '%-40s %12.2f us' % (name, measure(func, number=1) / count * 1e6)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,61 @@
+'''Benchmark the convertion path search on synthetic graphs of 1k-10k units.
+
+   Each graph is connected, with every new node linked to one to three
+   earlier nodes by arcs with the weights register() gives int, Decimal
+   and SigFig factors.  The recursive enumeration that the search
+   replaced is timed alongside it where it stays within the recursion
+   limit.
+'''
+
+import random
+
+from benchutil import measure
+
+from physmath.convert import ConvertionGraph, ConvertionNode, ConvertionArc, ConvertionPath
+
+def synthetic_graph(size, seed=0):
+    rand = random.Random(seed)
+    nodes = [ConvertionNode(None) for i in xrange(size)]
+    for i, node in enumerate(nodes[1:], 1):
+        for other in rand.sample(nodes[:i], min(i, rand.randint(1, 3))):
+            weight = rand.choice([100, 10, 10, 3, 4, 5])
+            node.convertion_arcs.append(ConvertionArc(other, 1, False, weight))
+            other.convertion_arcs.append(ConvertionArc(node, 1, True, weight))
+    return nodes
+
+def iter_paths_between(node, end_node, arc_path, seen_nodes):
+    if node in seen_nodes:
+        return
+    seen_nodes.add(node)
+    if node is end_node:
+        yield arc_path
+    for arc in node.convertion_arcs:
+        for arc_path_x in iter_paths_between(arc.node, end_node, arc_path + (arc,), seen_nodes):
+            yield arc_path_x
+
+def enumerated_best_arcs(start_node, end_node):
+    paths = [ConvertionPath(arcs) for arcs in iter_paths_between(start_node, end_node, (), set())]
+    paths.sort(key=lambda path: path.calculate_weight())
+    return paths[-1].arcs if paths else None
+
+def main(sizes=(1000, 2000, 5000, 10000), nqueries=20):
+    print '%8s %16s %16s' % ('nodes', 'best first', 'enumeration')
+    for size in sizes:
+        nodes = synthetic_graph(size)
+        rand = random.Random(size)
+        queries = [(rand.choice(nodes), rand.choice(nodes)) for i in xrange(nqueries)]
+        def search():
+            for a, b in queries:
+                ConvertionGraph.find_best_arcs(a, b)
+        def enumerate_():
+            for a, b in queries:
+                enumerated_best_arcs(a, b)
+        line = '%8d %13.2f ms' % (size, measure(search, repeat=3) / nqueries * 1e3)
+        try:
+            line += ' %13.2f ms' % (measure(enumerate_, number=1, repeat=1) / nqueries * 1e3)
+        except RuntimeError:
+            line += ' %16s' % 'recursion limit'
+        print line
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,40 @@
+'''Benchmark cold import time of physmath.convert (which imports units,
+   physnum, and layout) in fresh interpreters, with the registry snapshot
+   disabled, being rebuilt, and loaded.
+'''
+
+import sys
+import os
+import shutil
+import tempfile
+import subprocess
+
+def cold_import(env, module='physmath.convert', repeat=5):
+    '''Returns the best time to import module, as measured within a new
+       interpreter
+    '''
+    code = ('import time; t = time.time(); import %s; '
+            'print time.time() - t' % (module,))
+    return min(float(subprocess.check_output([sys.executable, '-c', code], env=env))
+               for i in xrange(repeat))
+
+def main():
+    env = dict(os.environ)
+    top = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir)
+    env['PYTHONPATH'] = os.pathsep.join(filter(None, [top, env.get('PYTHONPATH')]))
+    snapshot_dir = tempfile.mkdtemp(prefix='physmath-bench-')
+    try:
+        env['PHYSMATH_SNAPSHOT_DIR'] = ''
+        disabled = cold_import(env)
+        env['PHYSMATH_SNAPSHOT_DIR'] = snapshot_dir
+        build = cold_import(env, repeat=1)
+        loaded = cold_import(env)
+    finally:
+        shutil.rmtree(snapshot_dir)
+    for name, seconds in [('import, no snapshot', disabled),
+                          ('import, writing snapshot', build),
+                          ('import, loading snapshot', loaded)]:
+        print '%-40s %12.2f ms' % (name, seconds * 1e3)
+
+if __name__ == '__main__':
+    main()
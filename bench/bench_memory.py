@@ -0,0 +1,83 @@
+'''Report the bytes used per instance of the core value types.
+
+   Each sample value is copied many times (sharing its attribute values) so
+   that only the per instance storage is counted.  The allocations are
+   traced with tracemalloc where it is available (Python 3, or a 2.7 built
+   with the pytracemalloc patches); otherwise the size is computed with
+   sys.getsizeof from the instance and its __dict__, if it has one.
+'''
+
+import sys
+import gc
+
+import benchutil
+
+try:
+    import tracemalloc
+except ImportError:
+    tracemalloc = None
+
+from physmath.sigfig import SigFig
+from physmath.ratio import Ratio
+from physmath.physnum import parse_physical_number
+from physmath.units import PrimitiveUnit, CompoundUnit, Prefix, parse_unit
+from physmath.convert import convertion_graph
+from physmath.slotted import slot_names
+
+def samples():
+    node = convertion_graph.unit_nodes.values()[0]
+    return [SigFig('1.25'),
+            Ratio(3, 4),
+            parse_physical_number('1.25s m'),
+            PrimitiveUnit.names['m'],
+            parse_unit('kg*m/s^2'),
+            Prefix.names['k'],
+            node,
+            node.convertion_arcs[0]]
+
+def clone(obj):
+    '''A copy of obj with the same attributes that bypasses __init__ (and
+       so any registration of names)
+    '''
+    cls = type(obj)
+    new = object.__new__(cls)
+    for name in slot_names(cls):
+        if hasattr(obj, name):
+            setattr(new, name, getattr(obj, name))
+    if instance_dict(obj):
+        new.__dict__.update(obj.__dict__)
+    return new
+
+def instance_dict(obj):
+    '''The __dict__ of obj, or None when its attributes are all in slots
+       (a slotted subclass of a class without __slots__ still has a
+       __dict__ attribute, but an empty one is only allocated on access)
+    '''
+    return getattr(obj, '__dict__', None) or None
+
+def traced_size(obj, count):
+    gc.collect()
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        copies = [clone(obj) for i in xrange(count)]
+        after = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+    return (after - before - sys.getsizeof(copies)) / float(count)
+
+def getsizeof_size(obj, count):
+    size = sys.getsizeof(obj)
+    if instance_dict(obj) is not None:
+        size += sys.getsizeof(obj.__dict__)
+    return float(size)
+
+def main(count=10000):
+    measure = getsizeof_size if tracemalloc is None else traced_size
+    print 'bytes per object (%s)' % ('sys.getsizeof' if tracemalloc is None else 'tracemalloc',)
+    for obj in samples():
+        print '%-20s %10.1f %s' % (type(obj).__name__, measure(obj, count),
+                                   '' if instance_dict(obj) is None else '__dict__')
+
+if __name__ == '__main__':
+    main()
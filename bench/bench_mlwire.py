@@ -0,0 +1,45 @@
+'''Compare the size and encode time of the binary wire format of layouts
+   (physmath.mlwire) with plain json, on the equation sets annotated by
+   convert().
+'''
+
+import json
+import zlib
+
+from benchutil import measure
+
+from physmath import layout, mlwire
+from physmath.annotator import annotator
+from physmath.convert import convert
+from physmath.physnum import parse_physical_number
+from physmath.units import parse_unit
+
+convertions = [('2.50s mi', 'cm'), ('1.03e5s yd3', 'gal'), ('34.5s C', 'F'),
+               ('3.2s L', 'gal'), ('12.0s kg', 'lb'), ('55s ft', 'm'),
+               ('250s mL', 'floz')]
+
+def equation_set(copies):
+    with annotator.annotation() as eqs:
+        for i in xrange(copies):
+            for num, unit in convertions:
+                convert(parse_physical_number(num), parse_unit(unit))
+    return layout.equation_set(u'Convertions', eqs)
+
+def main(sizes=(1, 10, 100)):
+    print '%8s %10s %10s %10s %10s %12s %12s %12s' % (
+        'eqs', 'json B', 'wire B', 'json.z B', 'wire.z B', 'json us', 'wire us', 'decode us')
+    for copies in sizes:
+        es = equation_set(copies)
+        text = json.dumps(layout.get_ml_json(es))
+        data = mlwire.encode_ml(es)
+        assert mlwire.decode_ml(data) == json.loads(text)
+        json_time = measure(lambda: json.dumps(layout.get_ml_json(es)))
+        wire_time = measure(lambda: mlwire.encode_ml(es))
+        decode_time = measure(lambda: mlwire.decode_ml(data))
+        print '%8d %10d %10d %10d %10d %12.1f %12.1f %12.1f' % (
+            len(es.mls), len(text), len(data),
+            len(zlib.compress(text)), len(zlib.compress(data)),
+            json_time * 1e6, wire_time * 1e6, decode_time * 1e6)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,41 @@
+'''Scaling of physmath.parallel.map_convert with the number of worker
+   processes, against convert_many in this process, and the size of a
+   chunk as sent to the workers, packed and as pickled objects.  Run on a
+   multi-core machine; speedups are bounded by the number of cpus.
+'''
+
+import random
+import cPickle as pickle
+from multiprocessing import cpu_count
+
+from benchutil import measure
+
+from physmath.convert import convert_many
+from physmath.parallel import map_convert, pack_physnums
+from physmath.physnum import parse_physical_number
+from physmath.units import parse_unit
+
+units = ['mi', 'ft', 'in', 'yd', 'km', 'mm']
+
+def make_values(count, seed=0):
+    rand = random.Random(seed)
+    return [parse_physical_number('%.3gs %s' % (rand.uniform(1, 1000), rand.choice(units)))
+            for i in xrange(count)]
+
+def main(count=100000, chunksize=2000):
+    values = make_values(count)
+    to_unit = parse_unit('cm')
+    chunk = values[:chunksize]
+    print 'chunk of %d values: %d bytes packed, %d bytes pickled' % (
+        chunksize, len(pickle.dumps(pack_physnums(chunk), 2)), len(pickle.dumps(chunk, 2)))
+    serial = measure(lambda: convert_many(values, to_unit), number=1, repeat=1)
+    print '%-16s %10.2f s' % ('convert_many', serial)
+    processes = 1
+    while processes <= cpu_count():
+        per_run = measure(lambda: map_convert(values, to_unit, processes, chunksize),
+                          number=1, repeat=1)
+        print '%-16s %10.2f s %8.2fx' % ('%d processes' % processes, per_run, serial / per_run)
+        processes *= 2
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,32 @@
+'''Report the pickled size and the time to unpickle the core value types
+   (pickle protocol 2).
+'''
+
+import cPickle as pickle
+
+from benchutil import measure
+
+from physmath.sigfig import SigFig
+from physmath.ratio import Ratio
+from physmath.dne import dne
+from physmath.physnum import parse_physical_number
+from physmath.units import parse_unit
+
+def samples():
+    return [('SigFig', SigFig('1.250e3')),
+            ('Ratio', Ratio(3, 4)),
+            ('dne', dne),
+            ('unit km/s^2', parse_unit('km/s^2')),
+            ('cannonical unit', parse_unit('kg*m/s^2').cannonicalized()),
+            ('PhysNum 1.0s m', parse_physical_number('1.0s m')),
+            ('PhysNum kg*m/s^2', parse_physical_number('2.50s kg*m/s^2')),
+            ('100 PhysNums', [parse_physical_number('%ds mmol/L' % i) for i in xrange(100)])]
+
+def main():
+    print '%-20s %10s %12s' % ('value', 'bytes', 'loads')
+    for name, obj in samples():
+        data = pickle.dumps(obj, 2)
+        print '%-20s %10d %9.2f us' % (name, len(data), measure(lambda: pickle.loads(data)) * 1e6)
+
+if __name__ == '__main__':
+    main()
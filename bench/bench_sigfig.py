@@ -0,0 +1,77 @@
+'''Microbenchmark SigFig parsing, formatting, arithmetic, comparison, and
+   rounding on the kinds of values in test_sigfig.py.
+
+   Pass the path of another sigfig.py to compare against it, e.g. the
+   Decimal based implementation from before the integer coefficient
+   representation:
+
+     git show <rev>:physmath/sigfig.py > /tmp/old_sigfig.py
+     python bench/bench_sigfig.py /tmp/old_sigfig.py
+'''
+
+import sys
+import imp
+import timeit
+import random
+from decimal import Decimal
+
+import benchutil
+
+literals = '''1 10 10. 23 230 7400 6000 532 200 850 45. 45.0 45.00 45.005 45.05
+              45.050 2030 20301 20300 20300. 20300.0 1e0 1.0e0 1.25 -9.96 0.0451
+              999.5 73.30 -2.7 6.022e23 1.0546e-34'''.split()
+
+def workloads(SigFig):
+    random.seed(0)
+    values = map(SigFig, literals)
+    pairs = [(random.choice(values), random.choice(values)) for i in xrange(200)]
+    def parse():
+        for literal in literals:
+            SigFig(literal)
+    def format():
+        for value in values:
+            str(value)
+    def mul():
+        for a, b in pairs:
+            a * b
+    def div():
+        for a, b in pairs:
+            if b:
+                a / b
+    def add():
+        for a, b in pairs:
+            a + b
+    def mixed():
+        for a, b in pairs:
+            a * 3 + Decimal('1.5')
+    def compare():
+        for a, b in pairs:
+            a < b
+    def rounding():
+        for value in values:
+            value.round_to_sigfigs(2)
+            value.round_to_place(0)
+    return [(name, func, len(literals) if name in ('parse', 'rounding', 'format') else len(pairs))
+            for name, func in [('parse', parse), ('format', format), ('mul', mul), ('div', div),
+                               ('add', add), ('mixed', mixed), ('compare', compare),
+                               ('rounding', rounding)]]
+
+def time_per_op(func, n, repeat=5, number=20):
+    return min(timeit.repeat(func, repeat=repeat, number=number)) / (number * n)
+
+def main():
+    from physmath.sigfig import SigFig
+    classes = [('current', SigFig)]
+    if len(sys.argv) > 1:
+        classes.append(('reference', imp.load_source('reference_sigfig', sys.argv[1]).SigFig))
+    results = [dict((name, time_per_op(func, n)) for name, func, n in workloads(cls))
+               for label, cls in classes]
+    print '%-12s' % '' + ''.join('%14s' % label for label, cls in classes)
+    for name, func, n in workloads(SigFig):
+        line = '%-12s' % name + ''.join('%11.2f us' % (times[name] * 1e6) for times in results)
+        if len(results) > 1:
+            line += '%10.1fx' % (results[1][name] / results[0][name])
+        print line
+
+if __name__ == '__main__':
+    main()
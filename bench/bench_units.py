@@ -0,0 +1,31 @@
+'''Benchmark unit equality and hashing on the hot paths that depend on them:
+   PhysNum arithmetic (add_unit_check) and convert()
+'''
+
+from benchutil import report
+
+from physmath.units import parse_unit
+from physmath.physnum import parse_physical_number as ppn
+from physmath.convert import convert
+
+def main():
+    a = ppn('3.0s kg*m/s^2')
+    b = ppn('4.00s N')
+    c = ppn('2.5s m')
+    km = parse_unit('km')
+    gal = parse_unit('gal')
+    volume = ppn('1.03e5s yd3')
+    table = dict.fromkeys([parse_unit(u) for u in 'm s kg N J Pa L mol'.split()])
+    lookup = a.unit * 1
+
+    report('unit ==', lambda: a.unit == b.unit)
+    report('hash(unit)', lambda: hash(a.unit))
+    report('dict lookup by unit', lambda: lookup in table)
+    report('PhysNum add', lambda: a + b)
+    report('PhysNum sub', lambda: b - a)
+    report('PhysNum mul', lambda: a * c)
+    report('convert m -> km', lambda: convert(c, km))
+    report('convert yd3 -> gal', lambda: convert(volume, gal))
+
+if __name__ == '__main__':
+    main()
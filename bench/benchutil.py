@@ -0,0 +1,27 @@
+'''Shared helpers for the benchmark scripts in this directory.
+
+   Each benchmark is a plain script; run it from the top of the source tree
+   (e.g. python bench/bench_units.py).  To measure a speedup, run the same
+   script against a checkout of the revision being compared with.
+'''
+
+import sys
+import os
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+
+def measure(func, number=None, repeat=3):
+    '''Returns the best time per call of func in seconds
+    '''
+    timer = timeit.Timer(func)
+    if number is None:
+        number = 1
+        while timer.timeit(number) < 0.2:
+            number *= 10
+    return min(timer.repeat(repeat, number)) / number
+
+def report(name, func, number=None, repeat=3):
+    per_call = measure(func, number, repeat)
+    print '%-40s %12.2f us' % (name, per_call * 1e6)
+    return per_call
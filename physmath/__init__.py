@@ -1,2 +1,71 @@
+'''Physical Math - Utilities for calculation with measurements
 
+   The public API is available directly from this package. Each name is
+   loaded from its submodule on first use, so that e.g. physmath.SigFig
+   does not pull in the unit registry, layout, or the convertion graph.
+'''
 
+from __future__ import absolute_import
+
+import sys
+from types import ModuleType
+
+public_attributes = {
+    'sigfig': ['SigFig'],
+    'sigfigarray': ['SigFigArray'],
+    'ratio': ['Ratio', 'as_ratio'],
+    'dne': ['DNEType', 'dne'],
+    'units': ['as_unit', 'parse_unit', 'ex_parse_unit', 'parse_units',
+              'get_unit_by_name', 'dimensionless', 'UnitSyntaxError', 'unit_key',
+              'unit_from_key'],
+    'physnum': ['PhysNum', 'PhysNumArray', 'as_physnum', 'parse_physical_number',
+                'parse_physical_numbers'],
+    'layout': ['get_ml_json', 'dump_ml_json'],
+    'convert': ['Converter', 'NoSuchConvertionError', 'convert_many'],
+    'parallel': ['map_convert'],
+    'annotator': ['annotator'],
+    'cache': ['cache_stats', 'clear_caches'],
+    }
+
+submodules = '''algebra annotator batch cache calculate convert dne layout mlwire parallel
+                physnum ratio reload sigfig sigfigarray slotted snapshot types units'''.split()
+
+attribute_modules = dict((name, module_name)
+                         for module_name, names in public_attributes.iteritems()
+                         for name in names)
+
+__all__ = sorted(attribute_modules)
+
+
+class LazyModule(ModuleType):
+    '''Package module that imports submodules for their attributes on
+       first access
+    '''
+
+    def __getattr__(self, name):
+        if name in submodules:
+            __import__('%s.%s' % (self.__name__, name))
+            return sys.modules['%s.%s' % (self.__name__, name)]
+        try:
+            module_name = attribute_modules[name]
+        except KeyError:
+            raise AttributeError('module %r has no attribute %r' % (self.__name__, name))
+        module = getattr(self, module_name)
+        value = getattr(module, name)
+        setattr(self, name, value)
+        return value
+
+    def __dir__(self):
+        return sorted(set(self.__dict__) | set(submodules) | set(attribute_modules))
+
+
+def install_lazy_module():
+    module = sys.modules[__name__]
+    lazy = LazyModule(__name__, __doc__)
+    lazy.__dict__.update(module.__dict__)
+    # keep the original module alive, as Python 2 clears the globals of
+    # collected modules
+    lazy.original_module = module
+    sys.modules[__name__] = lazy
+
+install_lazy_module()
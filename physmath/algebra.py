@@ -4,21 +4,163 @@
 from __future__ import absolute_import
 
 from functools import partial
+from types import InstanceType
 
 try:
     from numpy import number as numpy_number_type
 except ImportError:
     numpy_number_type = None
 
-from jamenson.runtime.multimethod import MultiMethod, defmethod, defboth_wrapper
+from jamenson.runtime import multimethod
+from jamenson.runtime.multimethod import MultiMethod
 from jamenson.runtime.atypes import anytype, as_optimized_type
 from jamenson.runtime.func import identity
 
 __all__ = '''
    unop_names binop_names AlgebraBase scalar_number_type
+   defmethod defboth_wrapper class_type
 '''.split()
 
-scalar_number_type = as_optimized_type(tuple(filter(None, (int,long,float,numpy_number_type))))
+
+# # # # # # # # # #
+# dispatch cache  #
+# # # # # # # # # #
+
+# The AlgebraBase operator wrappers cache the method resolved for each
+# tuple of argument types. This requires knowing all of the signatures
+# registered with the algebra multimethods, and therefore methods must be
+# defined using the defmethod and defboth_wrapper of this module.
+# These also count the methods they add to each multimethod, so that a
+# method registered directly with jamenson is noticed (the multimethod
+# then has more methods than were recorded) and the wrappers fall back
+# to calling the multimethod.
+# Signatures are only understood in terms of classes (anytype, classes,
+# tuples of classes, and types created with class_type); for any other
+# signature, and whenever the most specific method is ambiguous, the
+# wrappers call the multimethod as usual.
+
+class_types = {}
+
+def class_type(classes):
+    '''as_optimized_type for a tuple of classes, recording the classes
+       for the dispatch cache
+    '''
+    tp = as_optimized_type(classes)
+    class_types[id(tp)] = tp, classes
+    return tp
+
+def signature_classes(tp):
+    if tp is anytype:
+        return (object,)
+    if isinstance(tp, type):
+        return (tp,)
+    if isinstance(tp, tuple) and all(isinstance(t, type) for t in tp):
+        return tp
+    try:
+        return class_types[id(tp)][1]
+    except KeyError:
+        return None
+
+registered_methods = {}
+recorded_counts = {}
+multimethod_bases = {}
+dispatch_caches = []
+
+def record_method(mm, signature, func):
+    classes = map(signature_classes, signature)
+    registered_methods.setdefault(mm, []).append(
+        (None if None in classes else classes, func))
+    for cache in dispatch_caches:
+        cache.clear()
+
+def count_methods(mm, define, func):
+    before = len(mm.methods)
+    define(func)
+    recorded_counts[mm] = recorded_counts.get(mm, 0) + len(mm.methods) - before
+
+def has_unrecorded_methods(mm):
+    return any(len(level_mm.methods) != recorded_counts.get(level_mm, 0)
+               for level_mm in [mm] + multimethod_bases.get(mm, []))
+
+def method_count_function(mm):
+    '''Returns a function of no arguments giving the total number of
+       methods of mm and its bases, for the wrappers to notice methods
+       registered directly with jamenson
+    '''
+    lists = [level_mm.methods for level_mm in [mm] + multimethod_bases.get(mm, [])]
+    if len(lists) == 2:
+        a,b = lists
+        return lambda: len(a) + len(b)
+    return lambda: sum(map(len, lists))
+
+def defmethod(mm, signature):
+    '''jamenson defmethod that also records the method for the dispatch cache
+    '''
+    define = multimethod.defmethod(mm, signature)
+    def wrapper(func):
+        count_methods(mm, define, func)
+        record_method(mm, signature, func)
+        return func
+    return wrapper
+
+def defboth_wrapper(mm, signature):
+    '''jamenson defboth_wrapper that also records the methods for the dispatch cache
+    '''
+    define = multimethod.defboth_wrapper(mm, signature)
+    def wrapper(func):
+        count_methods(mm, define, func)
+        a,b = signature
+        record_method(mm, [a, b], func)
+        if a != b:
+            record_method(mm, [b, a], lambda b_op, a_op: func(a_op, b_op))
+        return func
+    return wrapper
+
+def classes_le(a, b):
+    return all(any(issubclass(x, y) for y in b) for x in a)
+
+def applicable(signature, types):
+    return all(any(issubclass(t, c) for c in classes)
+               for classes,t in zip(signature, types))
+
+def signature_le(a, b):
+    return all(classes_le(x, y) for x,y in zip(a, b))
+
+def resolve_method(mm, types):
+    '''Returns the method of mm that applies to arguments of types, or mm
+       itself if that can't be determined unambiguously
+    '''
+    if InstanceType in types or has_unrecorded_methods(mm):
+        return mm
+    levels = []
+    for level_mm in [mm] + multimethod_bases.get(mm, []):
+        candidates = []
+        for signature, func in registered_methods.get(level_mm, ()):
+            if signature is None:
+                return mm
+            if len(signature) != len(types):
+                continue
+            if applicable(signature, types):
+                candidates.append((signature, func))
+        levels.append(candidates)
+    candidates = [candidate for level in levels for candidate in level]
+    best = [(signature, func) for signature, func in candidates
+            if all(signature_le(signature, other) for other,_ in candidates)]
+    if len(best) != 1:
+        return mm
+    signature, func = best[0]
+    # don't presume how a method inherited from a base multimethod ranks
+    # against less specific methods of mm itself
+    if levels[0] and (signature, func) not in levels[0]:
+        return mm
+    return func
+
+def dispatch_cache():
+    cache = {}
+    dispatch_caches.append(cache)
+    return cache
+
+scalar_number_type = class_type(tuple(filter(None, (int,long,float,numpy_number_type))))
 
 unop_names = '''
 neg pos float abs
@@ -48,6 +190,7 @@ def construct_multimethods():
                                     doc='''multimethod for unary operation %s
                                     ''' % (name,),
                                     inherit_from=[mm_unop_base])
+        multimethod_bases[gbls[mm_name]] = [mm_unop_base]
 
     global mm_binop_base
     mm_binop_base = MultiMethod(name='mm_binop_base')
@@ -58,6 +201,7 @@ def construct_multimethods():
                                     doc='''multimethod for binary operation %s
                                     ''' % (name,),
                                     inherit_from=[mm_binop_base])
+        multimethod_bases[gbls[mm_name]] = [mm_binop_base]
         gbls['defboth_mm_' + name] = partial(defboth_wrapper, gbls[mm_name])
 
 construct_multimethods()
@@ -69,6 +213,8 @@ class AlgebraBase(object):
        into multimethod calls (e.g. mm_add)
     '''
 
+    __slots__ = ()
+
     def construct_methods(locs=locals()):
 
         gbls = globals()
@@ -80,22 +226,48 @@ class AlgebraBase(object):
 
         def make_unop_wrapper(name):
             mm = gbls['mm_%s' % name]
-            make_wrapper(name, lambda op: mm(op))
-
-        def make_binop_wrapper(name):
+            methods = dispatch_cache()
+            method_count = method_count_function(mm)
+            seen_count = [method_count()]
+            def wrapper(op):
+                count = method_count()
+                if count != seen_count[0]:
+                    methods.clear()
+                    seen_count[0] = count
+                try:
+                    method = methods[type(op)]
+                except KeyError:
+                    method = methods[type(op)] = resolve_method(mm, (type(op),))
+                return method(op)
+            make_wrapper(name, wrapper)
+
+        def make_binop_wrapper(name, reverse=False):
             mm = gbls['mm_%s' % name]
-            make_wrapper(name, lambda lop, rop: mm(lop, rop))
-
-        def make_binrop_wrapper(name):
-            mm = gbls['mm_%s' % name]
-            make_wrapper('r'+name, lambda rop, lop: mm(lop, rop))
+            methods = dispatch_cache()
+            method_count = method_count_function(mm)
+            seen_count = [method_count()]
+            def wrapper(lop, rop):
+                count = method_count()
+                if count != seen_count[0]:
+                    methods.clear()
+                    seen_count[0] = count
+                key = type(lop), type(rop)
+                try:
+                    method = methods[key]
+                except KeyError:
+                    method = methods[key] = resolve_method(mm, key)
+                return method(lop, rop)
+            if reverse:
+                make_wrapper('r'+name, lambda rop, lop: wrapper(lop, rop))
+            else:
+                make_wrapper(name, wrapper)
 
         for name in unop_names:
             make_unop_wrapper(name)
 
         for name in binop_names:
             make_binop_wrapper(name)
-            make_binrop_wrapper(name)
+            make_binop_wrapper(name, reverse=True)
 
     construct_methods()
     del construct_methods
@@ -133,6 +305,8 @@ class DivAlgebraBase(AlgebraBase):
        (i.e. truediv is semantically equivalent to div)
     '''
 
+    __slots__ = ()
+
 @defboth_wrapper(mm_truediv, [DivAlgebraBase, anytype])
 def meth(a, b):
     return mm_div(a, b)
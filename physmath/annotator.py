@@ -1,34 +1,113 @@
 '''Handle the annotation of auxillary informations for equations
+
+   The annotation states are local to the current context (each thread, and
+   each asyncio task under Python 3.7+), so that concurrent calculations
+   each collect their own equations.
 '''
 
+from __future__ import absolute_import
+
 from itertools import count
+from contextlib import contextmanager
+import threading
+
+try:
+    from contextvars import ContextVar
+except ImportError:
+    ContextVar = None
+
+
+class ThreadLocalVar(threading.local):
+    '''Fallback for ContextVar when contextvars is unavailable; the value
+       is local to each thread
+    '''
+
+    def __init__(self, name, default):
+        self.name = name
+        self.value = default
+
+    def get(self):
+        return self.value
+
+    def set(self, value):
+        self.value = value
+
+
+class ContextStack(object):
+    '''Stack whose contents are local to the current context.  The stack
+       is held as a tuple so that a context copied into a new task (which
+       then pushes and pops on its own) never changes the stack of its
+       parent.
+    '''
+
+    def __init__(self, name, bottom=()):
+        var_class = ThreadLocalVar if ContextVar is None else ContextVar
+        self.var = var_class(name, default=tuple(bottom))
+
+    def push(self, item):
+        self.var.set(self.var.get() + (item,))
+
+    def pop(self):
+        stack = self.var.get()
+        if not stack:
+            raise IndexError('pop from empty stack')
+        self.var.set(stack[:-1])
+        return stack[-1]
+
+    def __len__(self):
+        return len(self.var.get())
+
+    def __nonzero__(self):
+        return bool(self.var.get())
+    __bool__ = __nonzero__
+
+    def __getitem__(self, index):
+        return self.var.get()[index]
+
+    def __iter__(self):
+        return iter(self.var.get())
+
 
 class Annotator(object):
 
-    def __init__(self):
-        self.annotating = False
-        self.states = [[None, None]]
+    def __init__(self, name='physmath.annotator'):
+        self.states = ContextStack(name, [(None, None)])
         self.count_labels = count()
 
+    @property
+    def annotating(self):
+        return self.states[-1][1] is not None
+
     def annotate(self, eq):
-        if self.annotating:
-            self.states[-1][1].append(eq)
+        acc = self.states[-1][1]
+        if acc is not None:
+            acc.append(eq)
 
     def push(self, label=None, annotate=True):
         if label is None:
             label = self.next_label()
-        self.states.append([label, [] if annotate else None])
-        self.annotating = annotate
+        self.states.push((label, [] if annotate else None))
         return label
 
     def pop(self, label=None):
         assert len(self.states) >= 2
         _label, acc = self.states.pop()
         assert label is None or label == _label
-        self.annotating = self.states[-1][1] is not None
         return acc
 
+    @contextmanager
+    def annotation(self, label=None, annotate=True):
+        '''Context manager pairing push and pop; yields the list that
+           collects the equations annotated within the block (None when
+           annotate is False)
+        '''
+        label = self.push(label, annotate)
+        try:
+            yield self.states[-1][1]
+        finally:
+            self.pop(label)
+
     def next_label(self):
-        return '_auto_label_%d_for_%X' % (self.count_labels.next(), id(self))
+        return '_auto_label_%d_for_%X' % (next(self.count_labels), id(self))
 
 annotator = Annotator()
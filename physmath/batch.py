@@ -0,0 +1,175 @@
+'''Run a calculation over a table of inputs, such as a csv file of student
+   submissions, giving a table of results.
+
+   A calculation is called as func(calculator, **inputs), following the
+   routines of physmath.calculate: it adds its equation sets to the
+   calculator and returns its answer.  Inputs given as strings are parsed
+   by name; `name` is kept as text, names ending in `unit` are parsed as
+   units and everything else as a physical number.
+
+   Rows can be split into chunks that are run across a process pool.  Only
+   the name of the calculation is sent to the workers, so calculations
+   registered at runtime need a platform that forks.
+'''
+
+from __future__ import absolute_import
+
+import csv
+from itertools import islice, imap
+from StringIO import StringIO
+
+from . import layout
+from .annotator import annotator
+from .convert import convert
+from .physnum import PhysNum, parse_physical_number
+from .units import parse_unit
+
+calculations = {}
+
+def register_calculation(name, func):
+    calculations[name] = func
+    return func
+
+def get_calculation(name):
+    '''A registered calculation, else the routine of that name in
+       physmath.calculate
+    '''
+    try:
+        return calculations[name]
+    except KeyError:
+        pass
+    from . import calculate
+    try:
+        return getattr(calculate, name)
+    except AttributeError:
+        raise ValueError('no calculation named %r' % (name,))
+
+
+class RowCalculator(object):
+    '''Collects the equation sets of one row, with the interface of
+       calculate.Calculator; they are discarded unless rendering
+    '''
+
+    def __init__(self, render):
+        self.render = render
+        self.calculations = []
+        self.error = False
+
+    def add_calculation(self, calc):
+        if self.render and calc is not None:
+            self.calculations.append(layout.as_ml(calc))
+
+    def flag_error(self):
+        self.error = True
+
+    def get_layout_json(self):
+        fp = StringIO()
+        layout.dump_ml_json(layout.calculations(mls=self.calculations), fp)
+        return fp.getvalue()
+
+
+def parse_input(name, value):
+    if not isinstance(value, basestring):
+        return value
+    if name == 'name':
+        # csv files are read and written as utf-8
+        return value if isinstance(value, unicode) else value.decode('utf-8')
+    if name.endswith('unit'):
+        return parse_unit(value)
+    return parse_physical_number(value)
+
+def run_row(func, row, render=False, layout_column=None):
+    '''The output row for one input row: the inputs with `result` and
+       `error` and, if layout_column (by default, when rendering), the
+       json of the equation sets as `layout`
+    '''
+    out = dict(row)
+    calculator = RowCalculator(render)
+    try:
+        inputs = dict((str(name), parse_input(name, value))
+                      for name, value in row.iteritems())
+        with annotator.annotation(annotate=render):
+            result = func(calculator, **inputs)
+    except Exception, e:
+        out['result'] = u''
+        out['error'] = u'%s: %s' % (e.__class__.__name__, e)
+    else:
+        out['result'] = u'' if result is None else unicode(result).strip()
+        out['error'] = u'error' if calculator.error else u''
+    if layout_column is None:
+        layout_column = render
+    if layout_column:
+        out['layout'] = calculator.get_layout_json() if render else ''
+    return out
+
+def run_chunk(args):
+    name, rows, render = args
+    func = get_calculation(name)
+    return [run_row(func, row, render(row) if callable(render) else render, bool(render))
+            for row in rows]
+
+def iter_chunks(rows, chunksize):
+    rows = iter(rows)
+    while True:
+        chunk = list(islice(rows, chunksize))
+        if not chunk:
+            break
+        yield chunk
+
+def run_batch(name, rows, render=False, processes=None, chunksize=500):
+    '''Iterates over the output rows of the calculation named name for the
+       input rows (dicts), in order.  render is a bool or a function of the
+       row deciding whether its equation sets are rendered (a module level
+       function when using processes, so that it can be pickled).  With
+       processes the chunks of rows are run on a multiprocessing pool of
+       that many workers (0 for one per cpu).
+    '''
+    chunks = ((name, chunk, render) for chunk in iter_chunks(rows, chunksize))
+    if processes is None:
+        results = imap(run_chunk, chunks)
+        pool = None
+    else:
+        from multiprocessing import Pool
+        pool = Pool(processes or None)
+        results = pool.imap(run_chunk, chunks)
+    try:
+        for chunk in results:
+            for row in chunk:
+                yield row
+        if pool is not None:
+            pool.close()
+    finally:
+        if pool is not None:
+            pool.terminate()
+            pool.join()
+
+def run_csv(name, infile, outfile, **kwds):
+    '''Run the calculation over the rows of the csv file infile, writing the
+       results to the csv file outfile; the keywords are as for run_batch
+    '''
+    reader = csv.DictReader(infile)
+    fieldnames = list(reader.fieldnames) + ['result', 'error']
+    if kwds.get('render'):
+        fieldnames.append('layout')
+    writer = csv.DictWriter(outfile, fieldnames)
+    writer.writeheader()
+    for row in run_batch(name, reader, **kwds):
+        writer.writerow(dict((k, v.encode('utf-8') if isinstance(v, unicode) else v)
+                             for k, v in row.iteritems()))
+
+
+# calculations
+
+def convert_calculation(calculator, value, to_unit, name=None):
+    '''Convert value to to_unit'''
+    if name is not None:
+        # parsed numbers are cached, so name a copy
+        value = PhysNum(value.quantity, value.unit, name)
+    with annotator.annotation(annotate=annotator.annotating) as eqs:
+        result = convert(value, to_unit)
+    if eqs:
+        calculator.add_calculation(layout.equation_set(
+            u'Convert %s to %s.' % (value, to_unit), eqs))
+    return result
+
+register_calculation('convert', convert_calculation)
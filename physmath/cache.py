@@ -0,0 +1,139 @@
+'''Bounded least-recently-used caches for memorizing pure functions.
+
+   Unlike hlab.memorize, these caches evict their least recently used
+   entries once full, so that long running processes parsing arbitrary
+   input do not grow without limit. Every cache is registered by name
+   so that it can be inspected, cleared, or resized at runtime.
+'''
+
+from __future__ import absolute_import
+
+from threading import RLock
+
+from hlab.bases import AutoRepr
+
+caches = {}
+
+PREV, NEXT, KEY, VALUE = range(4)
+
+class LRUCache(AutoRepr):
+
+    def __init__(self, name, maxsize=1024):
+        assert maxsize >= 0
+        self.name = name
+        self.maxsize = maxsize
+        self.lock = RLock()
+        self.clear()
+        caches[name] = self
+
+    def repr_args(self):
+        yield self.name
+        yield self.maxsize
+
+    def clear(self):
+        with self.lock:
+            self.links = {}
+            self.root = root = []
+            root[:] = [root, root, None, None]
+            self.hits = self.misses = self.evictions = 0
+
+    def resize(self, maxsize):
+        assert maxsize >= 0
+        with self.lock:
+            self.maxsize = maxsize
+            while len(self.links) > maxsize:
+                self.evict()
+
+    def stats(self):
+        return dict(name=self.name, maxsize=self.maxsize, size=len(self.links),
+                    hits=self.hits, misses=self.misses, evictions=self.evictions)
+
+    def __len__(self):
+        return len(self.links)
+
+    def __contains__(self, key):
+        return key in self.links
+
+    def get(self, key, default=None):
+        with self.lock:
+            try:
+                link = self.links[key]
+            except KeyError:
+                self.misses += 1
+                return default
+            self.hits += 1
+            self.unlink(link)
+            self.append(link)
+            return link[VALUE]
+
+    def put(self, key, value):
+        with self.lock:
+            try:
+                link = self.links[key]
+            except KeyError:
+                if not self.maxsize:
+                    return
+                if len(self.links) >= self.maxsize:
+                    self.evict()
+                link = self.links[key] = [None, None, key, value]
+            else:
+                link[VALUE] = value
+                self.unlink(link)
+            self.append(link)
+
+    def append(self, link):
+        root = self.root
+        last = root[PREV]
+        link[PREV] = last
+        link[NEXT] = root
+        last[NEXT] = root[PREV] = link
+
+    def unlink(self, link):
+        link[PREV][NEXT] = link[NEXT]
+        link[NEXT][PREV] = link[PREV]
+
+    def evict(self):
+        oldest = self.root[NEXT]
+        self.unlink(oldest)
+        del self.links[oldest[KEY]]
+        self.evictions += 1
+
+
+def lru_cache(name, maxsize=1024):
+    '''Decorator to memorize a function in a new LRUCache registered as name
+    '''
+    return memorize_in(LRUCache(name, maxsize))
+
+def memorize_in(cache):
+    '''Decorator to memorize a function in an existing cache
+       (accessible as the .cache attribute of the wrapper)
+    '''
+    missing = object()
+    def wrapper(func):
+        def wrap(*args, **kwds):
+            key = (args, tuple(sorted(kwds.iteritems()))) if kwds else args
+            try:
+                value = cache.get(key, missing)
+            except TypeError:
+                # unhashable arguments
+                return func(*args, **kwds)
+            if value is missing:
+                value = func(*args, **kwds)
+                cache.put(key, value)
+            return value
+        wrap.func_name = func.func_name
+        wrap.__doc__ = func.__doc__
+        wrap.cache = cache
+        return wrap
+    return wrapper
+
+def get_cache(name):
+    return caches[name]
+
+def clear_caches():
+    for cache in caches.itervalues():
+        cache.clear()
+
+def cache_stats():
+    return sorted((cache.stats() for cache in caches.itervalues()),
+                  key=lambda stats: stats['name'])
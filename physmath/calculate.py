@@ -1,16 +1,20 @@
 '''Collections of various calculations used in chemistry/physics
 '''
 
-from hlab.sigfigs import SigFig
-from hlab import xunits as U
+from __future__ import absolute_import
+
+from decimal import Decimal
+from types import GeneratorType
 
-from jamenson.runtime.atypes import anytype, Seq, as_optimized_type, typep
 from jamenson.runtime.multimethod import defmethod
-from jamenson.runtime.struct import defstruct
 
-import .mathlayout as ML
-from .mathlayout import V
-from .convert import convert_temperature, convert_gas_volume, convert_unit_prefix, convert_by_path
+from . import units as U
+from . import layout as ML
+from .layout import V
+from .dne import dne
+from .annotator import annotator
+from .physnum import PhysNum
+from .convert import convert, convert_unit_prefix, convert_by_path
 
 
 # utilities to use generators to construct calculations
@@ -25,7 +29,7 @@ def gen_expand(gen):
             value = itr.next() if send is no_send else itr.send(send)
         except StopIteration:
             break
-        if isinstance(value, generator_type):
+        if isinstance(value, GeneratorType):
             sub_acc = gen_expand(value)
             send = sub_acc.pop(-1)
             acc.extend(sub_acc)
@@ -39,42 +43,51 @@ def gen_expand(gen):
 
 def equation_set_iterator(func):
     def wrap(*args, **kwds):
-        mls = gen_expand(func(*args, **kwds))
+        for arg in args:
+            if hasattr(arg, 'add_calculation'):
+                break
+        else:
+            raise TypeError('%s requires a calculator' % (func.__name__,))
+        # the equations of the convertions are only annotated when the
+        # calculator renders them
+        with annotator.annotation(annotate=getattr(arg, 'render', True)):
+            mls = gen_expand(func(*args, **kwds))
         text = mls.pop(0)
         result = mls.pop(-1)
         mls = list(x for x in mls if x is not None)
         if mls:
-            for arg in args:
-                if hasattr(arg, 'add_calculation'):
-                    break
-            else:
-                raise 'hell'
             arg.add_calculation(ML.equation_set(text, mls))
             for ml in mls:
                 if isinstance(ml, ML.error):
                     arg.flag_error()
         return result
+    wrap.__name__ = func.__name__
+    wrap.__doc__ = func.__doc__
     return wrap
 
-def x_convert_unit_prefix(num, to_unit, name=None):
-    cnv,answer = convert_unit_prefix(num, to_unit, name)
-    yield cnv
+def x_annotated_convert(converter, num, to_unit, name=None):
+    if name is not None:
+        num = PhysNum(num.quantity, num.unit, name)
+    with annotator.annotation(annotate=annotator.annotating) as eqs:
+        answer = converter(num, to_unit)
+    for eq in eqs or ():
+        yield eq
+    if answer.quantity is dne:
+        yield ML.zero_division_error
+        answer = None
     yield answer
 
+def x_convert_unit_prefix(num, to_unit, name=None):
+    return x_annotated_convert(convert_unit_prefix, num, to_unit, name)
+
 def x_convert_by_path(num, to_unit, name=None):
-    cnv,answer = convert_by_path(num, to_unit, name)
-    yield cnv
-    yield answer
+    return x_annotated_convert(convert_by_path, num, to_unit, name)
 
 def x_convert_temperature(temperature, unit):
-    cnv,answer = convert_temperature(temperature, unit)
-    yield cnv
-    yield answer
+    return x_annotated_convert(convert, temperature, unit)
 
 def x_convert_gas_volume(num, to_unit, name=None):
-    cnv,answer = convert_gas_volume(num, to_unit, name)
-    yield cnv
-    yield answer
+    return x_annotated_convert(convert, num, to_unit, name)
 
 
 # converters
@@ -118,8 +131,8 @@ def convert_liquid_volume_to_mols(calculator, concentration, volume, to_unit=Non
         to_unit = U.quantities.mol
     yield simple_convertion_title(name, volume.unit, to_unit)
     concentration = yield x_convert_unit_prefix(concentration, U.concentrations.mol_L)
-    concentration = concentration * 1
-    concentration.unit = concentration.unit.cannonicalized()
+    concentration = PhysNum(concentration.quantity, concentration.unit.cannonicalized(),
+                            concentration.name)
     volume = yield x_convert_by_path(volume, U.liquid_volumes.L)
     mol = yield simple_factor_convert(volume, concentration, name)
     mol = yield x_convert_unit_prefix(mol, to_unit, name)
@@ -138,8 +151,8 @@ def convert_mols_to_liquid_concentration(calculator, volume, mols, to_unit=None,
     concentration = yield x_convert_unit_prefix(concentration, to_unit, name)
     yield concentration
 
-R = U.PhysicalNumber(Decimal('8.314'),
-                     U.pressures.Pa * U.gas_volumes.m3 / U.temperatures.K / U.quantities.mol)
+R = PhysNum(Decimal('8.314'),
+            U.pressures.Pa * U.gas_volumes.m3 / U.temperatures.K / U.quantities.mol)
 
 @equation_set_iterator
 def convert_gas_PVT_to_mols(calculator, pressure, volume, temperature, to_unit=None, name=None):
@@ -152,29 +165,28 @@ def convert_gas_PVT_to_mols(calculator, pressure, volume, temperature, to_unit=N
     volume = yield x_convert_gas_volume(volume, U.gas_volumes.m3, name)
     pressure = yield x_convert_by_path(pressure, U.pressures.Pa)
     temperature = yield x_convert_temperature(temperature, U.temperatures.K)
-    try:
-        mols = pressure * volume / (R * temperature)
-    except ZeroDivisionError:
-        error = ML.error(u'division by zero leads to a number that does not exist (D.N.E.)')
+    mols = pressure * volume / (R * temperature)
+    if mols.quantity is dne:
+        error = ML.zero_division_error
         mols = None
-        mols_ml = V(ML.dne(), mols_unit, name=name)
+        mols_ml = V(dne, U.quantities.mol, name=name)
     else:
         error = None
-        mols.unit = mols.unit.cannonicalized()
+        mols = PhysNum(mols.quantity, mols.unit.cannonicalized(), name)
         assert mols.unit == U.quantities.mol
         mols_ml = V(mols, name=name)
     cnv = ML.make_convertion(
         [V(volume, name=name, crossed_unit=True), V(1)],
         [V(pressure, crossed_unit=True), V(1)],
         [V(1), V(temperature, crossed_unit=True)],
-        [ML.x_physical_number(1, [ML.crossed_unit(U.temperatures.K), U.quantities.mol]),
-         ML.x_physical_number(R.quantity, [ML.crossed_unit(U.pressures.Pa),
-                                           ML.crossed_unit(U.gas_volumes.m3)])])
+        [ML.x_physnum(1, [ML.crossed_unit(U.temperatures.K), U.quantities.mol]),
+         ML.x_physnum(R.quantity, [ML.crossed_unit(U.pressures.Pa),
+                                   ML.crossed_unit(U.gas_volumes.m3)])])
     yield ML.equals(cnv, mols_ml)
     if error:
         yield error
     else:
-        mols = yield x_convert_unit_prefix(mol, to_unit, name)
+        mols = yield x_convert_unit_prefix(mols, to_unit, name)
     yield mols
 
 @equation_set_iterator
@@ -185,20 +197,10 @@ def convert_gas_PnT_to_volume(calculator, pressure, mols, temperature, to_unit=N
     if to_unit is None:
         to_unit = U.gas_volumes.L
     yield simple_convertion_title(name, mols.unit, to_unit, u'using the ideal gas law')
-    mols = yield x_convert_p(mols, U.quantities.mol, name)
-    pressure = yield x_convert_by_path(pressure, U.pressure.Pa)
+    mols = yield x_convert_unit_prefix(mols, U.quantities.mol, name)
+    pressure = yield x_convert_by_path(pressure, U.pressures.Pa)
     temperature = yield x_convert_temperature(temperature, U.temperatures.K)
-    try:
-        volume = mols * temperature * R / pressure
-    except ZeroDivisionError:
-        error = ML.error(u'division by zero leads to a number that does not exist (D.N.E.)')
-        volume = None
-        volume_ml = V(ML.dne(), mols_unit, name=name)
-    else:
-        error = None
-        volume.unit = volume.unit.cannonicalized()
-        volume_ml = V(volume, name=name)
-    raise 'not yet finished'
+    raise NotImplementedError('not yet finished')
 
 
 
@@ -211,22 +213,21 @@ def simple_factor_convert(num, factor, name=None, cannonicalize=True, invert=Fal
     n,d = factor.split_posneg()
     if invert:
         n,d = d,n
-    try:
-        answer = num*n/d
-    except ZeroDivisionError:
-        error = ML.error(u'division by zero leads to a number that does not exist (D.N.E.)')
+    answer = num*n/d
+    if answer.quantity is dne:
+        error = ML.zero_division_error
         answer = None
-        answer_ml = V(ML.dne(), answer_unit, name=name)
+        answer_ml = V(dne, answer_unit, name=name)
     else:
         error = None
-        answer.unit = answer_unit
+        answer = PhysNum(answer.quantity, answer_unit, name)
         answer_ml = V(answer, name=name)
     #need to fix unit crossing
     cnv = ML.make_convertion([V(num, crossed_unit=True, name=name),
                               None],
                              ([V(n),
                                V(d, crossed_unit=True)]))
-    yield ML.equals(cnv, V(answer, name=name))
+    yield ML.equals(cnv, answer_ml)
     if error:
         yield error
     yield answer
@@ -280,47 +281,3 @@ def meth(c):
 @defmethod(ML.get_ml_json, [Calculator])
 def meth(c):
     return ML.get_ml_json(ML.calculations(mls=c.calculations))
-
-def solve_expression(*terms):
-    pass
-
-
-mols = solve_expression([pressure,    'Pa',     1],
-                        [volume,      'm3',     1],
-                        [None,        to_unit, -1]
-                        [temperature, 'K',     -1],
-                        [R,           None,    -1])
-
-
-
-if 0:
-    calc = Calculator()
-    conc = U.PhysicalNumber(SigFig('1.07'), U.concentrations.mmol_L)
-    vol = U.PhysicalNumber(SigFig('250.3'), U.liquid_volumes.gal)
-    mols = convert_liquid_volume_to_mols(calc, conc, vol, 1e-6 * U.quantities.mol, name=u'agent x')
-    print conc
-    print vol
-    print mols
-    show_math(calc)
-
-ppn = U.parse_physical_number
-pu = U.parse_unit
-
-if 1:
-    calc = Calculator()
-    volume = ppn('34.05 gallons')
-    mols = ppn('1.30e8 nmols')
-    concentration = convert_mols_to_liquid_concentration(calc, volume, mols, pu('mM'), name=u'stuff')
-    show_math(calc)
-
-if 0:
-    calc = Calculator()
-    pressure = ppn('1.007 atm')
-    volume = ppn('3.54e5 yd3')
-    temperature = ppn('23.4 C')
-    mols = convert_gas_PVT_to_mols(calc, pressure, volume, temperature, U.quantities.mol, name=u'stuff')
-    show_math(calc)
-
-
-#from pprint import pprint
-#pprint(ML.get_ml_json(calc))
@@ -4,6 +4,10 @@
 import re
 import operator
 from decimal import Decimal
+from heapq import heappush, heappop
+from functools import partial
+from itertools import count
+from math import log
 
 from jamenson.runtime.multimethod import defmethod, MultiMethod
 from jamenson.runtime.atypes import as_optimized_type, typep, anytype
@@ -13,10 +17,14 @@ from .dne import dne
 from . import units as U
 from . import layout
 from . import physnum
-from .physnum import PhysNum, as_physnum
+from .physnum import PhysNum, PhysNumArray, as_physnum
+from .ratio import Ratio, as_ratio, affine_decimal
 from .layout import V
-from .annotator import annotator
+from .annotator import annotator, ContextStack
+from .slotted import Slotted
+from .cache import lru_cache
 from .types import lossless_number_type
+from . import snapshot
 
 convert = MultiMethod('convert',
                       '''
@@ -29,10 +37,177 @@ def meth(num, to_unit):
     '''
     if num.unit == to_unit:
         return num
+    return convertion_plan(num.unit, to_unit).convert(num, to_unit)
+
+def convert_uncached(num, to_unit):
+    '''Convert by dispatching to the specialized converters, as used to
+       compile convertion plans
+    '''
     if num.unit.without_prefix() == to_unit.without_prefix():
         return convert_unit_prefix(num, to_unit)
     return x_convert(num, to_unit)
 
+@defmethod(convert, [PhysNumArray, U.BaseUnit])
+def meth(nums, to_unit):
+    '''Convert an array of quantities by the affine transformation that
+       converts a single quantity
+    '''
+    if nums.unit == to_unit:
+        return nums
+    plan = convertion_plan(nums.unit, to_unit)
+    if nums.dtype is SigFig:
+        scale, offset = plan.rounded_scale, plan.rounded_offset
+    else:
+        scale, offset = plan.scale, plan.offset
+    result = nums.affine_transform(scale, offset, plan.result_unit(to_unit))
+    if nums.dtype is SigFig:
+        result = convert_sigfig_zeros(nums, result, to_unit)
+    return result
+
+def convert_many(values, to_unit):
+    '''Convert many quantities to to_unit, compiling the convertion from
+       each distinct unit only once.  A PhysNumArray converts as a whole;
+       any other iterable of PhysNums gives a list.
+    '''
+    to_unit = U.as_unit(to_unit)
+    if isinstance(values, PhysNumArray):
+        return convert(values, to_unit)
+    return list(iter_convert_many(values, to_unit))
+
+def iter_convert_many(values, to_unit):
+    '''Generator form of convert_many for iterables of PhysNums
+    '''
+    to_unit = U.as_unit(to_unit)
+    plans = {}
+    for num in values:
+        unit = num.unit
+        try:
+            plan = plans[unit]
+        except KeyError:
+            plan = plans[unit] = None if unit == to_unit else convertion_plan(unit, to_unit)
+        yield num if plan is None else plan.convert(num, to_unit)
+
+def convert_sigfig_zeros(nums, result, to_unit):
+    '''Zero SigFigs keep the place given by converting step by step, which
+       no single affine transformation reproduces; convert each distinct
+       zero separately
+    '''
+    quantities = nums.quantities
+    zeros = quantities.mantissa.ravel() == 0
+    if nums.dne_mask is not None:
+        zeros &= ~nums.dne_mask.ravel()
+    sign, power, ndigits = [field.ravel() for field in
+                            [quantities.sign, quantities.power, quantities.ndigits]]
+    converted = result.quantities
+    with annotator.annotation(annotate=False):
+        while zeros.any():
+            i = zeros.argmax()
+            mask = zeros & (sign == sign[i]) & (power == power[i]) & (ndigits == ndigits[i])
+            zero = SigFig.from_coefficient(int(sign[i]), 0, int(ndigits[i]), int(power[i]))
+            converted = converted.replace(mask.reshape(converted.shape),
+                                          convert(PhysNum(zero, nums.unit), to_unit).quantity)
+            zeros &= ~mask
+    return result.with_quantities(converted, dne_mask=result.dne_mask)
+
+def convertion_affine_factors(from_unit, to_unit):
+    '''Returns (scale, offset) such that converting a quantity q in
+       from_unit gives scale * q + offset in to_unit
+    '''
+    plan = convertion_plan(from_unit, to_unit)
+    return plan.scale, plan.offset
+
+
+# # # # # # # # # # # #
+# Convertion Plans    #
+# # # # # # # # # # # #
+
+# Every convertion is affine in the quantity, so the convertion between two
+# units is compiled once by converting the exact quantities Ratio(0) and
+# Ratio(1), giving an exact scale and offset unless a factor has
+# significant figures.  The
+# annotations emitted by the specialized converters are recorded as
+# functions of (num, result), so that they can be replayed for each
+# converted number.
+
+plan_recordings = ContextStack('physmath.convert.plan_recordings')
+
+def record_annotation(annotate):
+    '''Record annotate(num, result) for the convertion plans being compiled
+    '''
+    if plan_recordings:
+        plan_recordings[-1].append(annotate)
+
+class ConvertionPlan(Slotted):
+    '''Compiled convertion between two units; a nonzero quantity q converts
+       to q * scale + offset, with a single rounding
+    '''
+
+    __slots__ = ['scale', 'offset', 'exact', 'rounded_scale', 'rounded_offset',
+                 'unit', 'to_target', 'keep_name', 'annotations']
+
+    def __init__(self, scale, offset, unit, to_target, keep_name, annotations):
+        self.scale = scale
+        self.offset = offset
+        self.exact = isinstance(scale, Ratio)
+        # for SigFig quantities, which take Decimal operands
+        self.rounded_scale = scale.as_decimal() if self.exact else scale
+        self.rounded_offset = offset.as_decimal() if self.exact else offset
+        self.unit = unit
+        self.to_target = to_target
+        self.keep_name = keep_name
+        self.annotations = annotations
+
+    def result_unit(self, to_unit):
+        return to_unit if self.to_target else self.unit
+
+    def convert(self, num, to_unit):
+        quantity = num.quantity
+        if (quantity is not dne and not quantity) or \
+               (self.annotations is None and annotator.annotating):
+            # zeros keep the place given by converting step by step
+            return convert_uncached(num, to_unit)
+        result = PhysNum(self.convert_quantity(quantity), self.result_unit(to_unit),
+                         num.name if self.keep_name else None)
+        if annotator.annotating:
+            for annotate in self.annotations:
+                annotate(num, result)
+        return result
+
+    def convert_quantity(self, quantity):
+        if quantity is dne:
+            return dne
+        if self.exact and not isinstance(quantity, SigFig):
+            if isinstance(quantity, Ratio):
+                return quantity * self.scale + self.offset
+            return affine_decimal(quantity, self.scale, self.offset)
+        quantity = quantity * self.rounded_scale
+        if self.rounded_offset:
+            quantity = quantity + self.rounded_offset
+        return quantity
+
+probe_name = 'convertion plan probe'
+
+@lru_cache('convert.convertion_plan', maxsize=1024)
+def convertion_plan(from_unit, to_unit):
+    '''The ConvertionPlan for a pair of units; cleared whenever a factor
+       is registered with the convertion graph
+    '''
+    with annotator.annotation(annotate=False):
+        plan_recordings.push([])
+        try:
+            zero = convert_uncached(PhysNum(Ratio(0), from_unit, probe_name), to_unit)
+            del plan_recordings[-1][:]
+            one = convert_uncached(PhysNum(Ratio(1), from_unit, probe_name), to_unit)
+            annotations = plan_recordings[-1]
+        finally:
+            plan_recordings.pop()
+    if None in annotations:
+        annotations = None
+    offset = zero.quantity
+    scale = one.quantity - offset if offset else one.quantity
+    return ConvertionPlan(scale, offset, one.unit, one.unit is to_unit,
+                          one.name == probe_name, annotations)
+
 def convert_factor(number, num, den=None, power=1):
     '''Convert using a series of conversion factors
     '''
@@ -85,9 +260,9 @@ def temperature_factors():
     F = U.temperatures.F
     C = U.temperatures.C
     K = U.temperatures.K
-    return {(K,C): [(1,1), '-273.15'],
-            (K,F): [(9,5), '-459.67'],
-            (C,F): [(9,5), '32']}
+    return {(K,C): [(1,1), Ratio(-27315, 100)],
+            (K,F): [(9,5), Ratio(-45967, 100)],
+            (C,F): [(9,5), Ratio(32)]}
 temperature_factors = temperature_factors()
 
 @defdimconvert('temperature')
@@ -96,34 +271,40 @@ def meth(num, to_unit):
     '''
     try:
         (mn,md),b = temperature_factors[num.unit, to_unit]
-        b = Decimal(b)
     except KeyError:
         (mn,md),b = temperature_factors[to_unit, num.unit]
-        b = Decimal(b)
         b = -md * b / mn
         mn,md = md,mn
 
-    try:
-        result = PhysNum(num.quantity * Decimal(mn) / Decimal(md) + b, to_unit)
-    except ZeroDivisionError:
-        result = dne
-
+    quantity = num.quantity
+    if isinstance(quantity, SigFig):
+        quantity = quantity * Decimal(mn) / Decimal(md) + b.as_decimal()
+    elif isinstance(quantity, Ratio):
+        quantity = quantity * Ratio(mn, md) + b
+    elif quantity is not dne:
+        quantity = affine_decimal(quantity, Ratio(mn, md), b)
+    result = PhysNum(quantity, to_unit)
+
+    annotate = partial(annotate_temperature, mn, md, b.as_decimal(), to_unit)
+    record_annotation(annotate)
     if annotator.annotating:
-        annotator.annotate(
-          layout.equals(
-            layout.add([layout.make_convertion(
-                                [V(num, crossed_unit=True),
-                                 None],
-                                [V(mn, to_unit),
-                                 V(md, num.unit, crossed_unit=True)]),
-                        V(b, to_unit) if b>0 else layout.neg(V(abs(b), to_unit))]),
-            V(result)))
-
-        if result is dne:
-            annotator.annotate(layout.zero_division_error)
-
+        annotate(num, result)
     return result
 
+def annotate_temperature(mn, md, b, to_unit, num, result):
+    annotator.annotate(
+      layout.equals(
+        layout.add([layout.make_convertion(
+                            [V(num, crossed_unit=True),
+                             None],
+                            [V(mn, to_unit),
+                             V(md, num.unit, crossed_unit=True)]),
+                    V(b, to_unit) if b>0 else layout.neg(V(abs(b), to_unit))]),
+        V(result)))
+
+    if result is dne:
+        annotator.annotate(layout.zero_division_error)
+
 def volume_systems():
     data = '''
     liter: L
@@ -138,7 +319,6 @@ def volume_systems():
         system, units = line.split(':')
         for unit in map(U.parse_unit, units.strip().split()):
             yield unit, system
-volume_systems = dict(volume_systems())
 
 @defdimconvert('volume')
 def meth(num, to_unit):
@@ -212,34 +392,65 @@ def sign(op):
 
 class Converter(object):
     '''Utility class for construction a sequence of factor conversions and
-       rendering as `layout.convertion`
+       rendering as `layout.convertion`.  The factors are folded into one
+       exact factor that is applied to the quantity once, and the terms are
+       only kept when they may be annotated.
     '''
 
     error = None
+    inexact = None
     def __init__(self, num, seed=True):
         self.terms = []
+        self.keep_terms = annotator.annotating or bool(plan_recordings)
         num = as_physnum(num)
+        self.seed = seed
+        self.factor = Ratio(1)
         if seed:
-            self.current_value = 1
-            self.add_term(num)
+            num = self.x_as_physum(num)
+            if self.keep_terms:
+                self.terms.append([num, None, 1])
+            self.unit = (U.dimensionless * num.unit).cannonicalized()
+            if num.quantity is dne:
+                self.error = layout.zero_division_error
         else:
-            self.current_value = num
+            self.unit = num.unit
+        self.quantity = num.quantity
         self.name = num.name
 
+    @property
+    def current_value(self):
+        return PhysNum(self.current_quantity(), self.unit)
+
+    def current_quantity(self):
+        quantity = self.quantity
+        if quantity is dne:
+            return dne
+        if isinstance(quantity, Ratio):
+            if self.inexact is None:
+                return quantity * self.factor
+            quantity = quantity.as_decimal()
+        if self.factor != 1:
+            if isinstance(quantity, SigFig):
+                quantity = quantity * self.factor.as_decimal()
+            else:
+                quantity = affine_decimal(quantity, self.factor)
+        if self.inexact is not None:
+            quantity = quantity * self.inexact
+        return quantity
+
     def factor_convert(self, num, den, power=1):
         num,den = map(self.x_as_physum, [num,den])
         self.add_term(num, den, power)
-        if self.current_value.unit == num.unit:
-            self.current_value.unit = num.unit #force to have same form when equivalent
+        if self.unit == num.unit:
+            self.unit = num.unit #force to have same form when equivalent
         return self
 
     def prefix_convert(self, to_unit, power=1):
-        from_unit = self.powered_unit(self.current_value.unit, power).cannonicalized()
+        from_unit = self.powered_unit(self.unit, power).cannonicalized()
         to_unit = self.powered_unit(to_unit, power).cannonicalized()
         assert from_unit.without_prefix() == to_unit.without_prefix(), \
                '%s to %s' % (from_unit, to_unit)
         dp = (to_unit / from_unit).cannonicalized().prefix.power
-        quantity = self.current_value.quantity * Decimal(10) ** (-dp * power)
         unit = from_unit
         s = sign(dp)
         cnvs = [[1000, abs(dp)//3], [10**(abs(dp)%3), 1 if dp%3 else 0]]
@@ -253,11 +464,11 @@ class Converter(object):
                 self.add_term(num, den, power)
                 unit = new_unit
         assert unit == to_unit
-        self.current_value = PhysNum(quantity, to_unit ** power)
+        self.unit = to_unit ** power
         return self
 
     def path_convert(self, to_unit, power=1):
-        from_unit = self.powered_unit(self.current_value.unit, power)
+        from_unit = self.powered_unit(self.unit, power)
         to_unit = self.powered_unit(to_unit, power)
         n_from_unit = convertion_graph.normalize_unit(from_unit)
         n_to_unit = convertion_graph.normalize_unit(to_unit)
@@ -303,45 +514,59 @@ class Converter(object):
             op = PhysNum(num, unit)
         op = as_physnum(op)
         if isinstance(op.quantity, (int,long)):
-            op = 1*op
-            op.quantity = Decimal(op.quantity)
+            op = PhysNum(Decimal(op.quantity), op.unit)
         return op
 
     def add_term(self, num, den=None, power=1):
         num = self.x_as_physum(num)
-        if den is None:
-            term_den = None
-            den = as_physnum(Decimal(1))
-        else:
-            term_den = den = self.x_as_physum(den)
-        self.terms.append([num, term_den, power])
-
-        factor = num / den
+        den = self.x_as_physum(den)
+        if self.keep_terms:
+            self.terms.append([num, den, power])
+        unit = num.unit if den is None else num.unit / den.unit
         if power != 1:
-            assert not isinstance(factor.quantity, (int,long))
-            factor = factor ** power
-
-        self.current_value = self.current_value * factor
-        self.current_value.unit = self.current_value.unit.cannonicalized()
-        if self.current_value.quantity is dne:
-            #if not annotator.annotating:
-            #    raise
+            unit = unit ** power
+        self.unit = (self.unit * unit).cannonicalized()
+        try:
+            self.fold(num.quantity, power)
+            if den is not None:
+                self.fold(den.quantity, -power)
+        except ZeroDivisionError:
+            self.quantity = dne
+        if self.quantity is dne:
             self.error = layout.zero_division_error
             return False
         return True
 
+    def fold(self, quantity, power):
+        '''Multiply the factor applied at finish by quantity ** power
+        '''
+        if not isinstance(quantity, SigFig):
+            self.factor = self.factor * as_ratio(quantity) ** power
+            return
+        if not quantity:
+            raise ZeroDivisionError
+        op = quantity if abs(power) == 1 else quantity ** abs(power)
+        if self.inexact is None:
+            self.inexact = op if power > 0 else 1 / op
+        else:
+            self.inexact = self.inexact * op if power > 0 else self.inexact / op
+
     def finish(self):
-        result = 1 * self.current_value
-        result.name = self.name
-        if annotator.annotating:
-            annotator.annotate(
-                layout.equals(
-                  self.make_convertion(),
-                  V(result)))
-            if self.error is not None:
-                annotator.annotate(self.error)
+        result = PhysNum(self.current_quantity(), self.unit, self.name)
+        if self.keep_terms:
+            record_annotation(partial(annotate_terms, self.terms[1:]) if self.seed else None)
+            if annotator.annotating:
+                self.annotate(result)
         return result
 
+    def annotate(self, result):
+        annotator.annotate(
+            layout.equals(
+              self.make_convertion(),
+              V(result)))
+        if self.error is not None:
+            annotator.annotate(self.error)
+
     def make_convertion(self):
         cnv = []
         n_terms = len(self.terms)
@@ -372,6 +597,14 @@ class Converter(object):
 # optimal path through this graph connecting the source and target nodes. Then
 # perform the combined convertion given by the path.
 
+def annotate_terms(terms, num, result):
+    '''Annotate the convertion of num by the factor terms of a Converter
+    '''
+    cnv = Converter(num)
+    cnv.terms.extend(terms)
+    cnv.annotate(result)
+
+
 class NoSuchConvertionError(LookupError):
 
     def __init__(self, unit_from, unit_to):
@@ -380,13 +613,17 @@ class NoSuchConvertionError(LookupError):
     def __str__(self):
         return 'no convertion from %s to %s' % (self.unit_from, self.unit_to)
 
-class ConvertionNode(object):
+class ConvertionNode(Slotted):
+
+    __slots__ = ['unit', 'convertion_arcs']
 
     def __init__(self, unit):
         self.unit = unit
         self.convertion_arcs = []
 
-class ConvertionArc(object):
+class ConvertionArc(Slotted):
+
+    __slots__ = ['node', 'factor', 'invert_factor', 'weight']
 
     def __init__(self, node, factor, invert_factor=False, weight=1):
         self.node = node
@@ -428,8 +665,7 @@ class ConvertionGraph(object):
         power_delta, paths = self.find_convertion_paths(unit_from, unit_to)
         if not paths:
             return power_delta, None
-        paths.sort(key=lambda path: path.calculate_weight())
-        return power_delta, paths[-1]
+        return power_delta, paths[0]
 
     def register(self, unit_from, unit_to, factor, weight=None):
         unit_from = U.as_unit(unit_from)
@@ -453,6 +689,7 @@ class ConvertionGraph(object):
         node_to.convertion_arcs.append(ConvertionArc(node_from, factor,
                                                      invert_factor=True,
                                                      weight=weight))
+        convertion_plan.cache.clear()
     @staticmethod
     def calculate_factor_weight(op):
         if isinstance(op, (int,long)):
@@ -480,19 +717,40 @@ class ConvertionGraph(object):
     def find_convertion_paths(self, unit_from, unit_to):
         dpower_from, node_from = self.get_node(unit_from)
         dpower_to, node_to = self.get_node(unit_to)
+        arcs = self.find_best_arcs(node_from, node_to)
         return [dpower_from - dpower_to,
-                list(ConvertionPath(arcs) for arcs in
-                     self.iter_paths_between(node_from, node_to, (), set()))]
+                [] if arcs is None else [ConvertionPath(arcs)]]
 
-    def iter_paths_between(self, node, end_node, arc_path, seen_nodes):
-        if node in seen_nodes:
-            return
-        seen_nodes.add(node)
-        if node is end_node:
-            yield arc_path
-        for arc in node.convertion_arcs:
-            for arc_path_x in self.iter_paths_between(arc.node, end_node, arc_path + (arc,), seen_nodes):
-                yield arc_path_x
+    @staticmethod
+    def find_best_arcs(start_node, end_node):
+        '''Arcs of the best path between two nodes, or None if there is no
+           path.  Paths are searched best first by the product of their arc
+           weights (Dijkstra's algorithm on -log(weight), preferring fewer
+           arcs on ties) and each node is visited once, through the first
+           path that reaches it.
+        '''
+        queue = [(0.0, 0, 0, start_node, None)]
+        counter = count(1)
+        previous = {}
+        while queue:
+            cost, narcs, i, node, via = heappop(queue)
+            if node in previous:
+                continue
+            previous[node] = via
+            if node is end_node:
+                break
+            for arc in node.convertion_arcs:
+                if arc.node not in previous:
+                    heappush(queue, (cost - log(arc.weight), narcs + 1, next(counter),
+                                     arc.node, (node, arc)))
+        else:
+            return None
+        arcs = []
+        while previous[node] is not None:
+            node, arc = previous[node]
+            arcs.append(arc)
+        arcs.reverse()
+        return tuple(arcs)
 
     def calculate_convertion_factor_dimensionally(self, unit_from, unit_to):
         dimensionally_from = unit_from.get_dimensionality().cannonicalized()
@@ -570,7 +828,14 @@ def convertion_graph():
         converter.register(lpn.unit, rpn.unit, rpn.quantity / lpn.quantity
                            if lpn.quantity != 1 else rpn.quantity)
     return converter
-convertion_graph = convertion_graph()
+
+convertion_tables = snapshot.load('convert')
+if convertion_tables is None:
+    convertion_tables = dict(volume_systems=dict(volume_systems()),
+                             convertion_graph=convertion_graph())
+    snapshot.save('convert', convertion_tables)
+volume_systems = convertion_tables['volume_systems']
+convertion_graph = convertion_tables['convertion_graph']
 
 
 #print convert(PhysNum(SigFig('1.325'), U.temperatures.K), U.temperatures.C)
@@ -10,14 +10,14 @@ from __future__ import absolute_import
 
 import operator
 from decimal import Decimal
-
-from hlab.memorize import memorize
+from json import dumps
 
 from jamenson.runtime.multimethod import MultiMethod, defmethod
 from jamenson.runtime.atypes import anytype, Seq, as_optimized_type, IsType, typep, eq_types, union
 from jamenson.runtime.struct import make_struct, BaseStruct, no_default
 
 from .types import lossless_number_type
+from .cache import LRUCache
 from .sigfig import SigFig
 from . import units
 from .physnum import PhysNum, as_physnum
@@ -95,10 +95,18 @@ def meth(n):
 # units #
 # # # # #
 
+unit_json_cache = LRUCache('layout.unit_json', maxsize=1024)
+
 @defmethod(get_ml_json, [units.BaseUnit])
-@memorize
 def meth(unit):
-    return make_unit_json(unit)
+    # keyed by units.unit_key, as equal units can differ in how they are
+    # written (e.g. N and kg*m/s^2)
+    key = units.unit_key(unit)
+    json = unit_json_cache.get(key)
+    if json is None:
+        json = make_unit_json(unit)
+        unit_json_cache.put(key, json)
+    return json
 
 make_unit_json = MultiMethod('make_unit_json')
 
@@ -387,3 +395,130 @@ def meth(yt):
                                  limiting=y.limiting)
                             for y in yt.yields))
 
+
+
+# # # # # # # # # # #
+# streaming json    #
+# # # # # # # # # # #
+
+# write_ml_json(ml, write) passes the json of ml to write in fragments,
+# producing the same text as json.dumps(get_ml_json(ml)) without building
+# the intermediate dicts and lists.  Types with their own get_ml_json or
+# json_ml need a corresponding write_ml_json.
+
+write_ml_json = MultiMethod('write_ml_json')
+
+def dump_ml_json(ml, fp):
+    '''Write the json of ml to the file-like fp incrementally
+    '''
+    write_ml_json(ml, fp.write)
+
+def json_key_order(keys):
+    '''The order a dict built by inserting keys in order iterates them,
+       which is the order json.dumps writes them
+    '''
+    ordered = {}
+    for key in keys:
+        ordered[key] = None
+    return list(ordered)
+
+def write_json_object(write, keys, write_value):
+    write('{')
+    for i,key in enumerate(keys):
+        if i:
+            write(', ')
+        write(dumps(key))
+        write(': ')
+        write_value(key)
+    write('}')
+
+def write_json_list(write, items, write_item=None):
+    if write_item is None:
+        write_item = write_ml_json
+    write('[')
+    for i,item in enumerate(items):
+        if i:
+            write(', ')
+        write_item(item, write)
+    write(']')
+
+@defmethod(write_ml_json, [object, anytype])
+def meth(o, write):
+    write_ml_json(as_ml(o), write)
+
+struct_json_layouts = {}
+
+def get_struct_json_layout(cls):
+    '''(keys in json order, property types by name) for a struct class
+    '''
+    try:
+        return struct_json_layouts[cls]
+    except KeyError:
+        names = [n for n,d,tp in cls._properties]
+        layout = struct_json_layouts[cls] = (json_key_order(names + ['cls']),
+                                             dict((n,tp) for n,d,tp in cls._properties))
+        return layout
+
+def write_struct_json(ml, write, write_field):
+    keys, types = get_struct_json_layout(ml.__class__)
+    cls_json = dumps(ml.__class__.__name__)
+    def write_value(key):
+        if key == 'cls':
+            write(cls_json)
+        else:
+            write_field(key, types[key])
+    write_json_object(write, keys, write_value)
+
+@defmethod(write_ml_json, [BaseMLStruct, anytype])
+def meth(ml, write):
+    def write_field(n, tp):
+        v = getattr(ml, n)
+        if eq_types(tp, ml_type):
+            assert typep(v, ml_type), 'invalid value %r for %s of %s w/ tp %s' % (v, n, ml.__class__.__name__, tp)
+            write_ml_json(v, write)
+        elif tp == ml_seq_type:
+            assert typep(v, ml_seq_type)
+            write_json_list(write, v)
+        elif typep(v, ml_type):
+            write_ml_json(v, write)
+        else:
+            write(dumps(v))
+    write_struct_json(ml, write, write_field)
+
+unit_json_fragments = LRUCache('layout.unit_json_fragment', maxsize=1024)
+
+@defmethod(write_ml_json, [units.BaseUnit, anytype])
+def meth(unit, write):
+    key = units.unit_key(unit)
+    fragment = unit_json_fragments.get(key)
+    if fragment is None:
+        fragment = dumps(get_ml_json(unit))
+        unit_json_fragments.put(key, fragment)
+    write(fragment)
+
+@defmethod(write_ml_json, [crossed_unit, anytype])
+def meth(cu, write):
+    write_ml_json(crossed(cu.unit), write)
+
+@defmethod(write_ml_json, [crossed_name, anytype])
+def meth(cn, write):
+    write_ml_json(crossed(compound_name(cn.name) if isinstance(cn.name,unicode) else cn.name), write)
+
+@defmethod(write_ml_json, [x_physnum, anytype])
+def meth(op, write):
+    write_ml_json(make_span(*
+               ([op.quantity] +
+                list(op.units) +
+                ([compound_name(op.name) if isinstance(op.name, unicode) else op.name]
+                   if op.name is not None else []))), write)
+
+@defmethod(write_ml_json, [convertion, anytype])
+def meth(c, write):
+    def write_terms(n, tp):
+        write_json_list(write, c.terms, lambda term, write: write_json_list(write, term))
+    write_struct_json(c, write, write_terms)
+
+@defmethod(write_ml_json, [yield_table, anytype])
+def meth(yt, write):
+    # yield tables are small and flat
+    write(dumps(get_ml_json(yt)))
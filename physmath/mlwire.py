@@ -0,0 +1,236 @@
+'''Compact binary encoding of layouts.
+
+   The json of a layout mostly consists of repeated units, each written out
+   in full with its prefix, name, abbreviation and component units.  The
+   wire format instead keeps a header with a table of the distinct strings
+   and a table of the distinct units, and refers to their entries by index
+   from the body.  decode_ml gives back the json shape of get_ml_json, for
+   the browser renderer.
+
+   Layout of an encoding:
+
+     magic      'PMW1'
+     strings    count, then per string the length and utf-8 bytes
+     units      count, then per unit its value (refering only to strings
+                and to units earlier in the table)
+     body       one value
+
+   Counts, lengths and indices are unsigned LEB128 varints and each value
+   starts with a one byte tag.
+'''
+
+from __future__ import absolute_import
+
+import struct
+
+from .layout import get_ml_json
+
+magic = 'PMW1'
+
+(TAG_NULL, TAG_FALSE, TAG_TRUE, TAG_INT, TAG_NEG_INT, TAG_FLOAT,
+ TAG_STRING, TAG_LIST, TAG_DICT, TAG_UNIT) = range(10)
+
+unit_classes = frozenset(['primitive_unit', 'compound_unit', 'named_unit'])
+
+float_struct = struct.Struct('<d')
+
+
+class WireFormatError(ValueError):
+    pass
+
+
+def write_varint(buf, n):
+    while n > 0x7f:
+        buf.append((n & 0x7f) | 0x80)
+        n >>= 7
+    buf.append(n)
+
+
+class Encoder(object):
+
+    def __init__(self):
+        self.strings = []
+        self.string_indices = {}
+        self.units = bytearray()
+        self.nunits = 0
+        # by identity, as units from get_ml_json are the same cached dict,
+        # and by value for equal units from distinct dicts
+        self.unit_ids = {}
+        self.unit_indices = {}
+
+    def string_index(self, s):
+        if isinstance(s, str):
+            s = s.decode('ascii')
+        try:
+            return self.string_indices[s]
+        except KeyError:
+            index = self.string_indices[s] = len(self.strings)
+            self.strings.append(s)
+            return index
+
+    def unit_index(self, unit):
+        try:
+            return self.unit_ids[id(unit)][1]
+        except KeyError:
+            pass
+        entry = bytearray()
+        self.write(entry, unit, False)
+        key = bytes(entry)
+        try:
+            index = self.unit_indices[key]
+        except KeyError:
+            index = self.unit_indices[key] = self.nunits
+            self.nunits += 1
+            self.units.extend(entry)
+        # keep unit alive so that its id is not reused
+        self.unit_ids[id(unit)] = unit, index
+        return index
+
+    def write(self, buf, value, intern_unit=True):
+        if value is None:
+            buf.append(TAG_NULL)
+        elif value is True:
+            buf.append(TAG_TRUE)
+        elif value is False:
+            buf.append(TAG_FALSE)
+        elif isinstance(value, (str, unicode)):
+            buf.append(TAG_STRING)
+            write_varint(buf, self.string_index(value))
+        elif isinstance(value, (int, long)):
+            if value >= 0:
+                buf.append(TAG_INT)
+                write_varint(buf, value)
+            else:
+                buf.append(TAG_NEG_INT)
+                write_varint(buf, -value)
+        elif isinstance(value, float):
+            buf.append(TAG_FLOAT)
+            buf.extend(float_struct.pack(value))
+        elif isinstance(value, dict):
+            if intern_unit and value.get('cls') in unit_classes:
+                index = self.unit_index(value)
+                buf.append(TAG_UNIT)
+                write_varint(buf, index)
+                return
+            buf.append(TAG_DICT)
+            write_varint(buf, len(value))
+            # unit entries are compared by their encoding, so their keys
+            # are written in a fixed order
+            items = value.iteritems() if intern_unit else sorted(value.iteritems())
+            for k, v in items:
+                write_varint(buf, self.string_index(k))
+                self.write(buf, v)
+        elif isinstance(value, (list, tuple)):
+            buf.append(TAG_LIST)
+            write_varint(buf, len(value))
+            for v in value:
+                self.write(buf, v)
+        else:
+            raise TypeError('cannot encode %r' % (value,))
+
+    def encode(self, data):
+        body = bytearray()
+        self.write(body, data)
+        buf = bytearray(magic)
+        write_varint(buf, len(self.strings))
+        for s in self.strings:
+            s = s.encode('utf-8')
+            write_varint(buf, len(s))
+            buf.extend(s)
+        write_varint(buf, self.nunits)
+        buf.extend(self.units)
+        buf.extend(body)
+        return bytes(buf)
+
+
+def encode_json(data):
+    '''Encode a json-compatible value, such as that of get_ml_json
+    '''
+    return Encoder().encode(data)
+
+def encode_ml(ml):
+    return encode_json(get_ml_json(ml))
+
+
+class Decoder(object):
+
+    def __init__(self, data):
+        self.data = bytearray(data)
+        self.pos = 0
+        self.strings = []
+        self.units = []
+
+    def read_varint(self):
+        data = self.data
+        n = shift = 0
+        try:
+            while True:
+                byte = data[self.pos]
+                self.pos += 1
+                n |= (byte & 0x7f) << shift
+                if not byte & 0x80:
+                    return n
+                shift += 7
+        except IndexError:
+            raise WireFormatError('truncated data')
+
+    def read_bytes(self, n):
+        if self.pos + n > len(self.data):
+            raise WireFormatError('truncated data')
+        s = bytes(self.data[self.pos:self.pos + n])
+        self.pos += n
+        return s
+
+    def read_ref(self, table, what):
+        index = self.read_varint()
+        try:
+            return table[index]
+        except IndexError:
+            raise WireFormatError('bad %s index %d' % (what, index))
+
+    def read(self):
+        tag = ord(self.read_bytes(1))
+        if tag == TAG_NULL:
+            return None
+        elif tag == TAG_FALSE:
+            return False
+        elif tag == TAG_TRUE:
+            return True
+        elif tag == TAG_INT:
+            return self.read_varint()
+        elif tag == TAG_NEG_INT:
+            return -self.read_varint()
+        elif tag == TAG_FLOAT:
+            return float_struct.unpack(self.read_bytes(8))[0]
+        elif tag == TAG_STRING:
+            return self.read_ref(self.strings, 'string')
+        elif tag == TAG_LIST:
+            return [self.read() for i in xrange(self.read_varint())]
+        elif tag == TAG_DICT:
+            d = {}
+            for i in xrange(self.read_varint()):
+                k = self.read_ref(self.strings, 'string')
+                d[k] = self.read()
+            return d
+        elif tag == TAG_UNIT:
+            return self.read_ref(self.units, 'unit')
+        raise WireFormatError('bad tag %d' % (tag,))
+
+    def decode(self):
+        if self.read_bytes(len(magic)) != magic:
+            raise WireFormatError('not physmath wire data')
+        for i in xrange(self.read_varint()):
+            self.strings.append(self.read_bytes(self.read_varint()).decode('utf-8'))
+        for i in xrange(self.read_varint()):
+            self.units.append(self.read())
+        value = self.read()
+        if self.pos != len(self.data):
+            raise WireFormatError('trailing data')
+        return value
+
+
+def decode_ml(data):
+    '''The json shape, as given by get_ml_json, of an encoded layout.
+       Each distinct unit is decoded once and shared where it recurs.
+    '''
+    return Decoder(data).decode()
@@ -0,0 +1,136 @@
+'''Convert many physical numbers on a pool of worker processes.
+
+   Pickling units and quantities as objects sends their full attributes
+   (and, for units, their atoms) with every value.  Instead each chunk of
+   values is sent as a table of unit keys (units.unit_key) and the values
+   as (unit index, packed quantity, name) tuples, and the results come back
+   the same way.  Each worker warms its caches once at startup, by
+   resolving the units of the first chunk and compiling their convertion
+   plans.
+'''
+
+from __future__ import absolute_import
+
+from decimal import Decimal
+from itertools import islice
+
+from .sigfig import SigFig
+from .dne import dne
+from .physnum import PhysNum, as_physnum
+from .units import as_unit, unit_key, unit_from_key
+
+
+# packed quantities: int, long and float as themselves, Decimal as its
+# string, SigFig as its (sign, coefficient, ndigits, power) fields and dne
+# as None; anything else is sent as is
+
+def pack_quantity(q):
+    if isinstance(q, SigFig):
+        return (q.sign, q.coefficient, q.ndigits, q.power)
+    if isinstance(q, Decimal):
+        return str(q)
+    if q is dne:
+        return None
+    return q
+
+def unpack_quantity(q):
+    if isinstance(q, tuple):
+        return SigFig.from_coefficient(*q)
+    if isinstance(q, str):
+        return Decimal(q)
+    if q is None:
+        return dne
+    return q
+
+
+class UnitTable(object):
+    '''The distinct units of a chunk, by index
+    '''
+
+    def __init__(self):
+        self.keys = []
+        self.indices = {}
+
+    def index(self, unit):
+        # by identity, as keys keep the written form of a unit
+        try:
+            return self.indices[id(unit)][1]
+        except KeyError:
+            index = len(self.keys)
+            self.keys.append(unit_key(unit))
+            self.indices[id(unit)] = unit, index
+            return index
+
+def pack_physnums(nums):
+    table = UnitTable()
+    packed = [(table.index(num.unit), pack_quantity(num.quantity), num.name)
+              for num in nums]
+    return table.keys, packed
+
+def unpack_physnums(unit_keys, packed):
+    units = map(unit_from_key, unit_keys)
+    return [PhysNum.from_fields(unpack_quantity(q), units[i], name) for i,q,name in packed]
+
+
+def convert_chunk(args):
+    to_key, unit_keys, packed = args
+    from .convert import convert_many
+    results = convert_many(unpack_physnums(unit_keys, packed), unit_from_key(to_key))
+    return pack_physnums(results)
+
+def warm_worker(to_key, unit_keys):
+    '''Pool initializer resolving the units and compiling the convertion
+       plans of the first chunk, so that the timed work starts warm.
+       Best-effort: a worker that fails in its initializer is respawned
+       and fails again, so errors are left to convert_chunk to raise
+       through the pool.
+    '''
+    from .convert import convertion_plan
+    try:
+        to_unit = unit_from_key(to_key)
+    except Exception:
+        return
+    for key in unit_keys:
+        try:
+            unit = unit_from_key(key)
+            if unit != to_unit:
+                convertion_plan(unit, to_unit)
+        except Exception:
+            pass
+
+def iter_chunks(values, chunksize):
+    values = iter(values)
+    while True:
+        chunk = list(islice(values, chunksize))
+        if not chunk:
+            break
+        yield pack_physnums([num if isinstance(num, PhysNum) else as_physnum(num)
+                             for num in chunk])
+
+def map_convert(values, to_unit, processes=None, chunksize=2000):
+    '''Convert each of values to to_unit, as convert_many, on a
+       multiprocessing pool of processes workers (by default, one per
+       cpu); returns the list of converted PhysNums in order
+    '''
+    from multiprocessing import Pool
+    to_unit = as_unit(to_unit)
+    to_key = unit_key(to_unit)
+    chunks = iter_chunks(values, chunksize)
+    try:
+        first = chunks.next()
+    except StopIteration:
+        return []
+    pool = Pool(processes, warm_worker, (to_key, first[0]))
+    try:
+        results = []
+        def tasks():
+            yield to_key, first[0], first[1]
+            for unit_keys, packed in chunks:
+                yield to_key, unit_keys, packed
+        for unit_keys, packed in pool.imap(convert_chunk, tasks()):
+            results.extend(unpack_physnums(unit_keys, packed))
+        pool.close()
+    finally:
+        pool.terminate()
+        pool.join()
+    return results
@@ -5,11 +5,18 @@ from __future__ import division
 from __future__ import absolute_import
 
 import re
+import operator
 from decimal import Decimal
 from functools import partial
 
+try:
+    import numpy
+except ImportError:
+    numpy = None
+else:
+    from .sigfigarray import SigFigArray, max_digits as max_array_digits
+
 from hlab.bases import AutoRepr
-from hlab.memorize import memorize
 
 from jamenson.runtime import atypes
 from jamenson.runtime.atypes import anytype, as_optimized_type, typep, Seq, as_type
@@ -17,17 +24,21 @@ from jamenson.runtime.multimethod import defmethod, MultiMethod
 from jamenson.runtime.as_string import as_string
 
 from . import algebra as A
-from .sigfig import SigFig
-from .ratio import Ratio, as_ratio
+from .cache import lru_cache
+from .sigfig import SigFig, literal_fields
+from .ratio import Ratio, as_ratio, affine_decimal
 from .dne import DNEType, dne
-from .units import as_unit, BaseUnit, ex_parse_unit, dimensionless
+from .units import as_unit, BaseUnit, PrimitiveUnit, ex_parse_unit, dimensionless, \
+     primunit_to_compound
 
 name_type = as_optimized_type((str,unicode,type(None)))
-lossless_number_type = as_optimized_type((int,long,Ratio,Decimal,SigFig,DNEType))
+lossless_number_type = A.class_type((int,long,Ratio,Decimal,SigFig,DNEType))
 
 
 class PhysNum(A.DivAlgebraBase, AutoRepr):
 
+    __slots__ = ['quantity', 'unit', 'name']
+
     def __init__(self, quantity, unit=None, name=None):
         assert typep(quantity, lossless_number_type), \
                'bad quantity %r(%s)' % (quantity, type(quantity).__name__)
@@ -36,6 +47,22 @@ class PhysNum(A.DivAlgebraBase, AutoRepr):
         assert typep(name, name_type)
         self.name = name
 
+    @classmethod
+    def from_fields(cls, quantity, unit, name=None):
+        '''Construct without checking or coercing the fields; unit must
+           already be a unit
+        '''
+        self = object.__new__(cls)
+        self.quantity = quantity
+        self.unit = unit
+        self.name = name
+        return self
+
+    def __reduce__(self):
+        if self.name is None:
+            return load_physnum, (self.quantity, self.unit)
+        return load_physnum, (self.quantity, self.unit, self.name)
+
     def repr_args(self):
         yield self.quantity
         if self.unit != dimensionless:
@@ -46,12 +73,19 @@ class PhysNum(A.DivAlgebraBase, AutoRepr):
             yield self.name
 
     def __str__(self):
+        return ' '.join(map(str, self.str_parts()))
+
+    def __unicode__(self):
+        # names may be non-ascii unicode
+        return u' '.join(map(unicode, self.str_parts()))
+
+    def str_parts(self):
         parts = [self.quantity]
         if self.unit != dimensionless:
             parts.append(self.unit)
         if self.name is not None:
             parts.append(self.name)
-        return ' '.join(map(str, parts))
+        return parts
 
     def __hash__(self):
         if self.unit==dimensionless and not self.name:
@@ -71,6 +105,9 @@ class PhysNum(A.DivAlgebraBase, AutoRepr):
                 self.__class__(q_neg, u_neg)]
 
 
+def load_physnum(quantity, unit, name=None):
+    return PhysNum.from_fields(quantity, unit, name)
+
 as_physnum = MultiMethod('as_physnum')
 
 @defmethod(as_physnum, [PhysNum])
@@ -89,12 +126,48 @@ def meth(s):
 def meth(u):
     return as_physnum(str(u))
 
-@memorize
+# number literal with optional 's' (SigFig) and 'd' (Decimal) suffixes,
+# followed by the unit and name
+physical_number_re = re.compile(r'''
+    \s* (?P<number> (?P<sign>[+-])? (?P<whole>\d*) (?P<dot>\.)? (?P<fraction>\d*)
+                    (?: [eE] (?P<exp>[+-]?\d+) )? )
+    (?P<suffix> s?d? )
+    (?: \s+ (?P<rest>.*?) )? \s* \Z
+''', re.X | re.S)
+
+@lru_cache('physnum.parse_physical_number', maxsize=4096)
 def parse_physical_number(bytes, quantity_class=None, create_unit=False):
+    quantity_class, number, rest = scan_physical_number(bytes, quantity_class)
+    unit, name = parse_unit_and_name(rest, create_unit)
+    return PhysNum(make_quantity(quantity_class, number), unit, name)
+
+def scan_physical_number(bytes, quantity_class=None):
+    '''Scan a physical number literal, returning the quantity class, the
+       number (SigFig fields if already scanned for SigFig, otherwise a
+       string), and the text of the unit and name
+    '''
+    match = physical_number_re.match(bytes)
+    if match is None or not (match.group('whole') or match.group('fraction')):
+        return split_physical_number(bytes, quantity_class)
+    suffix = match.group('suffix')
+    if suffix.endswith('d'):
+        quantity_class = quantity_class or Decimal
+    if suffix.startswith('s'):
+        quantity_class = quantity_class or SigFig
+    if quantity_class is None:
+        quantity_class = int if not (match.group('dot') or match.group('exp')) else Decimal
+    if quantity_class is SigFig:
+        number = literal_fields(*match.group('sign', 'whole', 'dot', 'fraction', 'exp'))
+    else:
+        number = match.group('number')
+    return quantity_class, number, match.group('rest')
+
+def split_physical_number(bytes, quantity_class=None):
+    '''Scan literals that aren't plain numbers by splitting off the first
+       word
+    '''
     parts = bytes.strip().split(None, 1)
     number, rest = (parts if len(parts)==2 else (parts[0], ''))
-    unit,extra = ex_parse_unit(rest, create=create_unit) if rest else (dimensionless, None)
-    name = extra and extra.strip()
     if number.endswith('d'):
         number = number[:-1]
         quantity_class = quantity_class or Decimal
@@ -103,9 +176,100 @@ def parse_physical_number(bytes, quantity_class=None, create_unit=False):
         quantity_class = quantity_class or SigFig
     if quantity_class is None:
         quantity_class = int if not re.search('[.eE]', number) else Decimal
-    return PhysNum(quantity_class(number), unit, name)
+    return quantity_class, number, rest
+
+def make_quantity(quantity_class, number):
+    if isinstance(number, tuple):
+        return SigFig.from_coefficient(*number)
+    return quantity_class(number)
 
-@defmethod(A.mm_eq, [PhysNum, PhysNum])
+def parse_unit_and_name(rest, create_unit=False):
+    unit,extra = ex_parse_unit(rest, create=create_unit) if rest else (dimensionless, None)
+    return unit, extra and extra.strip()
+
+def parse_physical_numbers(lines, quantity_class=None, create_unit=False):
+    '''Parse the physical number on each non-blank line, returning the
+       quantities, units, and names as PhysicalNumberColumns
+    '''
+    classes = set()
+    quantities = []
+    units = []
+    names = []
+    for line in lines:
+        if not line.strip():
+            continue
+        cls, number, rest = scan_physical_number(line, quantity_class)
+        unit, name = parse_unit_and_name(rest, create_unit)
+        if not isinstance(number, tuple):
+            number = make_quantity(cls, number)
+            if isinstance(number, SigFig):
+                number = (number.sign, number.coefficient, number.ndigits, number.power)
+        classes.add(cls)
+        quantities.append(number)
+        units.append(unit)
+        names.append(name)
+    return PhysicalNumberColumns(quantity_column(classes, quantities), units, names)
+
+def quantity_column(classes, quantities):
+    '''Store quantities as a SigFigArray or quantity array when numpy is
+       available and they are of one kind, otherwise as a list
+    '''
+    if classes == set([SigFig]):
+        if numpy is not None and all(ndigits <= max_array_digits
+                                     for sign, coefficient, ndigits, power in quantities):
+            sign, coefficient, ndigits, power = zip(*quantities)
+            return SigFigArray.from_fields(sign, coefficient, power, ndigits)
+        return [SigFig.from_coefficient(*quantity) for quantity in quantities]
+    if SigFig in classes:
+        return [SigFig.from_coefficient(*quantity) if isinstance(quantity, tuple) else quantity
+                for quantity in quantities]
+    if numpy is not None and classes <= set([int, long, Decimal]) and quantities:
+        return as_quantity_array(quantities)
+    return quantities
+
+
+class PhysicalNumberColumns(AutoRepr):
+    '''Parsed physical numbers stored as columns of quantities, units,
+       and names
+    '''
+
+    def __init__(self, quantities, units, names):
+        self.quantities = quantities
+        self.units = units
+        self.names = names
+
+    def repr_args(self):
+        yield self.quantities
+        yield self.units
+        yield self.names
+
+    def __len__(self):
+        return len(self.units)
+
+    def __getitem__(self, index):
+        quantity = self.quantities[index]
+        if numpy is not None:
+            quantity = scalar_quantity(quantity)
+        return PhysNum(quantity, self.units[index], self.names[index])
+
+    def __iter__(self):
+        for i in xrange(len(self)):
+            yield self[i]
+
+    def to_array(self, unit=None, name=None):
+        '''Returns the quantities as a PhysNumArray in unit (by default
+           the first unit), converting those in other units
+        '''
+        if unit is None and self.units:
+            unit = self.units[0]
+        unit = as_unit(unit)
+        if all(u is unit for u in self.units):
+            return PhysNumArray(self.quantities, unit, name)
+        return PhysNumArray.from_physnums([PhysNum(pn.quantity, pn.unit) for pn in self],
+                                          unit, name)
+
+
+@A.defmethod(A.mm_eq, [PhysNum, PhysNum])
 def meth(a, b):
     return (self.quantity == other.quantity and
             self.unit == other.unit and
@@ -117,18 +281,18 @@ def meth(p, o):
         return NotImplemented
     return p.quantity == o
 
-@defmethod(A.mm_neg, [PhysNum])
+@A.defmethod(A.mm_neg, [PhysNum])
 def meth(p):
     return PhysNum(-p.quantity, p.unit)
 
-@defmethod(A.mm_pow, [PhysNum, (int,long)])
+@A.defmethod(A.mm_pow, [PhysNum, (int,long)])
 def meth(p,pow):
     return PhysNum((as_ratio(p.quantity)**pow
                              if pow < 0 and isinstance(p, (int,long)) else
                           p.quantity) ** pow,
                        p.unit**pow)
 
-@defmethod(A.mm_mul, [PhysNum, PhysNum])
+@A.defmethod(A.mm_mul, [PhysNum, PhysNum])
 def meth(a, b):
     return PhysNum(a.quantity * b.quantity, a.unit * b.unit)
 
@@ -141,15 +305,15 @@ def xdiv(a, b):
         return a/b
     except ZeroDivisionError:
         return dne
-@defmethod(A.mm_div, [PhysNum, PhysNum])
+@A.defmethod(A.mm_div, [PhysNum, PhysNum])
 def meth(a, b):
     return PhysNum(xdiv(a.quantity, b.quantity), a.unit / b.unit)
 
-@defmethod(A.mm_div, [PhysNum, lossless_number_type])
+@A.defmethod(A.mm_div, [PhysNum, lossless_number_type])
 def meth(p, a):
     return PhysNum(xdiv(p.quantity, a), p.unit)
 
-@defmethod(A.mm_div, [anytype, PhysNum])
+@A.defmethod(A.mm_div, [anytype, PhysNum])
 def meth(a, p):
     return PhysNum(xdiv(a, p.quantity), p.unit ** -1)
 
@@ -163,7 +327,7 @@ def add_dimensionless_check(p, other):
         raise ValueError("cannot add/subtract dimensionless %s and dimensional %s" % (other, p))
     return dimensionless
 
-@defmethod(A.mm_add, [PhysNum, PhysNum])
+@A.defmethod(A.mm_add, [PhysNum, PhysNum])
 def meth(a, b):
     return PhysNum(a.quantity + b.quantity, add_unit_check('add', a, b))
 
@@ -171,23 +335,384 @@ def meth(a, b):
 def meth(p, a):
     return PhysNum(p.quantity + a, add_dimensionless_check(p, a))
 
-@defmethod(A.mm_sub, [PhysNum, PhysNum])
+@A.defmethod(A.mm_sub, [PhysNum, PhysNum])
 def meth(a, b):
     return PhysNum(a.quantity - b.quantity, add_unit_check('sub', a, b))
 
-@defmethod(A.mm_sub, [PhysNum, lossless_number_type])
+@A.defmethod(A.mm_sub, [PhysNum, lossless_number_type])
 def meth(p, a):
     return PhysNum(p.quantity - a, add_dimensionless_check(p, a))
 
-@defmethod(A.mm_sub, [anytype, PhysNum])
+@A.defmethod(A.mm_sub, [anytype, PhysNum])
 def meth(a, p):
     return PhysNum(a - p.quantity, add_dimensionless_check(p, a))
 
-@defmethod(A.mm_pow, [PhysNum, (Decimal, int, long)])
+@A.defmethod(A.mm_pow, [PhysNum, (Decimal, int, long)])
 def meth(p, po):
     return PhysNum(p.quantity ** po, p.unit ** po)
 
 
+# # # # # # # # # # # # # # # #
+# Arrays of Physical Numbers  #
+# # # # # # # # # # # # # # # #
+
+array_scalar_type = A.class_type(tuple(filter(None, (int,long,float,Decimal,Ratio,
+                                                     A.numpy_number_type))))
+
+class PhysNumArray(A.DivAlgebraBase, AutoRepr):
+    '''Many quantities sharing one unit and name, stored as a numpy array
+       of float64, int64, or object (Decimal) dtype, or as a SigFigArray
+       for measurements with significant figures. Arithmetic performs
+       the unit algebra once per operation. Elements resulting from
+       division by zero do not exist and are flagged in dne_mask.
+    '''
+
+    # defer numpy operations with arrays and numpy scalars to our methods
+    __array_ufunc__ = None
+
+    def __init__(self, quantities, unit=None, name=None, dne_mask=None):
+        if numpy is None:
+            raise ImportError('PhysNumArray requires numpy')
+        self.quantities = as_quantity_array(quantities)
+        self.unit = as_unit(unit)
+        assert typep(name, name_type)
+        self.name = name
+        if isinstance(self.quantities, SigFigArray):
+            dne_mask = combine_masks(dne_mask, self.quantities.dne_mask)
+        if dne_mask is not None:
+            dne_mask = numpy.asarray(dne_mask, dtype=bool)
+            if not dne_mask.any():
+                dne_mask = None
+            elif dne_mask.shape != self.quantities.shape:
+                dne_mask = dne_mask | numpy.zeros(self.quantities.shape, dtype=bool)
+        self.dne_mask = dne_mask
+
+    @classmethod
+    def from_physnums(cls, physnums, unit=None, name=None):
+        '''Collect PhysNums having equal units into an array, or convert
+           them to unit if given
+        '''
+        physnums = map(as_physnum, physnums)
+        if unit is None:
+            if not physnums:
+                raise ValueError('no unit for empty sequence of physical numbers')
+            unit = physnums[0].unit
+        else:
+            unit = as_unit(unit)
+        if any(pn.unit != unit for pn in physnums):
+            from .convert import convert
+            physnums = [convert(pn, unit) for pn in physnums]
+        quantities = [pn.quantity for pn in physnums]
+        dne_mask = [q is dne for q in quantities]
+        quantities = [0 if q is dne else array_element(q) for q in quantities]
+        if name is None and physnums:
+            name = physnums[0].name
+        return cls(numpy.array(quantities), unit, name, dne_mask)
+
+    def repr_args(self):
+        yield self.quantities
+        if self.unit != dimensionless:
+            yield self.unit
+        if self.name is not None:
+            if self.unit == dimensionless:
+                yield None
+            yield self.name
+
+    def __str__(self):
+        quantities = self.quantities
+        if self.dne_mask is not None:
+            quantities = numpy.array2string(numpy.where(self.dne_mask, dne, object_array(quantities)),
+                                            formatter={'all': str})
+        parts = [quantities]
+        if self.unit != dimensionless:
+            parts.append(self.unit)
+        if self.name is not None:
+            parts.append(self.name)
+        return ' '.join(map(str, parts))
+
+    @property
+    def dtype(self):
+        '''numpy dtype of the quantities, or SigFig for a SigFigArray
+        '''
+        if isinstance(self.quantities, SigFigArray):
+            return SigFig
+        return self.quantities.dtype
+
+    @property
+    def shape(self):
+        return self.quantities.shape
+
+    def __len__(self):
+        return len(self.quantities)
+
+    def __getitem__(self, index):
+        quantity = self.quantities[index]
+        mask = self.dne_mask[index] if self.dne_mask is not None else None
+        if isinstance(quantity, (numpy.ndarray, SigFigArray)):
+            return self.__class__(quantity, self.unit, self.name, mask)
+        return PhysNum(dne if mask else scalar_quantity(quantity), self.unit, self.name)
+
+    def __iter__(self):
+        for i in xrange(len(self)):
+            yield self[i]
+
+    def to_physnums(self):
+        return list(self)
+
+    def with_quantities(self, quantities, unit=None, dne_mask=None):
+        return self.__class__(quantities, self.unit if unit is None else unit,
+                              self.name, dne_mask)
+
+    def affine_transform(self, scale, offset, unit):
+        '''Returns the array with quantities scale * q + offset in unit
+        '''
+        if isinstance(scale, Ratio) and quantity_kind(self.quantities) in 'iO':
+            # exact quantities are rounded once, as a single PhysNum is
+            quantities = numpy.empty(self.quantities.shape, dtype=object)
+            quantities.flat[:] = [affine_decimal(scalar_quantity(q), scale, offset)
+                                  for q in self.quantities.flat]
+            return self.with_quantities(quantities, unit, self.dne_mask)
+        quantities, scale = coerce_quantities(self.quantities, scale)
+        quantities = quantities * scale
+        if offset:
+            quantities, offset = coerce_quantities(quantities, offset)
+            quantities = quantities + offset
+        return self.with_quantities(quantities, unit, self.dne_mask)
+
+
+def as_quantity_array(quantities):
+    if isinstance(quantities, SigFigArray):
+        return quantities
+    array = numpy.asarray(quantities)
+    kind = array.dtype.kind
+    if kind == 'f':
+        return array.astype(numpy.float64, copy=False)
+    if kind in 'iub':
+        return array.astype(numpy.int64, copy=False)
+    if kind == 'O':
+        if any(isinstance(op, SigFig) for op in array.flat):
+            return SigFigArray(array.flat)
+        return decimal_array(array)
+    raise TypeError('bad quantity array dtype %s' % (array.dtype,))
+
+def as_decimal(op):
+    if isinstance(op, Decimal):
+        return op
+    if isinstance(op, (int,long)) or (numpy is not None and isinstance(op, numpy.integer)):
+        return Decimal(int(op))
+    if isinstance(op, Ratio):
+        return op.as_decimal()
+    raise TypeError('bad quantity %r(%s)' % (op, type(op).__name__))
+
+def decimal_array(array):
+    if array.dtype.kind == 'O' and all(isinstance(op, Decimal) for op in array.flat):
+        return array
+    decimals = numpy.empty(array.shape, dtype=object)
+    decimals.flat[:] = [as_decimal(op) for op in array.flat]
+    return decimals
+
+def object_array(quantities):
+    if isinstance(quantities, SigFigArray):
+        objects = numpy.empty(quantities.shape, dtype=object)
+        objects[:] = list(quantities)
+        return objects
+    return quantities.astype(object)
+
+def array_element(quantity):
+    if isinstance(quantity, Ratio):
+        return as_decimal(quantity)
+    if not isinstance(quantity, (int,long,Decimal,SigFig)):
+        raise TypeError('bad quantity for array %r(%s)' % (quantity, type(quantity).__name__))
+    return quantity
+
+def scalar_quantity(quantity):
+    '''Convert an element of a quantity array to a lossless scalar
+    '''
+    if isinstance(quantity, numpy.floating):
+        return Decimal(repr(float(quantity)))
+    if isinstance(quantity, numpy.integer):
+        return int(quantity)
+    return quantity
+
+def quantity_kind(op):
+    if isinstance(op, (SigFigArray, SigFig)):
+        return 's'
+    if isinstance(op, numpy.ndarray):
+        return op.dtype.kind
+    if isinstance(op, (float, numpy.floating)):
+        return 'f'
+    if isinstance(op, (int, long, numpy.integer)):
+        return 'i'
+    if isinstance(op, (Decimal, Ratio)):
+        return 'O'
+    raise TypeError('bad quantity for array %r(%s)' % (op, type(op).__name__))
+
+def as_quantity_kind(op, kind):
+    if kind == 's':
+        # SigFig operations take exact int and Decimal operands
+        return as_decimal(op) if isinstance(op, Ratio) else op
+    if isinstance(op, numpy.ndarray):
+        if kind == 'f':
+            return op.astype(numpy.float64, copy=False)
+        if kind == 'O':
+            return decimal_array(op)
+        return op
+    if kind == 'f':
+        return float(op)
+    if kind == 'O':
+        return as_decimal(op)
+    return op
+
+def coerce_quantities(a, b):
+    '''Bring a pair of quantity arrays and/or scalars to a common dtype;
+       float64 if either is floating, else Decimal if either is Decimal
+       (or Ratio), else int64. SigFig quantities combine with exact ones.
+    '''
+    kinds = quantity_kind(a) + quantity_kind(b)
+    if 's' in kinds and 'f' in kinds:
+        raise TypeError('cannot combine SigFig and floating quantities')
+    kind = 's' if 's' in kinds else 'f' if 'f' in kinds else 'O' if 'O' in kinds else 'i'
+    return as_quantity_kind(a, kind), as_quantity_kind(b, kind)
+
+def combine_masks(*masks):
+    masks = [mask for mask in masks if mask is not None]
+    if not masks:
+        return None
+    return reduce(operator.or_, masks)
+
+def array_operand(op):
+    '''Returns the quantities and dne mask of an operand to array arithmetic
+    '''
+    if isinstance(op, PhysNumArray):
+        return op.quantities, op.dne_mask
+    if isinstance(op, PhysNum):
+        op = op.quantity
+    if op is dne:
+        return 0, True
+    return op, None
+
+def array_add(verb, a, b, unit):
+    (qa, ma), (qb, mb) = map(array_operand, [a, b])
+    qa, qb = coerce_quantities(qa, qb)
+    op = operator.add if verb == 'add' else operator.sub
+    return PhysNumArray(op(qa, qb), unit, None, combine_masks(ma, mb))
+
+def array_mul(a, b, unit):
+    (qa, ma), (qb, mb) = map(array_operand, [a, b])
+    qa, qb = coerce_quantities(qa, qb)
+    return PhysNumArray(qa * qb, unit, None, combine_masks(ma, mb))
+
+def array_div(a, b, unit):
+    (qa, ma), (qb, mb) = map(array_operand, [a, b])
+    qa, qb = coerce_quantities(qa, qb)
+    zero = numpy.asarray(qb == 0)
+    if zero.any():
+        if isinstance(qb, SigFigArray):
+            qb = qb.replace(zero, 1)
+        else:
+            qb = numpy.where(zero, 1, qb)
+        if isinstance(qb, numpy.ndarray) and qb.dtype.kind == 'O':
+            qb = decimal_array(qb)
+    else:
+        zero = None
+    return PhysNumArray(qa / qb, unit, None, combine_masks(ma, mb, zero))
+
+def array_unit(op):
+    return op.unit if isinstance(op, (PhysNum, PhysNumArray)) else dimensionless
+
+def array_add_unit_check(verb, a, b):
+    if array_unit(a) != array_unit(b):
+        raise ValueError("cannot %s %s and %s; units are incompatible" % (verb,a,b))
+    return array_unit(a)
+
+@A.defmethod(A.mm_neg, [PhysNumArray])
+def meth(p):
+    return PhysNumArray(-p.quantities, p.unit, None, p.dne_mask)
+
+@A.defmethod(A.mm_abs, [PhysNumArray])
+def meth(p):
+    return PhysNumArray(abs(p.quantities), p.unit, None, p.dne_mask)
+
+@A.defmethod(A.mm_pow, [PhysNumArray, (int,long)])
+def meth(p, power):
+    quantities = p.quantities
+    mask = p.dne_mask
+    if isinstance(quantities, SigFigArray):
+        raise TypeError('pow not implemented for SigFig quantities')
+    if power < 0:
+        if quantities.dtype.kind == 'i':
+            quantities = quantities.astype(numpy.float64)
+        zero = quantities == 0
+        if zero.any():
+            quantities = numpy.where(zero, 1, quantities)
+            mask = combine_masks(mask, zero)
+    return PhysNumArray(quantities ** power, p.unit ** power, None, mask)
+
+@A.defmethod(A.mm_mul, [PhysNumArray, PhysNumArray])
+def meth(a, b):
+    return array_mul(a, b, a.unit * b.unit)
+
+@A.defboth_mm_mul([PhysNumArray, PhysNum])
+def meth(a, p):
+    return array_mul(a, p, a.unit * p.unit)
+
+@A.defboth_mm_mul([PhysNumArray, array_scalar_type])
+def meth(a, s):
+    return array_mul(a, s, a.unit)
+
+@A.defmethod(A.mm_div, [PhysNumArray, PhysNumArray])
+def meth(a, b):
+    return array_div(a, b, a.unit / b.unit)
+
+@A.defmethod(A.mm_div, [PhysNumArray, PhysNum])
+def meth(a, p):
+    return array_div(a, p, a.unit / p.unit)
+
+@A.defmethod(A.mm_div, [PhysNum, PhysNumArray])
+def meth(p, a):
+    return array_div(p, a, p.unit / a.unit)
+
+@A.defmethod(A.mm_div, [PhysNumArray, array_scalar_type])
+def meth(a, s):
+    return array_div(a, s, a.unit)
+
+@A.defmethod(A.mm_div, [array_scalar_type, PhysNumArray])
+def meth(s, a):
+    return array_div(s, a, a.unit ** -1)
+
+@A.defmethod(A.mm_add, [PhysNumArray, PhysNumArray])
+def meth(a, b):
+    return array_add('add', a, b, array_add_unit_check('add', a, b))
+
+@A.defboth_mm_add([PhysNumArray, PhysNum])
+def meth(a, p):
+    return array_add('add', a, p, array_add_unit_check('add', a, p))
+
+@A.defboth_mm_add([PhysNumArray, array_scalar_type])
+def meth(a, s):
+    return array_add('add', a, s, array_add_unit_check('add', a, s))
+
+@A.defmethod(A.mm_sub, [PhysNumArray, PhysNumArray])
+def meth(a, b):
+    return array_add('sub', a, b, array_add_unit_check('sub', a, b))
+
+@A.defmethod(A.mm_sub, [PhysNumArray, PhysNum])
+def meth(a, p):
+    return array_add('sub', a, p, array_add_unit_check('sub', a, p))
+
+@A.defmethod(A.mm_sub, [PhysNum, PhysNumArray])
+def meth(p, a):
+    return array_add('sub', p, a, array_add_unit_check('sub', p, a))
+
+@A.defmethod(A.mm_sub, [PhysNumArray, array_scalar_type])
+def meth(a, s):
+    return array_add('sub', a, s, array_add_unit_check('sub', a, s))
+
+@A.defmethod(A.mm_sub, [array_scalar_type, PhysNumArray])
+def meth(s, a):
+    return array_add('sub', s, a, array_add_unit_check('sub', s, a))
+
+
 # # # # # # # # # #
 # Algebric Types  #
 # # # # # # # # # #
@@ -1,26 +1,85 @@
 
 from __future__ import division
+from __future__ import absolute_import
+
+from decimal import Decimal
+from fractions import Fraction
+
+try:
+    from math import gcd
+except ImportError:
+    from fractions import gcd
 
 from hlab.bases import AutoRepr
 from jamenson.runtime.multimethod import defmethod, MultiMethod
 
 from . import algebra as A
+from .sigfig import SigFig
 
 
 def gcf(a, b=0):
-    while b!=0:
-        a,b = b, a - b*(a//b)
-    return a
+    return abs(gcd(a, b))
 
 class Ratio(AutoRepr, A.DivAlgebraBase):
+    '''Exact rational number, always kept in lowest terms with a positive
+       denominator
+    '''
+
+    __slots__ = ['num', 'den']
 
     def __init__(self, num, den=None):
         if den is None:
             den = 1
         assert isinstance(num, (int,long))
         assert isinstance(den, (int,long))
+        if den == 0:
+            raise ZeroDivisionError('Ratio(%d, 0)' % (num,))
+        if den != 1:
+            f = gcf(num, den)
+            if den < 0:
+                f = -f
+            num,den = num // f, den // f
+        self.num = num
+        self.den = den
+
+    @classmethod
+    def from_lowest_terms(cls, num, den=1):
+        '''Construct without normalizing; num and den must already be
+           coprime with den positive
+        '''
+        self = object.__new__(cls)
         self.num = num
         self.den = den
+        return self
+
+    @classmethod
+    def from_decimal(cls, d):
+        sign, digits, exp = d.as_tuple()
+        if not isinstance(exp, (int,long)):
+            raise ValueError('cannot convert %s to a Ratio' % (d,))
+        num = int(''.join(map(str, digits)))
+        if sign:
+            num = -num
+        if exp >= 0:
+            return cls.from_lowest_terms(num * 10**exp)
+        return cls(num, 10**-exp)
+
+    @classmethod
+    def from_sigfig(cls, s):
+        num = -s.coefficient if s.sign else s.coefficient
+        exp = s.power - s.ndigits + 1
+        if exp >= 0:
+            return cls.from_lowest_terms(num * 10**exp)
+        return cls(num, 10**-exp)
+
+    @classmethod
+    def from_fraction(cls, f):
+        return cls.from_lowest_terms(f.numerator, f.denominator)
+
+    def __reduce__(self):
+        if self.den == 1:
+            return load_ratio, (self.num,)
+        return load_ratio, (self.num, self.den)
 
     def repr_args(self):
         yield self.num
@@ -30,23 +89,67 @@ class Ratio(AutoRepr, A.DivAlgebraBase):
     def __str__(self):
         return '%d/%d' % (self.num, self.den)
 
+    def __hash__(self):
+        if self.den == 1:
+            return hash(self.num)
+        return hash((self.num, self.den))
+
     def normalized(self):
-        f = gcf(self.num, self.den)
-        if f==1:
-            return self
-        num,den = self.num // f, self.den // f
-        if den<0:
-            num,den = -num,-den
-        return self.__class__(num, den)
+        return self
+
+    def __nonzero__(self):
+        return self.num != 0
 
     def __float__(self):
         return self.num / self.den
 
     def __int__(self):
-        r = self.normalized()
-        if r.den != 1:
+        if self.den != 1:
             raise ValueError("cannot coere %s to an integer" % (self,))
-        return r.num
+        return self.num
+
+    def as_decimal(self):
+        '''Exact when the denominator only has factors of 2 and 5, else
+           rounded to the current decimal context
+        '''
+        return Decimal(self.num) / Decimal(self.den)
+
+    def as_sigfig(self):
+        return SigFig(self.as_decimal())
+
+    def as_fraction(self):
+        return Fraction(self.num, self.den)
+
+def load_ratio(num, den=1):
+    return Ratio.from_lowest_terms(num, den)
+
+def affine_decimal(q, scale, offset=0):
+    '''q * scale + offset for an int or Decimal q and exact scale and
+       offset, rounded once to the current decimal context.  An exact
+       result has the exponent of q (0 for an int q or a non-negative
+       exponent), or the fewest further fractional digits that represent
+       it exactly (e.g. 1 * 1/4 gives 0.25); an inexact result has the
+       full precision of the context.
+    '''
+    scale, offset = as_ratio(scale), as_ratio(offset)
+    den = scale.den * offset.den // gcf(scale.den, offset.den)
+    a = scale.num * (den // scale.den)
+    b = offset.num * (den // offset.den)
+    if isinstance(q, Decimal):
+        sign, digits, exp = q.as_tuple()
+        if not isinstance(exp, (int,long)):
+            raise ValueError('cannot transform %s exactly' % (q,))
+        m = int(''.join(map(str, digits)))
+        if sign:
+            m = -m
+        if exp < 0:
+            n = m * a + b * 10**-exp
+            p = Decimal((int(n < 0), map(int, str(abs(n))), exp))
+        else:
+            p = Decimal(m * 10**exp * a + b)
+    else:
+        p = Decimal(q * a + b)
+    return p / Decimal(den)
 
 
 as_ratio = MultiMethod('as_ratio')
@@ -57,59 +160,75 @@ def meth(r):
 
 @defmethod(as_ratio, [(int,long)])
 def meth(i):
-    return Ratio(i)
+    return Ratio.from_lowest_terms(i)
+
+@defmethod(as_ratio, [Decimal])
+def meth(d):
+    return Ratio.from_decimal(d)
+
+@defmethod(as_ratio, [SigFig])
+def meth(s):
+    return Ratio.from_sigfig(s)
+
+@defmethod(as_ratio, [Fraction])
+def meth(f):
+    return Ratio.from_fraction(f)
 
-@defmethod(A.mm_eq, [Ratio, Ratio])
+@A.defmethod(A.mm_eq, [Ratio, Ratio])
 def meth(a, b):
-    if a is b:
-        return True
-    a = a.normalized()
-    b = b.normalized()
     return a.num==b.num and a.den==b.den
 
 @A.defboth_mm_eq([Ratio, (int,long)])
 def meth(r, i):
-    r = r.normalized()
     return r.den==1 and r.num==i
 
-@defmethod(A.mm_neg, [Ratio])
+@A.defmethod(A.mm_neg, [Ratio])
 def meth(r):
-    return Ratio(-r.num, r.den)
+    return Ratio.from_lowest_terms(-r.num, r.den)
 
 @A.defboth_mm_add([Ratio, Ratio])
 def meth(a, b):
+    if a.den == b.den:
+        return Ratio(a.num + b.num, a.den)
     return Ratio(a.num * b.den + b.num * a.den,
                  a.den * b.den)
 
 @A.defboth_mm_add([Ratio, (int,long)])
 def meth(r, i):
-    return Ratio(r.num + i * r.den, r.den)
+    return Ratio.from_lowest_terms(r.num + i * r.den, r.den)
 
 @A.defboth_mm_mul([Ratio, Ratio])
 def meth(a, b):
-    return Ratio(a.num*b.num, a.den*b.den)
+    # cancel across the two factors so the products are already coprime
+    f1 = gcf(a.num, b.den)
+    f2 = gcf(b.num, a.den)
+    return Ratio.from_lowest_terms((a.num // f1) * (b.num // f2),
+                                   (a.den // f2) * (b.den // f1))
 
 @A.defboth_mm_mul([Ratio, (int,long)])
 def meth(r, i):
-    return Ratio(r.num * i, r.den)
+    f = gcf(i, r.den)
+    return Ratio.from_lowest_terms(r.num * (i // f), r.den // f)
 
-@defmethod(A.mm_pow, [Ratio, (int,long)])
+@A.defmethod(A.mm_pow, [Ratio, (int,long)])
 def meth(r, i):
-    return Ratio(r.num**i, r.den**i) if i>1 else Ratio(r.den**-i, r.num**-i)
+    if i >= 0:
+        return Ratio.from_lowest_terms(r.num**i, r.den**i)
+    return Ratio(r.den**-i, r.num**-i)
 
-@defmethod(A.mm_sub, [Ratio, (int,long,Ratio)])
-@defmethod(A.mm_sub, [(int,long,Ratio), Ratio])
+@A.defmethod(A.mm_sub, [Ratio, (int,long,Ratio)])
+@A.defmethod(A.mm_sub, [(int,long,Ratio), Ratio])
 def meth(a, b):
     return a + -b
 
-@defmethod(A.mm_div, [Ratio, Ratio])
+@A.defmethod(A.mm_div, [Ratio, Ratio])
 def meth(a, b):
     return a * b ** -1
 
-@defmethod(A.mm_div, [Ratio, (int,long)])
+@A.defmethod(A.mm_div, [Ratio, (int,long)])
 def meth(r, i):
-    return Ratio(r.num, r.div * i)
+    return Ratio(r.num, r.den * i)
 
-@defmethod(A.mm_div, [(int,long), Ratio])
+@A.defmethod(A.mm_div, [(int,long), Ratio])
 def meth(i, r):
-    return Ratio(i) / r
+    return Ratio.from_lowest_terms(i) / r
@@ -4,15 +4,25 @@
 
 from __future__ import absolute_import
 
-from decimal import Decimal
+import re
+import string
+from decimal import Decimal, getcontext
 from collections import defaultdict
 
-from hlab.lexing import Lexer, LexicalError
+from hlab.lexing import LexicalError
 from hlab.bases import AutoRepr
 
+
 valid_digits = tuple(range(10))
+complement_digits = string.maketrans('0123456789', '9876543210')
 
 class SigFig(AutoRepr):
+    '''Digits are stored as an integer coefficient and a number of
+       digits (which may include leading zeros), with power being the
+       place of the most significant digit
+    '''
+
+    __slots__ = ['sign', 'coefficient', 'ndigits', 'power']
 
     def __init__(self, arg):
         if isinstance(arg, unicode):
@@ -20,24 +30,45 @@ class SigFig(AutoRepr):
         elif isinstance(arg, Decimal):
             sign, digits, exp = arg.as_tuple()
             arg = (sign, digits, exp - 1 + len(digits))
-        if isinstance(arg, str):
-            arg = parse_string(arg)
-        elif isinstance(arg, (int,long)):
-            arg = parse_string(str(arg))
+        if isinstance(arg, (str,int,long)):
+            self.sign, self.coefficient, self.ndigits, self.power = scan_string(str(arg))
+            return
         elif isinstance(arg, SigFig):
-            arg = (arg.sign, arg.digits, arg.power)
+            self.sign = arg.sign
+            self.coefficient = arg.coefficient
+            self.ndigits = arg.ndigits
+            self.power = arg.power
+            return
 
         sign, digits, power = arg
         digits = tuple(digits)
 
         assert sign in (0,1)
-        assert all(isinstance(digit, (int,long)) and digit in valid_digits
-                   for digit in digits)
+        assert digits and all(isinstance(digit, (int,long)) and digit in valid_digits
+                              for digit in digits)
         assert isinstance(power, (int,long))
 
         self.sign = sign
-        self.digits = digits
+        self.coefficient = int(''.join(map(str, digits)))
+        self.ndigits = len(digits)
+        self.power = power
+
+    @classmethod
+    def from_coefficient(cls, sign, coefficient, ndigits, power):
+        self = cls.__new__(cls)
+        self.sign = sign
+        self.coefficient = coefficient
+        self.ndigits = ndigits
         self.power = power
+        return self
+
+    def __reduce__(self):
+        # (coefficient, exponent of the least significant digit, sign),
+        # plus ndigits only when the digits have leading zeros
+        args = self.coefficient, self.power - self.ndigits + 1, self.sign
+        if len(str(self.coefficient)) != self.ndigits:
+            args += self.ndigits,
+        return load_sigfig, args
 
     def repr_args(self):
         return [str(self)]
@@ -46,14 +77,23 @@ class SigFig(AutoRepr):
     def as_scientific(self):
         return self
 
+    @property
+    def digit_string(self):
+        return str(self.coefficient).zfill(self.ndigits)
+
+    @property
+    def digits(self):
+        return tuple(map(int, self.digit_string))
+
     def as_decimal(self):
-        return Decimal((self.sign, self.digits, self.least_significant_place))
+        return Decimal('%s%dE%d' % ('-' if self.sign else '', self.coefficient,
+                                    self.least_significant_place))
 
     @property
     def sigfigs(self):
-        if self.digits[0] != 0:
-            return len(self.digits)
-        return max(1, len(self.digits) - 1)
+        if self.coefficient >= 10 ** (self.ndigits - 1):
+            return self.ndigits
+        return max(1, self.ndigits - 1)
 
     @property
     def most_significant_place(self):
@@ -61,7 +101,7 @@ class SigFig(AutoRepr):
 
     @property
     def least_significant_place(self):
-        return 1 + self.power - len(self.digits)
+        return 1 + self.power - self.ndigits
 
     def round_to_sigfigs(self, n):
         if n <= 0:
@@ -72,59 +112,53 @@ class SigFig(AutoRepr):
         return self.round_at_index(self.power - n + 1)
 
     def round_at_index(self, i):
+        '''Keep i digits, rounding up when the first dropped digit is
+           above 5, or is 5 following an odd digit
+        '''
         if i < 0:
-            return self.__class__('0')
+            return self.from_coefficient(0, 0, 1, 0)
 
-        if i >= len(self.digits):
-            return self.shift_sigfigs(-(i - len(self.digits)))
+        ndigits = self.ndigits
+        if i >= ndigits:
+            return self.shift_sigfigs(-(i - ndigits))
 
-        digits = list(self.digits)
         power = self.power
-
-        if i==0:
-            digits.insert(0, 0)
+        if i == 0:
+            # round into a leading zero
+            ndigits += 1
             power += 1
-            i += 1
-
-        round_dig = digits[i]
-
-        if (round_dig > 5) or (round_dig == 5 and digits[i-1]%2):
-            digits[i-1] += 1
+            i = 1
 
-        # carray
-        for j in xrange(len(digits) - 1, 0, -1):
-            if digits[j] == 10:
-                digits[j] = 0
-                digits[j-1] += 1
+        kept, dropped = divmod(self.coefficient, 10 ** (ndigits - i))
+        round_dig = dropped // 10 ** (ndigits - i - 1)
+        if round_dig > 5 or (round_dig == 5 and kept & 1):
+            kept += 1
 
-        digits = digits[:i:]
-
-        if digits[0] == 10:
-            digits[0] = 0
-            digits.insert(0, 1)
+        ndigits = i
+        if kept == 10 ** i:
+            # carried into a new leading digit
+            ndigits += 1
             power += 1
-
-        if digits[0] == 0:
-            del digits[0]
+        elif kept < 10 ** (i - 1):
+            # drop a leading zero
+            ndigits -= 1
             power -= 1
+            if not ndigits:
+                return self.from_coefficient(0, 0, 1, 0)
 
-        if not digits:
-            return SigFig('0')
-
-        return self.__class__((self.sign, digits, power))
+        return self.from_coefficient(self.sign, kept, ndigits, power)
 
     def shift_sigfigs(self, sigfigs=1):
         if sigfigs == 0:
             return self
 
         if sigfigs > 0:
-            digits = self.digits[:-sigfigs:]
-            if not digits:
+            if sigfigs >= self.ndigits:
                 return self.__class__(0)
-        else:
-            digits = self.digits + (0,) * -sigfigs
-
-        return self.__class__((self.sign, digits, self.power))
+            return self.from_coefficient(self.sign, self.coefficient // 10 ** sigfigs,
+                                         self.ndigits - sigfigs, self.power)
+        return self.from_coefficient(self.sign, self.coefficient * 10 ** -sigfigs,
+                                     self.ndigits - sigfigs, self.power)
 
     def __str__(self):
         base, exp = self.get_format_args()
@@ -133,112 +167,114 @@ class SigFig(AutoRepr):
         return '%se%s' % (base, exp)
 
     def get_format_args(self, min_exp_power=3):
-        if self.digits[0] == 0:
+        digit_string = str(self.coefficient)
+        ndigits = self.ndigits
+        if len(digit_string) < ndigits or not self.coefficient:
             return self._get_zero_format_args()
 
-        sigfigs = self.sigfigs
+        # without leading zeros, every digit is significant
         power = self.power
 
-        if min_exp_power!=None and abs(power) > max(sigfigs, min_exp_power):
+        if min_exp_power!=None and abs(power) > max(ndigits, min_exp_power):
             return self.get_exp_format_args()
 
-        digs = map(str, self.digits)
+        sign = '-' if self.sign else ''
 
         #deal with trailing zeros
-        if sigfigs > power:
-            insignificant_zeros = 0
+        if ndigits > power:
             #prevet trailing decimal, i.e. 10.
-            if power > 0 and len(digs) == power+1 and digs[-1] == '0':
-                return self.get_exp_format_args()
-        else:
-            #check for significant trailing zeros
-            if self.digits[-1::] == (0,):
+            if power > 0 and ndigits == power+1 and digit_string[-1] == '0':
                 return self.get_exp_format_args()
-            #add insignificant trailing zeros
-            insignificant_zeros = (1 + power - sigfigs)
-        digs += ['0'] * insignificant_zeros
-
-        #special case to prevent decimal points in zero
-        if digs == ['0']:
-            return '0', None
-
-        #place deicmal point
-        if power >= 0:
-            if not insignificant_zeros and power+1 < len(digs):
-                digs.insert(1+power, '.')
-        else:
-            digs = ['0.'] + ['0'] * (-1 - power) + digs
-
-        return ['%s%s' % ('-' if self.sign else '', ''.join(digs)),
-                None]
+            #place deicmal point
+            if power < 0:
+                return [sign + '0.' + '0' * (-1 - power) + digit_string, None]
+            if power+1 < ndigits:
+                return [sign + digit_string[:power+1] + '.' + digit_string[power+1:], None]
+            return [sign + digit_string, None]
+
+        #check for significant trailing zeros
+        if digit_string[-1] == '0':
+            return self.get_exp_format_args()
+        #add insignificant trailing zeros
+        return [sign + digit_string + '0' * (1 + power - ndigits), None]
 
     def _get_zero_format_args(self):
-        assert set(self.digits) == set([0])
+        assert not self.coefficient
         if self.power > 0:
             return self.get_exp_format_args()
-        assert self.digits == (0,)
+        assert self.ndigits == 1
         if self.power == 0:
             return '0', None
         return '0.' + '0' * -self.power, None
 
     def get_exp_format_args(self):
-        return ['%s%d%s' % ('-' if self.sign else '',
-                            self.digits[0],
-                            '.' + ''.join(map(str, self.digits[1::])) if
-                            len(self.digits) > 1 else ''),
+        digit_string = self.digit_string
+        return ['%s%s%s' % ('-' if self.sign else '',
+                            digit_string[0],
+                            '.' + digit_string[1:] if
+                            len(digit_string) > 1 else ''),
                 self.power]
 
     def __pos__(self):
         return self
 
     def __neg__(self):
-        return self.__class__((1 if self.sign==0 else 0,
-                               self.digits, self.power))
+        return self.from_coefficient(1 if self.sign==0 else 0,
+                                     self.coefficient, self.ndigits, self.power)
 
     def __nonzero__(self):
-        return self.as_decimal() != 0
-
-    def perform_binary_operation(self, other, func, rule):
+        return self.coefficient != 0
+
+    def perform_binary_operation(self, other, func, rule, operation=None):
+        '''Apply func to the Decimal values of self and other, and round
+           the result by rule. operation computes the same result as func
+           from (sign, coefficient, exponent) triples, or returns None when
+           func is required.
+        '''
         if not isinstance(other, (SigFig, Decimal, int, long)):
             return NotImplemented
 
-        selfd = self.as_decimal()
-        otherd = other.as_decimal() if isinstance(other, SigFig) else other
-        valued = func(selfd, otherd)
-        value = self.__class__(valued)
-
-        sigfigs = (min(self.sigfigs, other.sigfigs)
-                   if isinstance(other, SigFig) else
-                   self.sigfigs)
+        value = None
+        if operation is not None:
+            other_fields = operand_fields(other)
+            if other_fields is not None:
+                value = operation((self.sign, self.coefficient, self.least_significant_place),
+                                  other_fields)
+        if value is None:
+            otherd = other.as_decimal() if isinstance(other, SigFig) else other
+            value = operand_fields(func(self.as_decimal(), otherd))
+        sign, coefficient, exp = value
 
         if rule=='mul':
-            if valued == 0:
-                value.digits = (0,) * sigfigs
-            else:
-                value = value.round_to_sigfigs(min(self.sigfigs, other.sigfigs)
-                                               if isinstance(other, SigFig) else
-                                               self.sigfigs)
+            sigfigs = (min(self.sigfigs, other.sigfigs)
+                       if isinstance(other, SigFig) else
+                       self.sigfigs)
+            if not coefficient:
+                return self.from_coefficient(sign, 0, sigfigs, exp)
+            ndigits = len(str(coefficient))
+            value = self.from_coefficient(sign, coefficient, ndigits, exp - 1 + ndigits)
+            return value.round_to_sigfigs(sigfigs)
+
         elif rule=='add':
             lsp = (max(self.least_significant_place, other.least_significant_place)
                    if isinstance(other, SigFig) else
                    self.least_significant_place)
-            value = value.round_to_place(lsp)
-#            if value.digits == (0,):
-#                value.digits = (0,) * max(1, sigfigs)
+            ndigits = len(str(coefficient))
+            value = self.from_coefficient(sign, coefficient, ndigits, exp - 1 + ndigits)
+            return value.round_to_place(lsp)
 
         else:
             raise ValueError("bad sigfig rule %r" % (rule,))
 
-        return value
-
     def __mul__(self, other):
-        return self.perform_binary_operation(other, lambda a,b: a*b, 'mul')
+        return self.perform_binary_operation(other, lambda a,b: a*b, 'mul', multiply)
     def __rmul__(self, other):
-        return self.perform_binary_operation(other, lambda a,b: b*a, 'mul')
+        return self.perform_binary_operation(other, lambda a,b: b*a, 'mul', multiply)
     def __div__(self, other):
-        return self.perform_binary_operation(other, lambda a,b: a/b, 'mul')
+        return self.perform_binary_operation(other, lambda a,b: a/b, 'mul', divide)
     def __rdiv__(self, other):
-        return self.perform_binary_operation(other, lambda a,b: b/a, 'mul')
+        return self.perform_binary_operation(other, lambda a,b: b/a, 'mul',
+                                             lambda a,b: divide(b, a))
     def __mod__(self, other):
         return self.perform_binary_operation(other, lambda a,b: a%b, 'mul')
     def __rmod__(self, other):
@@ -247,31 +283,73 @@ class SigFig(AutoRepr):
     __rtruediv__ = __rdiv__
 
     def __add__(self, other):
-        return self.perform_binary_operation(other, lambda a,b: a+b, 'add')
+        return self.perform_binary_operation(other, lambda a,b: a+b, 'add', add)
     def __radd__(self, other):
-        return self.perform_binary_operation(other, lambda a,b: b+a, 'add')
+        return self.perform_binary_operation(other, lambda a,b: b+a, 'add',
+                                             lambda a,b: add(b, a))
     def __sub__(self, other):
-        return self.perform_binary_operation(other, lambda a,b: a-b, 'add')
+        return self.perform_binary_operation(other, lambda a,b: a-b, 'add', subtract)
     def __rsub__(self, other):
-        return self.perform_binary_operation(other, lambda a,b: b-a, 'add')
+        return self.perform_binary_operation(other, lambda a,b: b-a, 'add',
+                                             lambda a,b: subtract(b, a))
+
+    def compare(self, other):
+        '''Returns -1, 0, or 1 as the difference of self and other, rounded
+           by the 'add' rule, is negative, zero, or positive
+        '''
+        if not isinstance(other, (SigFig, Decimal, int, long)):
+            return NotImplemented
+        other_fields = operand_fields(other)
+        if other_fields is not None:
+            place = (max(self.least_significant_place, other.least_significant_place)
+                     if isinstance(other, SigFig) else
+                     self.least_significant_place)
+            result = compare_rounded((self.sign, self.coefficient, self.least_significant_place),
+                                     other_fields, place)
+            if result is not None:
+                return result
+        difference = (self - other).as_decimal()
+        return (difference > 0) - (difference < 0)
 
     def __gt__(self, other):
-        return (self-other).as_decimal() > 0
+        c = self.compare(other)
+        return c if c is NotImplemented else c > 0
     def __ge__(self, other):
-        return (self-other).as_decimal() >= 0
+        c = self.compare(other)
+        return c if c is NotImplemented else c >= 0
     def __eq__(self, other):
         if not isinstance(other, (int,long,Decimal,SigFig)):
             return NotImplemented
         try:
-            return not (abs((self-other).as_decimal()) > 0)
+            return self.compare(other) == 0
         except TypeError,e:
             return False
     def __ne__(self, other):
+        if not isinstance(other, (int,long,Decimal,SigFig)):
+            return NotImplemented
         return not (self == other)
     def __le__(self, other):
-        return (self-other).as_decimal() <= 0
+        c = self.compare(other)
+        return c if c is NotImplemented else c <= 0
     def __lt__(self, other):
-        return (self-other).as_decimal() < 0
+        c = self.compare(other)
+        return c if c is NotImplemented else c < 0
+
+    def sort_key(self):
+        '''Key ordering SigFigs by exact value, for sorted() and bisect.
+           Unlike comparisons, it ignores significance; SigFigs with equal
+           keys compare equal but not necessarily the reverse.
+        '''
+        coefficient = self.coefficient
+        if not coefficient:
+            return (0,)
+        digit_string = str(coefficient)
+        place = self.power - (self.ndigits - len(digit_string))
+        digit_string = digit_string.rstrip('0')
+        if not self.sign:
+            return (1, place, digit_string)
+        # complement the digits and terminate, reversing the order
+        return (-1, -place, digit_string.translate(complement_digits) + ':')
 
     def __pow__(self, op):
         if not isinstance(op, (int,long)):
@@ -286,42 +364,151 @@ class SigFig(AutoRepr):
         return self.__class__(self.as_decimal().sqrt()).round_to_sigfigs(self.sigfigs)
 
 
-def parse_string(bytes):
-    lex = Lexer(bytes.strip())
-    [pm, digs_pre_dot, dot, digs_post_dot, exp, exp_power
-     ] = lex.pulls(r'[+-]', r'\d+', r'\.', r'\d+', r'[eE]', r'[+-]?\d+')
-    if not lex.eof or (exp and not exp_power):
+def load_sigfig(coefficient, exp, sign, ndigits=None):
+    if ndigits is None:
+        ndigits = len(str(coefficient))
+    return SigFig.from_coefficient(sign, coefficient, ndigits, exp + ndigits - 1)
+
+
+# Exact arithmetic on (sign, coefficient, exponent) triples, giving the
+# same triple as the corresponding Decimal operation in the current
+# context, or None when the context would round an inexact result.
+
+def operand_fields(op):
+    if isinstance(op, SigFig):
+        return op.sign, op.coefficient, op.least_significant_place
+    if isinstance(op, (int,long)):
+        return (1 if op < 0 else 0), abs(op), 0
+    sign, digits, exp = op.as_tuple()
+    if not isinstance(exp, (int,long)):
+        # infinity or nan
+        return None
+    return sign, int(''.join(map(str, digits))), exp
+
+def exact(sign, coefficient, exp):
+    if len(str(coefficient)) > getcontext().prec:
+        return None
+    return sign, coefficient, exp
+
+def multiply((s1, c1, e1), (s2, c2, e2)):
+    return exact(s1 ^ s2, c1 * c2, e1 + e2)
+
+def add((s1, c1, e1), (s2, c2, e2)):
+    exp = min(e1, e2)
+    if max(e1, e2) - exp > getcontext().prec + 1:
+        # too many digits to be exact; avoids huge powers of ten
+        return None
+    total = ((-c1 if s1 else c1) * 10 ** (e1 - exp) +
+             (-c2 if s2 else c2) * 10 ** (e2 - exp))
+    if total:
+        sign = 1 if total < 0 else 0
+    else:
+        # only negative zeros sum to a negative zero
+        sign = s1 & s2
+    return exact(sign, abs(total), exp)
+
+def subtract(a, (s2, c2, e2)):
+    return add(a, (1 - s2, c2, e2))
+
+def compare_rounded((s1, c1, e1), (s2, c2, e2), place):
+    '''Sign of the difference rounded at place, as by round_to_place, or
+       None if the Decimal difference would be inexact
+    '''
+    exp = min(e1, e2)
+    prec = getcontext().prec
+    if max(e1, e2) - exp > prec + 1:
+        return None
+    difference = ((-c1 if s1 else c1) * 10 ** (e1 - exp) -
+                  (-c2 if s2 else c2) * 10 ** (e2 - exp))
+    if not difference:
+        return 0
+    magnitude = abs(difference)
+    if magnitude >= 10 ** prec:
+        return None
+    # below place, the difference rounds to zero unless its leading digit
+    # is at place - 1 and above 5
+    if place > exp and magnitude < 6 * 10 ** (place - 1 - exp):
+        return 0
+    return 1 if difference > 0 else -1
+
+def divide((s1, c1, e1), (s2, c2, e2)):
+    '''Decimal division: an exact quotient as near as possible to the
+       ideal exponent e1 - e2, or the quotient rounded half even to the
+       context precision
+    '''
+    if not c2:
+        # let Decimal raise the appropriate error
+        return None
+    sign = s1 ^ s2
+    if not c1:
+        return sign, 0, e1 - e2
+    prec = getcontext().prec
+    shift = len(str(c2)) - len(str(c1)) + prec + 1
+    exp = e1 - e2 - shift
+    if shift >= 0:
+        coefficient, remainder = divmod(c1 * 10 ** shift, c2)
+    else:
+        coefficient, remainder = divmod(c1, c2 * 10 ** -shift)
+    if remainder:
+        # make the quotient sticky for rounding
+        if coefficient % 5 == 0:
+            coefficient += 1
+    else:
+        ideal_exp = e1 - e2
+        while exp < ideal_exp and coefficient % 10 == 0:
+            coefficient //= 10
+            exp += 1
+    extra = len(str(coefficient)) - prec
+    if extra > 0:
+        coefficient, dropped = divmod(coefficient, 10 ** extra)
+        half = 5 * 10 ** (extra - 1)
+        if dropped > half or (dropped == half and coefficient & 1):
+            coefficient += 1
+        exp += extra
+        if coefficient == 10 ** prec:
+            coefficient //= 10
+            exp += 1
+    return sign, coefficient, exp
+
+
+# the parts of a sigfig literal, each optional
+literal_pattern = (r'(?P<sign>[+-])?(?P<whole>\d+)?(?P<dot>\.)?(?P<fraction>\d+)?'
+                   r'(?P<e>[eE])?(?P<exp>[+-]?\d+)?')
+literal_re = re.compile(literal_pattern + r'\Z')
+
+def scan_string(bytes):
+    '''Returns the (sign, coefficient, ndigits, power) of a sigfig literal
+    '''
+    match = literal_re.match(bytes.strip())
+    if match is None or (match.group('e') and not match.group('exp')):
         raise LexicalError("bad sigfig literal %r" % (bytes,))
+    return literal_fields(*match.group('sign', 'whole', 'dot', 'fraction', 'exp'))
 
+def literal_fields(pm, whole, dot, fraction, exp):
+    '''Returns (sign, coefficient, ndigits, power) from the matched parts
+       of a sigfig literal
+    '''
     sign = 1 if pm == '-' else 0
-    power = int(exp_power) if exp_power else 0
-    digs_pre_dot = map(int, digs_pre_dot)
-    digs_post_dot = map(int, digs_post_dot)
+    power = int(exp) if exp else 0
+    whole = whole or '0'
 
     #remove insignificant trailing zeros
     if not dot:
-        if set(digs_pre_dot) > set([0]):
-            while digs_pre_dot and digs_pre_dot[-1] == 0:
-                digs_pre_dot.pop(-1)
-                power += 1
-
-    if not digs_pre_dot:
-        digs_pre_dot.append(0)
-
-    #make scientific by shifting digits and power accordingly
-    while len(digs_pre_dot) > 1:
-        digs_post_dot.insert(0, digs_pre_dot.pop(-1))
-        power += 1
-    assert len(digs_pre_dot) == 1
+        stripped = whole.rstrip('0')
+        if stripped:
+            power += len(whole) - len(stripped)
+            whole = stripped
 
-    digits = digs_pre_dot + digs_post_dot
+    #make scientific
+    power += len(whole) - 1
+    digits = whole + fraction if fraction else whole
 
     #remove insignificant leading zeros
-    while len(digits) > 1 and digits[0] == 0:
-        digits.pop(0)
-        power -= 1
+    significant = digits.lstrip('0') or '0'
+    power -= len(digits) - len(significant)
 
-    digits = tuple(digits)
-
-    return sign, digits, power
+    return sign, int(significant), len(significant), power
 
+def parse_string(bytes):
+    sign, coefficient, ndigits, power = scan_string(bytes)
+    return sign, tuple(map(int, str(coefficient).zfill(ndigits))), power
@@ -0,0 +1,467 @@
+'''Class SigFigArray for columns of significant figure numbers.
+
+   Each number is stored as a sign, an integer mantissa of its digits,
+   the power of its most significant digit, and its number of digits
+   (which determines the number of significant figures) in parallel numpy
+   arrays. Arithmetic applies the SigFig 'mul' and 'add' rounding rules
+   in vectorized form and gives the same results as SigFig element for
+   element. Elements whose intermediate values don't fit in int64 are
+   computed with SigFig.
+
+   Elements that don't fit the fields (more than max_digits digits, or
+   dne from division by zero) are kept as objects in an overflow column,
+   with fields holding their leading digits.
+'''
+
+from __future__ import absolute_import
+
+from decimal import Decimal, InvalidOperation
+
+import numpy
+
+from hlab.bases import AutoRepr
+
+from .sigfig import SigFig
+from .dne import dne
+
+max_digits = 18
+pow10 = 10 ** numpy.arange(max_digits + 1, dtype=numpy.int64)
+
+def digit_count(mantissa):
+    return numpy.maximum(1, numpy.searchsorted(pow10, mantissa, side='right'))
+
+def power10(n):
+    return pow10[numpy.clip(n, 0, max_digits)]
+
+
+class SigFigArray(AutoRepr):
+
+    # defer numpy operations with arrays and numpy scalars to our methods
+    __array_ufunc__ = None
+    __hash__ = None
+
+    # object array of the elements that don't fit the fields, and None
+    # elsewhere; None when all fit
+    overflow = None
+
+    def __init__(self, values):
+        values = [op if isinstance(op, SigFig) or op is dne else SigFig(op)
+                  for op in values]
+        fields = map(element_fields, values)
+        sign, mantissa, power, ndigits = zip(*fields) if fields else [(),(),(),()]
+        self.sign = numpy.array(sign, dtype=numpy.int8)
+        self.mantissa = numpy.array(mantissa, dtype=numpy.int64)
+        self.power = numpy.array(power, dtype=numpy.int64)
+        self.ndigits = numpy.array(ndigits, dtype=numpy.int64)
+        if not all(map(fits, values)):
+            self.set_overflow([None if fits(op) else op for op in values])
+
+    @classmethod
+    def from_fields(cls, sign, mantissa, power, ndigits):
+        self = cls.__new__(cls)
+        sign, mantissa, power, ndigits = numpy.broadcast_arrays(sign, mantissa, power, ndigits)
+        self.sign = sign.astype(numpy.int8)
+        self.mantissa = mantissa.astype(numpy.int64)
+        self.power = power.astype(numpy.int64)
+        self.ndigits = ndigits.astype(numpy.int64)
+        return self
+
+    def set_overflow(self, values):
+        overflow = numpy.empty(self.shape, dtype=object)
+        for j, op in enumerate(values):
+            overflow[j] = op
+        self.overflow = overflow if any(op is not None for op in values) else None
+
+    @property
+    def fitted(self):
+        '''Mask of the elements given by their fields, or True for all
+        '''
+        if self.overflow is None:
+            return True
+        return numpy.array([op is None for op in self.overflow], dtype=bool)
+
+    @property
+    def dne_mask(self):
+        if self.overflow is None:
+            return None
+        return numpy.array([op is dne for op in self.overflow], dtype=bool)
+
+    def repr_args(self):
+        return [map(str, self)]
+
+    def __str__(self):
+        return '[%s]' % ' '.join(map(str, self))
+
+    @property
+    def shape(self):
+        return self.mantissa.shape
+
+    def __len__(self):
+        return len(self.mantissa)
+
+    def __getitem__(self, index):
+        if isinstance(index, (int, long, numpy.integer)):
+            if self.overflow is not None and self.overflow[index] is not None:
+                return self.overflow[index]
+            return SigFig.from_coefficient(int(self.sign[index]), int(self.mantissa[index]),
+                                           int(self.ndigits[index]), int(self.power[index]))
+        result = self.from_fields(self.sign[index], self.mantissa[index],
+                                  self.power[index], self.ndigits[index])
+        if self.overflow is not None:
+            result.set_overflow(list(self.overflow[index]))
+        return result
+
+    def __iter__(self):
+        for i in xrange(len(self)):
+            yield self[i]
+
+    def replace(self, mask, value):
+        '''Returns a copy with the elements selected by mask set to value
+        '''
+        value = as_sigfig(value)
+        sign, mantissa, power, ndigits = element_fields(value)
+        result = self.from_fields(numpy.where(mask, sign, self.sign),
+                                  numpy.where(mask, mantissa, self.mantissa),
+                                  numpy.where(mask, power, self.power),
+                                  numpy.where(mask, ndigits, self.ndigits))
+        if self.overflow is not None or not fits(value):
+            overflow = [None] * len(self) if self.overflow is None else list(self.overflow)
+            for j in numpy.flatnonzero(numpy.broadcast_to(mask, self.shape)):
+                overflow[j] = None if fits(value) else value
+            result.set_overflow(overflow)
+        return result
+
+    @property
+    def sigfigs(self):
+        return numpy.where(self.mantissa != 0, self.ndigits,
+                           numpy.maximum(1, self.ndigits - 1))
+
+    @property
+    def most_significant_place(self):
+        return self.power
+
+    @property
+    def least_significant_place(self):
+        return 1 + self.power - self.ndigits
+
+    def as_decimals(self):
+        decimals = numpy.empty(self.shape, dtype=object)
+        decimals[:] = [op.as_decimal() for op in self]
+        return decimals
+
+    def as_floats(self):
+        floats = (numpy.where(self.sign, -1.0, 1.0) * self.mantissa *
+                  10.0 ** self.least_significant_place)
+        if self.overflow is not None:
+            for j, op in enumerate(self.overflow):
+                if op is not None:
+                    floats[j] = numpy.nan if op is dne else float(op.as_decimal())
+        return floats
+
+    def round_to_sigfigs(self, n):
+        if numpy.any(numpy.asarray(n) <= 0):
+            raise ValueError("rounding to invalid number of sig figs %s" % (n,))
+        return self.round_at_index(n)
+
+    def round_to_place(self, n):
+        return self.round_at_index(self.power - n + 1)
+
+    def round_at_index(self, i):
+        fields, ok = round_at_index(self.sign, self.mantissa, self.ndigits, self.power, i)
+        index = numpy.broadcast_to(i, self.shape)
+        return self.with_fallback(fields, ok & self.fitted,
+                                  lambda op, j: op if op is dne else op.round_at_index(int(index[j])))
+
+    def __pos__(self):
+        return self
+
+    def __neg__(self):
+        result = self.from_fields(1 - self.sign, self.mantissa, self.power, self.ndigits)
+        if self.overflow is not None:
+            result.set_overflow([None if op is None else -op for op in self.overflow])
+        return result
+
+    def __mul__(self, other):
+        return self.perform_binary_operation(other, multiply, lambda a,b: a*b)
+    def __rmul__(self, other):
+        return self.perform_binary_operation(other, multiply, lambda a,b: b*a)
+    def __div__(self, other):
+        return self.perform_binary_operation(other, divide, lambda a,b: a/b)
+    def __rdiv__(self, other):
+        return self.perform_binary_operation(other, rdivide, lambda a,b: b/a)
+    __truediv__ = __div__
+    __rtruediv__ = __rdiv__
+
+    def __add__(self, other):
+        return self.perform_binary_operation(other, add, lambda a,b: a+b)
+    def __radd__(self, other):
+        return self.perform_binary_operation(other, add, lambda a,b: b+a)
+    def __sub__(self, other):
+        return self.perform_binary_operation(other, subtract, lambda a,b: a-b)
+    def __rsub__(self, other):
+        return self.perform_binary_operation(other, rsubtract, lambda a,b: b-a)
+
+    def __gt__(self, other):
+        return self.compare(other, lambda sign, nonzero: nonzero & (sign == 0), lambda a,b: a > b)
+    def __ge__(self, other):
+        return self.compare(other, lambda sign, nonzero: ~nonzero | (sign == 0), lambda a,b: a >= b)
+    def __eq__(self, other):
+        return self.compare(other, lambda sign, nonzero: ~nonzero, lambda a,b: a == b)
+    def __ne__(self, other):
+        return self.compare(other, lambda sign, nonzero: nonzero, lambda a,b: a != b)
+    def __le__(self, other):
+        return self.compare(other, lambda sign, nonzero: ~nonzero | (sign == 1), lambda a,b: a <= b)
+    def __lt__(self, other):
+        return self.compare(other, lambda sign, nonzero: nonzero & (sign == 1), lambda a,b: a < b)
+
+    def compare(self, other, test, func):
+        '''Compare as SigFig does, by the sign of the difference rounded
+           by the 'add' rule
+        '''
+        operand = as_operand(other)
+        if operand is None:
+            return NotImplemented
+        (sign, mantissa, power, ndigits), ok = subtract(sigfig_operand(self), operand)
+        sign, mantissa, ok = numpy.broadcast_arrays(sign, mantissa, ok)
+        result = test(sign, mantissa != 0)
+        for j in numpy.flatnonzero(~ok):
+            result[j] = func(self[j], operand.element(j))
+        return result
+
+    def perform_binary_operation(self, other, operation, func):
+        operand = as_operand(other)
+        if operand is None:
+            return NotImplemented
+        fields, ok = operation(sigfig_operand(self), operand)
+        return self.with_fallback(fields, ok, lambda op, j: func(op, operand.element(j)))
+
+    def with_fallback(self, fields, ok, func):
+        '''Construct the result from vectorized fields, computing elements
+           that weren't ok with SigFig; division by zero (0/0 included)
+           gives dne
+        '''
+        result = self.from_fields(*fields)
+        if not numpy.all(ok):
+            ok = numpy.broadcast_to(ok, result.shape)
+            overflow = []
+            for j in numpy.flatnonzero(~ok):
+                try:
+                    value = func(self[j], j)
+                except (ZeroDivisionError, InvalidOperation):
+                    value = dne
+                (result.sign[j], result.mantissa[j],
+                 result.power[j], result.ndigits[j]) = element_fields(value)
+                if not fits(value):
+                    overflow.append((j, value))
+            if overflow:
+                values = [None] * len(result)
+                for j, value in overflow:
+                    values[j] = value
+                result.set_overflow(values)
+        return result
+
+
+def as_sigfig(op):
+    return op if isinstance(op, SigFig) else SigFig(op)
+
+def fits(op):
+    '''Whether op can be stored in the fields of a SigFigArray
+    '''
+    return (op is not dne and op.ndigits <= max_digits and
+            not (op.coefficient and op.coefficient < 10 ** (op.ndigits - 1)))
+
+def element_fields(op):
+    '''The fields of op, or for an element of the overflow column its
+       sign, power and leading digits (so that zero tests still hold)
+    '''
+    if fits(op):
+        return sigfig_fields(op)
+    if op is dne:
+        return zero_fields
+    digits = str(op.coefficient)[:max_digits]
+    return (op.sign, int(digits), op.power, len(digits))
+
+def sigfig_fields(op):
+    if op.ndigits > max_digits:
+        raise ValueError('%s has more than %d digits' % (op, max_digits))
+    if op.coefficient and op.coefficient < 10 ** (op.ndigits - 1):
+        raise ValueError('%r has a leading zero' % (op,))
+    return (op.sign, op.coefficient, op.power, op.ndigits)
+
+
+# # # # # # #
+# Operands  #
+# # # # # # #
+
+class Operand(object):
+    '''Fields of an operand as arrays: sign, integer coefficient and its
+       number of digits, exponent of its least significant digit, and
+       sigfigs (None for exact numbers). element(j) returns the operand
+       for scalar SigFig operations.
+    '''
+
+    def __init__(self, sign, mantissa, ndigits, exp, sigfigs, element, ok=True):
+        self.sign = sign
+        self.mantissa = mantissa
+        self.ndigits = ndigits
+        self.exp = exp
+        self.sigfigs = sigfigs
+        self.element = element
+        self.ok = ok
+
+def sigfig_operand(op):
+    return Operand(op.sign, op.mantissa, op.ndigits, op.least_significant_place, op.sigfigs,
+                   lambda j: op[j], op.fitted)
+
+def as_operand(op):
+    if isinstance(op, SigFigArray):
+        return sigfig_operand(op)
+    if isinstance(op, SigFig):
+        sign, mantissa, power, ndigits = element_fields(op)
+        return Operand(sign, mantissa, ndigits, 1 + power - ndigits, op.sigfigs,
+                       lambda j: op, fits(op))
+    if isinstance(op, numpy.ndarray) and not op.shape:
+        op = op[()]
+    if isinstance(op, numpy.integer):
+        op = int(op)
+    if isinstance(op, (int, long, Decimal)):
+        return exact_operand(numpy.array([op], dtype=object).reshape(()), lambda j: op)
+    if isinstance(op, numpy.ndarray):
+        if op.dtype.kind in 'iu':
+            return exact_operand(op, lambda j: int(op[j]))
+        if op.dtype.kind == 'O' and all(isinstance(x, (int, long, Decimal)) for x in op.flat):
+            return exact_operand(op, lambda j: op[j])
+    return None
+
+def exact_operand(values, element):
+    '''Operand for exact numbers (int or Decimal) as in SigFig operations
+    '''
+    if values.dtype.kind in 'iu':
+        return Operand((values < 0).astype(numpy.int8), numpy.abs(values).astype(numpy.int64),
+                       digit_count(numpy.abs(values)), numpy.zeros(values.shape, numpy.int64),
+                       None, element)
+    n = values.size
+    sign = numpy.zeros(n, numpy.int8)
+    mantissa = numpy.zeros(n, numpy.int64)
+    exp = numpy.zeros(n, numpy.int64)
+    ok = numpy.ones(n, bool)
+    for j, value in enumerate(values.flat):
+        if not isinstance(value, Decimal):
+            value = Decimal(value)
+        if not value.is_finite():
+            ok[j] = False
+            continue
+        s, digits, e = value.as_tuple()
+        if len(digits) > max_digits:
+            ok[j] = False
+            continue
+        sign[j], mantissa[j], exp[j] = s, int(''.join(map(str, digits))), e
+    shape = values.shape
+    return Operand(sign.reshape(shape), mantissa.reshape(shape), digit_count(mantissa).reshape(shape),
+                   exp.reshape(shape), None, element, ok.reshape(shape))
+
+def combined(func, a, b, attribute):
+    '''Combine an attribute of the SigFig operands (at least one is)
+    '''
+    values = [getattr(op, attribute) for op in (a, b) if op.sigfigs is not None]
+    return func(*values) if len(values) == 2 else values[0]
+
+
+# # # # # # # # # # # # # #
+# Vectorized SigFig rules #
+# # # # # # # # # # # # # #
+
+# All operations return ((sign, mantissa, power, ndigits), ok), where ok
+# flags the elements for which the vectorized computation is exact.
+
+zero_fields = (0, 0, 0, 1)
+
+def round_at_index(sign, mantissa, ndigits, power, index):
+    '''SigFig.round_at_index: keep index digits, rounding up on a first
+       dropped digit above 5, or equal to 5 following an odd digit
+    '''
+    index = numpy.asarray(index)
+    ok = index <= max_digits
+    drop = ndigits - index
+    kept = mantissa // power10(drop)
+    dropped = (mantissa // power10(drop - 1)) % 10
+    kept = kept + ((dropped > 5) | ((dropped == 5) & (kept % 2 == 1)))
+    carry = kept == power10(index)
+    rounded = (sign, kept, power + carry, index + carry)
+    # index beyond the digits: pad with zeros
+    padded = (sign, mantissa * power10(index - ndigits), power, index)
+    # zero digits: a leading zero digit is dropped
+    zeros = (sign, 0, power - 1, index - 1)
+    nonzero = mantissa != 0
+    cases = [(index < 0, zero_fields),
+             (index >= ndigits, padded),
+             (~nonzero & (index <= 1), zero_fields),
+             (~nonzero, zeros),
+             (kept == 0, zero_fields)]
+    fields = rounded
+    for mask, case in reversed(cases):
+        fields = tuple(numpy.where(mask, c, f) for c,f in zip(case, fields))
+    return fields, ok
+
+def round_value(sign, mantissa, exp, index_from_power):
+    '''Round the Decimal-like value (sign, mantissa, exp) at the index
+       given as a function of the value's power
+    '''
+    ndigits = digit_count(mantissa)
+    power = exp - 1 + ndigits
+    return round_at_index(sign, mantissa, ndigits, power, index_from_power(power))
+
+def multiply(a, b):
+    sign = a.sign ^ b.sign
+    mantissa = a.mantissa * b.mantissa
+    exp = a.exp + b.exp
+    sigfigs = combined(numpy.minimum, a, b, 'sigfigs')
+    ok = (a.ndigits + b.ndigits <= max_digits) & a.ok & b.ok
+    return mul_rule(sign, mantissa, exp, sigfigs, ok)
+
+def mul_rule(sign, mantissa, exp, sigfigs, ok):
+    fields, rounded_ok = round_value(sign, mantissa, exp, lambda power: sigfigs)
+    zero = mantissa == 0
+    fields = tuple(numpy.where(zero, z, f) for z,f in zip((sign, 0, exp, sigfigs), fields))
+    return fields, ok & rounded_ok
+
+def divide(a, b):
+    sign = a.sign ^ b.sign
+    sigfigs = combined(numpy.minimum, a, b, 'sigfigs')
+    # zero divisors are left to SigFig to raise the same error
+    # integer quotient with at least sigfigs + 2 digits; with an int64
+    # dividend its digits are those of the Decimal quotient
+    shift = sigfigs + 2 + b.ndigits - a.ndigits
+    dividend = a.mantissa * power10(shift)
+    divisor = numpy.maximum(1, b.mantissa) * power10(-shift)
+    quotient = dividend // divisor
+    exp = a.exp - b.exp - shift
+    ok = ((numpy.maximum(a.ndigits + shift, b.ndigits - shift) <= max_digits) &
+          a.ok & b.ok & (b.mantissa != 0))
+    zero = a.mantissa == 0
+    return mul_rule(sign, quotient, numpy.where(zero, a.exp - b.exp, exp), sigfigs, ok)
+
+def rdivide(a, b):
+    return divide(b, a)
+
+def add(a, b, negate_b=False):
+    b_sign = b.sign ^ negate_b
+    exp = numpy.minimum(a.exp, b.exp)
+    a_shift = a.exp - exp
+    b_shift = b.exp - exp
+    ok = ((a.ndigits + a_shift < max_digits) & (b.ndigits + b_shift < max_digits) &
+          a.ok & b.ok)
+    total = (numpy.where(a.sign, -1, 1) * a.mantissa * power10(a_shift) +
+             numpy.where(b_sign, -1, 1) * b.mantissa * power10(b_shift))
+    # as with Decimal, the sum is only negative zero for negative zeros
+    sign = numpy.where(total == 0, a.sign & b_sign, total < 0).astype(numpy.int8)
+    lsp = combined(numpy.maximum, a, b, 'exp')
+    fields, rounded_ok = round_value(sign, numpy.abs(total), exp,
+                                     lambda power: power - lsp + 1)
+    return fields, ok & rounded_ok
+
+def subtract(a, b):
+    return add(a, b, negate_b=True)
+
+def rsubtract(a, b):
+    return add(b, a, negate_b=True)
@@ -0,0 +1,35 @@
+'''Support for the compact value types that keep their attributes in
+   __slots__ rather than a per instance dictionary
+'''
+
+
+def slot_names(cls):
+    '''All slot names declared by cls and its bases
+    '''
+    names = []
+    for base in reversed(cls.__mro__):
+        slots = base.__dict__.get('__slots__', ())
+        if isinstance(slots, str):
+            slots = slots,
+        names.extend(name for name in slots
+                     if name not in ('__dict__', '__weakref__') and name not in names)
+    return names
+
+
+class Slotted(object):
+    '''Mixin providing pickle support for slotted classes (pickle protocols
+       0 and 1 refuse slotted instances that lack __getstate__)
+    '''
+
+    __slots__ = ()
+
+    def __getstate__(self):
+        state = dict(getattr(self, '__dict__', ()))
+        state.update((name, getattr(self, name))
+                     for name in slot_names(self.__class__)
+                     if hasattr(self, name))
+        return state
+
+    def __setstate__(self, state):
+        for name, value in state.iteritems():
+            setattr(self, name, value)
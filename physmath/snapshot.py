@@ -0,0 +1,137 @@
+'''Snapshots of the tables built at import time by units and convert.
+
+   Building the unit namespace tables and the convertion graph requires
+   naming, parsing, and multiplying units through the multimethod algebra.
+   The results are pickled to a snapshot directory and loaded on subsequent
+   imports. Each snapshot records a digest of the package sources and of
+   the versions of its dependencies, so that any change to the definitions
+   causes a rebuild.
+
+   Snapshots are opt-in, as loading one unpickles the file: they are only
+   used when $PHYSMATH_SNAPSHOT_DIR names a directory, which should only
+   be writable by trusted users.
+
+   python -m physmath.snapshot [DIR] rebuilds the snapshots in DIR (by
+   default, $PHYSMATH_SNAPSHOT_DIR).
+'''
+
+from __future__ import absolute_import
+
+import os
+import hashlib
+import tempfile
+import cPickle as pickle
+
+format_version = 1
+
+dependencies = ['hlab', 'jamenson']
+
+def get_snapshot_dir():
+    return os.environ.get('PHYSMATH_SNAPSHOT_DIR') or None
+
+def get_snapshot_path(name):
+    directory = get_snapshot_dir()
+    if directory is None:
+        return None
+    return os.path.join(directory, '%s-registry.pickle' % (name,))
+
+source_digest = None
+
+def get_source_digest():
+    global source_digest
+    if source_digest is None:
+        package_dir = os.path.dirname(os.path.abspath(__file__))
+        digest = hashlib.sha1(str(format_version))
+        for name in dependencies:
+            digest.update('%s=%s;' % (name, get_dependency_version(name)))
+        for filename in sorted(os.listdir(package_dir)):
+            if filename.endswith('.py'):
+                with open(os.path.join(package_dir, filename), 'rb') as fp:
+                    digest.update(filename)
+                    digest.update(fp.read())
+        source_digest = digest.hexdigest()
+    return source_digest
+
+def get_dependency_version(name):
+    '''The installed version of a dependency, else the location of the
+       module (as for an uninstalled checkout)
+    '''
+    try:
+        import pkg_resources
+        return pkg_resources.get_distribution(name).version
+    except Exception:
+        pass
+    module = __import__(name)
+    return getattr(module, '__version__', None) or os.path.dirname(os.path.abspath(module.__file__))
+
+def load(name):
+    '''Returns the state saved as name, or None if there is no snapshot
+       for the current sources
+    '''
+    path = get_snapshot_path(name)
+    if path is None:
+        return None
+    try:
+        with open(path, 'rb') as fp:
+            digest, state = pickle.load(fp)
+    except Exception:
+        # missing, corrupt, or unreadable; rebuild
+        return None
+    if digest != get_source_digest():
+        return None
+    return state
+
+def save(name, state):
+    '''Save state as name, returning whether the snapshot was written.
+       Failure to write a snapshot is not an error.
+    '''
+    path = get_snapshot_path(name)
+    if path is None:
+        return False
+    directory = os.path.dirname(path)
+    try:
+        if not os.path.isdir(directory):
+            os.makedirs(directory, 0700)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.%s-' % (name,))
+        try:
+            with os.fdopen(fd, 'wb') as fp:
+                pickle.dump((get_source_digest(), state), fp, pickle.HIGHEST_PROTOCOL)
+            os.rename(tmp_path, path)
+        except:
+            os.unlink(tmp_path)
+            raise
+    except EnvironmentError:
+        return False
+    return True
+
+def remove(name):
+    path = get_snapshot_path(name)
+    if path is not None and os.path.exists(path):
+        os.unlink(path)
+
+def rebuild(directory=None):
+    '''Remove any existing snapshots and rebuild them in a fresh interpreter
+    '''
+    import sys
+    import subprocess
+    if directory is not None:
+        os.environ['PHYSMATH_SNAPSHOT_DIR'] = os.path.abspath(directory)
+    elif get_snapshot_dir() is None:
+        raise ValueError('no snapshot directory; set PHYSMATH_SNAPSHOT_DIR')
+    for name in ['units', 'convert']:
+        remove(name)
+    subprocess.check_call([sys.executable, '-c', 'import physmath.convert'])
+    return [get_snapshot_path(name) for name in ['units', 'convert']]
+
+def main():
+    import sys
+    if len(sys.argv) > 2:
+        sys.exit('usage: python -m physmath.snapshot [DIR]')
+    try:
+        paths = rebuild(*sys.argv[1:])
+    except ValueError, e:
+        sys.exit(str(e))
+    for path in paths:
+        print path
+
+__name__ == '__main__' and main()
@@ -0,0 +1,37 @@
+
+from jamenson.runtime import multimethod
+
+from physmath import algebra as A
+
+class Op(A.AlgebraBase):
+    pass
+
+def test_dispatch_cache_invalidation():
+    a, b = Op(), Op()
+    try:
+        a + b
+    except TypeError:
+        pass
+    else:
+        assert False, 'expected TypeError'
+    @A.defmethod(A.mm_add, [Op, Op])
+    def meth(x, y):
+        return 'added'
+    assert a + b == 'added'
+    @A.defboth_wrapper(A.mm_mul, [Op, int])
+    def meth(x, i):
+        return 'scaled %d' % i
+    assert a * 2 == 'scaled 2'
+    assert 3 * a == 'scaled 3'
+
+class DirectOp(A.AlgebraBase):
+    pass
+
+def test_dispatch_cache_direct_registration():
+    a, b = DirectOp(), DirectOp()
+    assert a.__sub__(b) is NotImplemented
+    @multimethod.defmethod(A.mm_sub, [DirectOp, DirectOp])
+    def meth(x, y):
+        return 'subtracted'
+    assert a - b == 'subtracted'
+    assert A.resolve_method(A.mm_sub, (DirectOp, DirectOp)) is A.mm_sub
@@ -0,0 +1,38 @@
+
+import threading
+
+from physmath.annotator import annotator, Annotator
+from physmath.convert import convert
+from physmath.physnum import parse_physical_number
+from physmath.units import parse_unit
+
+def test_annotation():
+    a = Annotator()
+    assert not a.annotating
+    with a.annotation() as outer:
+        a.annotate(1)
+        with a.annotation(annotate=False) as inner:
+            assert inner is None and not a.annotating
+            a.annotate(2)
+        a.annotate(3)
+    assert outer == [1, 3]
+    assert not a.annotating
+
+def test_threads_annotate_separately():
+    start = threading.Event()
+    results = {}
+    def run(src, dst):
+        with annotator.annotation() as eqs:
+            start.wait()
+            for i in range(20):
+                convert(parse_physical_number(src), parse_unit(dst))
+        results[src] = eqs
+    threads = [threading.Thread(target=run, args=args)
+               for args in [('2.50s mi', 'cm'), ('34.5s C', 'K')]]
+    for thread in threads:
+        thread.start()
+    start.set()
+    for thread in threads:
+        thread.join()
+    assert len(results['2.50s mi']) == len(results['34.5s C']) == 20
+    assert not annotator.annotating
@@ -0,0 +1,54 @@
+
+from StringIO import StringIO
+
+from physmath.batch import run_batch, run_csv
+
+rows = [dict(value='2.50s mi', to_unit='cm'),
+        dict(value='34.5s C', to_unit='F', name='water'),
+        dict(value='3.0s ft', to_unit='kg'),
+        dict(value='12s cm', to_unit='ft')]
+
+def test_run_batch():
+    results = list(run_batch('convert', rows * 3, chunksize=2))
+    assert [r['value'] for r in results] == [r['value'] for r in rows * 3]
+    assert results[0]['result'] == u'4.02e5 cm'
+    assert results[2]['error'] and not results[2]['result']
+    assert 'layout' not in results[0]
+    assert list(run_batch('convert', rows * 3, chunksize=2, processes=2)) == results
+
+def test_render():
+    results = list(run_batch('convert', rows, render=lambda row: 'name' in row))
+    assert results[1]['layout'].startswith('{')
+    assert '"equation_set"' in results[1]['layout']
+    assert results[0]['layout'] == ''
+
+def test_run_csv():
+    out = StringIO()
+    run_csv('convert', StringIO('value,to_unit\n2.50s mi,cm\n1.000s ft,in\n'), out)
+    lines = out.getvalue().splitlines()
+    assert lines[0] == 'value,to_unit,result,error'
+    assert lines[1] == '2.50s mi,cm,4.02e5 cm,'
+
+def test_calculate_routines():
+    from physmath.batch import get_calculation
+    try:
+        get_calculation('nope')
+    except ValueError:
+        pass
+    else:
+        assert False, 'expected ValueError'
+    mass_rows = [dict(mw='18.02 g/mol', mass='36.04s kg', to_unit='mmol', name='water'),
+                 dict(mw='0 g/mol', mass='36.04s kg', to_unit='mmol')]
+    results = list(run_batch('convert_mass_to_mols', mass_rows, render=True))
+    assert results[0]['result'] == u'2.000e6 mmol water'
+    assert not results[0]['error']
+    assert '"equation_set"' in results[0]['layout']
+    assert results[1]['error'] == u'error' and not results[1]['result']
+    results = list(run_batch('convert_mols_to_mass', [dict(mw='18.02 g/mol', mols='2.0s mol')]))
+    assert results[0]['result'] == u'36 g'
+
+def test_utf8_names():
+    out = StringIO()
+    run_csv('convert', StringIO('value,to_unit,name\n2.50s mi,cm,Jos\xc3\xa9\n'), out)
+    lines = out.getvalue().splitlines()
+    assert lines[1] == '2.50s mi,cm,Jos\xc3\xa9,4.02e5 cm Jos\xc3\xa9,', lines[1]
@@ -0,0 +1,45 @@
+
+from physmath.cache import LRUCache, lru_cache
+
+def test_eviction():
+    c = LRUCache('test.eviction', maxsize=2)
+    c.put('a', 1)
+    c.put('b', 2)
+    assert c.get('a') == 1
+    c.put('c', 3)
+    assert 'b' not in c
+    assert c.get('a') == 1
+    assert c.get('c') == 3
+    assert c.get('b') is None
+    stats = c.stats()
+    assert (stats['hits'], stats['misses'], stats['evictions'], stats['size']) == (3, 1, 1, 2)
+
+def test_resize_and_clear():
+    c = LRUCache('test.resize', maxsize=4)
+    for i in range(4):
+        c.put(i, i)
+    c.resize(1)
+    assert len(c) == 1 and 3 in c
+    assert c.evictions == 3
+    c.clear()
+    assert len(c) == 0 and c.evictions == 0
+
+def test_decorator():
+    calls = []
+    @lru_cache('test.decorator', maxsize=8)
+    def square(x):
+        calls.append(x)
+        return x*x
+    assert square(3) == 9
+    assert square(3) == 9
+    assert calls == [3]
+    assert square.cache.hits == 1
+    @lru_cache('test.decorator_unhashable', maxsize=8)
+    def total(xs):
+        calls.append(xs)
+        return sum(xs)
+    # unhashable arguments are computed without being cached
+    assert total([1, 2]) == 3
+    assert total([1, 2]) == 3
+    assert calls == [3, [1, 2], [1, 2]]
+    assert len(total.cache) == 0
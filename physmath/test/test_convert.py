@@ -0,0 +1,97 @@
+
+from physmath.convert import ConvertionGraph, ConvertionNode, ConvertionArc
+
+def link(a, b, weight):
+    a.convertion_arcs.append(ConvertionArc(b, 1, False, weight))
+    b.convertion_arcs.append(ConvertionArc(a, 1, True, weight))
+
+def test_find_best_arcs():
+    a, b, c, d, e = [ConvertionNode(None) for i in range(5)]
+    link(a, b, 10)
+    link(b, d, 10)
+    link(a, c, 100)
+    link(c, d, 100)
+    arcs = ConvertionGraph.find_best_arcs(a, d)
+    assert [arc.node for arc in arcs] == [c, d]
+    assert ConvertionGraph.find_best_arcs(a, a) == ()
+    assert ConvertionGraph.find_best_arcs(a, e) is None
+
+def test_long_chain():
+    nodes = [ConvertionNode(None) for i in range(5000)]
+    for x, y in zip(nodes, nodes[1:]):
+        link(x, y, 10)
+    assert len(ConvertionGraph.find_best_arcs(nodes[0], nodes[-1])) == 4999
+
+def test_convertion_plan_cache():
+    from physmath.convert import convert, convertion_plan
+    from physmath.physnum import parse_physical_number
+    from physmath.units import parse_unit
+    ft, m = parse_unit('ft'), parse_unit('m')
+    plan = convertion_plan(ft, m)
+    assert convertion_plan(ft, m) is plan
+    # one rounding of 2.50 * 160934.4, rather than one per factor
+    assert str(convert(parse_physical_number('2.50s mi'), parse_unit('cm')).quantity) == '4.02e5'
+    assert str(convert(parse_physical_number('0.00s C'), parse_unit('F')).quantity) == '32.00'
+    ConvertionGraph().register(parse_unit('yd'), parse_unit('ft'), 3)
+    assert convertion_plan(ft, m) is not plan
+
+def test_convert_many():
+    from physmath.convert import convert, convert_many
+    from physmath.physnum import parse_physical_number
+    from physmath.units import parse_unit
+    nums = map(parse_physical_number, ['2.50s mi', '3.0s ft', '0.0s mi', '12s cm', '1.000s mi'])
+    cm = parse_unit('cm')
+    for converted, num in zip(convert_many(nums, cm), nums):
+        expected = convert(num, cm)
+        assert str(converted) == str(expected), (converted, expected)
+        assert converted.unit == cm
+
+def test_lean_converter():
+    from physmath.convert import convert_uncached
+    from physmath.annotator import annotator
+    from physmath.physnum import parse_physical_number
+    from physmath.units import parse_unit
+    for src, dst in [('2.50s mi', 'cm'), ('3.2 L', 'gal'), ('1.000s L', 'in3'),
+                     ('0.00s C', 'F'), ('12 kg', 'lb')]:
+        num, unit = parse_physical_number(src), parse_unit(dst)
+        lean = convert_uncached(num, unit)
+        label = annotator.push()
+        try:
+            annotated = convert_uncached(num, unit)
+        finally:
+            eqs = annotator.pop(label)
+        assert eqs
+        assert repr(lean) == repr(annotated), (lean, annotated)
+
+def test_exact_convertion():
+    from decimal import Decimal
+    from fractions import Fraction
+    from physmath.convert import convert, convert_uncached, convertion_plan
+    from physmath.physnum import PhysNum, PhysNumArray
+    from physmath.ratio import Ratio
+    from physmath.units import parse_unit
+    def rounded(f):
+        return Decimal(f.numerator) / Decimal(f.denominator)
+    gal, ft3 = parse_unit('gal'), parse_unit('ft3')
+    gal_ft3 = convertion_plan(gal, ft3).scale.as_fraction()
+    assert convertion_plan(ft3, gal).scale.as_fraction() == 1 / gal_ft3
+    cases = [('F', 'C', Fraction(5, 9), Fraction(-160, 9)),
+             ('C', 'F', Fraction(9, 5), Fraction(32)),
+             ('K', 'F', Fraction(9, 5), Fraction(-45967, 100)),
+             ('gal', 'ft3', gal_ft3, 0),
+             ('ft3', 'gal', 1 / gal_ft3, 0),
+             ('s', 'hour', Fraction(1, 3600), 0)]
+    for src, dst, scale, offset in cases:
+        src, dst = parse_unit(src), parse_unit(dst)
+        for q in [250, 5, -3, Decimal(250), Decimal('1.7e2'), Decimal('5.0'), Decimal('0.001')]:
+            expected = rounded(Fraction(q) * scale + offset)
+            for converted in [convert(PhysNum(q, src), dst).quantity,
+                              convert_uncached(PhysNum(q, src), dst).quantity,
+                              convert(PhysNumArray([q], src), dst).quantities[0]]:
+                assert converted == expected, (src, dst, q, converted, expected)
+        assert convert(PhysNum(Ratio(3), src), dst).quantity == \
+               Ratio.from_fraction(Fraction(3) * scale + offset)
+    C, F = parse_unit('C'), parse_unit('F')
+    assert str(convert(PhysNum(5, C), F).quantity) == '41'
+    assert str(convert(PhysNum(Decimal('5.0'), C), F).quantity) == '41.0'
+    assert str(convert(PhysNum(Decimal(250), F), C).quantity) == '121.1111111111111111111111111'
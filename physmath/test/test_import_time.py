@@ -0,0 +1,43 @@
+'''Regression checks on the cost of importing physmath, each measured
+   in a fresh interpreter (with registry snapshots disabled).
+   Wall-clock budgets depend on the machine, so they are only checked when
+   PHYSMATH_IMPORT_BUDGET_SCALE is set (to 1, or more on slow machines).
+'''
+
+import os
+import sys
+import subprocess
+
+from nose.plugins.skip import SkipTest
+
+budgets = {
+    'physmath.sigfig': 0.25,
+    'physmath.units': 1.0,
+    }
+
+def run_fresh(code):
+    env = dict(os.environ)
+    env['PHYSMATH_SNAPSHOT_DIR'] = ''
+    env['PYTHONPATH'] = os.pathsep.join(filter(None, sys.path))
+    return subprocess.check_output([sys.executable, '-c', code], env=env)
+
+def check_import_budget(module, budget):
+    scale = os.environ.get('PHYSMATH_IMPORT_BUDGET_SCALE')
+    if not scale:
+        raise SkipTest('set PHYSMATH_IMPORT_BUDGET_SCALE to check import budgets')
+    budget *= float(scale)
+    seconds = min(float(run_fresh('import time; t = time.time(); import %s; '
+                                  'print time.time() - t' % (module,)))
+                  for i in xrange(3))
+    assert seconds < budget, ('importing %s took %.3fs; budget is %.3fs' %
+                              (module, seconds, budget))
+
+def test_import_budgets():
+    for module, budget in sorted(budgets.iteritems()):
+        yield check_import_budget, module, budget
+
+def test_lazy_attributes():
+    loaded = run_fresh('import sys, physmath; physmath.SigFig; '
+                       'print " ".join(sorted(name for name in sys.modules '
+                       'if name.startswith("physmath.") and sys.modules[name]))')
+    assert loaded.split() == ['physmath.sigfig'], loaded
@@ -0,0 +1,36 @@
+
+import json
+from StringIO import StringIO
+
+from physmath import layout
+from physmath.annotator import annotator
+from physmath.convert import convert
+from physmath.physnum import parse_physical_number
+from physmath.units import parse_unit
+
+def check_dump(ml):
+    fp = StringIO()
+    layout.dump_ml_json(ml, fp)
+    assert fp.getvalue() == json.dumps(layout.get_ml_json(ml))
+
+def test_dump_ml_json():
+    with annotator.annotation() as eqs:
+        for num, unit in [('2.50s mi', 'cm'), ('1.03e5s yd3', 'gal'), ('34.5s C', 'F')]:
+            convert(parse_physical_number(num), parse_unit(unit))
+    es = layout.equation_set(u'Convertions', eqs)
+    yields = layout.yield_table(u'Yields', [layout.yield_(u'water', layout.as_ml(parse_physical_number('2.0s').quantity),
+                                                          parse_unit('mol'))])
+    for ml in [es, layout.calculations([es, es, yields]), parse_unit('km/s^2'),
+               layout.V(parse_physical_number('1.0s').quantity, parse_unit('m'), u'water')]:
+        yield check_dump, ml
+
+def test_unit_json_cache():
+    from physmath.units import metric
+    newton = parse_unit('N')
+    assert layout.get_ml_json(newton) != layout.get_ml_json(metric.kg * metric.m / metric.s ** 2)
+    assert layout.get_ml_json(metric.kg * metric.m / metric.s ** 2) is \
+           layout.get_ml_json(metric.kg * metric.m / metric.s ** 2)
+    hits = layout.unit_json_cache.stats()['hits']
+    layout.get_ml_json(metric.m / metric.s)
+    layout.get_ml_json(metric.m / metric.s)
+    assert layout.unit_json_cache.stats()['hits'] > hits
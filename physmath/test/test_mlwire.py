@@ -0,0 +1,37 @@
+
+import json
+
+from nose.tools import assert_raises
+
+from physmath import layout, mlwire
+from physmath.annotator import annotator
+from physmath.convert import convert
+from physmath.physnum import parse_physical_number
+from physmath.units import parse_unit
+
+def equation_set():
+    with annotator.annotation() as eqs:
+        for num, unit in [('2.50s mi', 'cm'), ('1.03e5s yd3', 'gal'), ('34.5s C', 'F')] * 2:
+            convert(parse_physical_number(num), parse_unit(unit))
+    return layout.equation_set(u'Convertions \u03bc', eqs)
+
+def test_round_trip():
+    es = equation_set()
+    data = mlwire.encode_ml(es)
+    text = json.dumps(layout.get_ml_json(es))
+    assert mlwire.decode_ml(data) == json.loads(text)
+    assert len(data) < len(text) / 4
+    for value in [None, True, -3, 2**70, 1.5, [u'a', 'a', {'b': []}]]:
+        assert mlwire.decode_ml(mlwire.encode_json(value)) == value
+
+def test_interned_units():
+    cm = layout.get_ml_json(parse_unit('cm'))
+    equal_copy = json.loads(json.dumps(cm))
+    decoded = mlwire.decode_ml(mlwire.encode_json([cm, cm, equal_copy]))
+    assert decoded == [cm] * 3
+    assert decoded[0] is decoded[1] is decoded[2]
+
+def test_bad_data():
+    data = mlwire.encode_ml(equation_set())
+    for bad in ['JSON' + data[4:], data[:-1], data + '\0']:
+        assert_raises(mlwire.WireFormatError, mlwire.decode_ml, bad)
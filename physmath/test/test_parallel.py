@@ -0,0 +1,46 @@
+
+from decimal import Decimal
+
+from physmath.dne import dne
+from physmath.sigfig import SigFig
+from physmath.convert import convert_many
+from physmath.parallel import map_convert, pack_quantity, unpack_quantity
+from physmath.physnum import PhysNum, parse_physical_number
+from physmath.units import parse_unit, unit_key, unit_from_key
+
+def test_unit_keys():
+    for text in ['m', 'km/s^2', 'kg*m/s^2', 'N', 'mmol/L']:
+        unit = parse_unit(text)
+        copy = unit_from_key(unit_key(unit))
+        assert copy == unit and str(copy) == str(unit)
+        assert unit_from_key(unit_key(unit.cannonicalized())) is unit.cannonicalized()
+
+def test_pack_quantity():
+    for q in [3, 2**70, 1.5, Decimal('-1.250'), SigFig('1.20e-3'), dne]:
+        copy = unpack_quantity(pack_quantity(q))
+        assert type(copy) is type(q) and repr(copy) == repr(q)
+
+def test_map_convert():
+    nums = map(parse_physical_number, ['2.50s mi', '3.0s ft', '0.0s mi', '12s cm']) * 5
+    nums.append(PhysNum(Decimal('1.5'), parse_unit('in'), 'rope'))
+    cm = parse_unit('cm')
+    expected = convert_many(nums, cm)
+    results = map_convert(nums, cm, processes=2, chunksize=3)
+    assert map(repr, results) == map(repr, expected)
+    assert map_convert([], cm, processes=2) == []
+
+def test_map_convert_error():
+    nums = [parse_physical_number('3 s'), parse_physical_number('2 m')]
+    cm = parse_unit('cm')
+    try:
+        convert_many(nums, cm)
+    except Exception, e:
+        expected = type(e)
+    else:
+        assert False, 'expected an error converting s to cm'
+    try:
+        map_convert(nums, cm, processes=1)
+    except expected:
+        pass
+    else:
+        assert False, 'expected %s' % (expected.__name__,)
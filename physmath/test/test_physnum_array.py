@@ -0,0 +1,64 @@
+
+from decimal import Decimal
+
+from nose.plugins.skip import SkipTest
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+from physmath.physnum import PhysNum, PhysNumArray, parse_physical_number, parse_physical_numbers
+from physmath.units import parse_unit
+from physmath.dne import dne
+
+def setup():
+    if numpy is None:
+        raise SkipTest('numpy is not available')
+
+def test_arithmetic_matches_scalar():
+    m, s = parse_unit('m'), parse_unit('s')
+    a = PhysNumArray(numpy.array([Decimal('1.5'), Decimal('4')], dtype=object), m)
+    b = PhysNumArray([3, 2], s)
+    for op in [lambda x, y: x * y, lambda x, y: x / y]:
+        result = op(a, b)
+        for i in range(2):
+            expected = op(a[i], b[i])
+            assert result[i].quantity == expected.quantity
+            assert result[i].unit == expected.unit
+    total = a + parse_physical_number('1 m')
+    assert total.unit == m
+    assert list(total.quantities) == [Decimal('2.5'), Decimal('5')]
+
+def test_division_by_zero():
+    a = PhysNumArray([1.0, 2.0], parse_unit('m'))
+    b = PhysNumArray([0, 4], parse_unit('s'))
+    result = a / b
+    assert result[0].quantity is dne
+    assert result[1].quantity == Decimal('0.5')
+
+def test_convert():
+    from physmath.convert import convert
+    a = PhysNumArray([0, 100], parse_unit('C'))
+    f = convert(a, parse_unit('F'))
+    assert f.unit == parse_unit('F')
+    assert list(f.quantities) == [Decimal(32), Decimal(212)]
+    km = PhysNumArray([1.5, 2.0], parse_unit('km'))
+    assert list(convert(km, parse_unit('m')).quantities) == [1500.0, 2000.0]
+    from physmath.sigfig import SigFig
+    temperatures = PhysNumArray(map(SigFig, ['98.6', '0.00', '-40.', '0.0', '0.00']), parse_unit('C'))
+    for pn, expected in zip(convert(temperatures, parse_unit('F')), temperatures):
+        assert str(pn) == str(convert(expected, parse_unit('F')))
+
+def test_parse_physical_numbers():
+    lines = ['1.03e5s yd3 deadly gas\n', '\n', '2.50s yd3\n', '7s L water\n']
+    columns = parse_physical_numbers(lines)
+    assert len(columns) == 3
+    assert columns.names == ['deadly gas', '', 'water']
+    for pn, line in zip(columns, filter(str.strip, lines)):
+        expected = parse_physical_number(line)
+        assert str(pn) == str(expected)
+        assert pn.unit is expected.unit
+    array = columns.to_array()
+    assert array.unit == parse_unit('yd3')
+    assert str(array[0].quantity) == '1.03e5'
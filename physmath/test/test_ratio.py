@@ -0,0 +1,31 @@
+
+from decimal import Decimal
+from fractions import Fraction
+
+from physmath.ratio import Ratio, as_ratio
+from physmath.sigfig import SigFig
+
+def test_lowest_terms():
+    r = Ratio(6, -4)
+    assert (r.num, r.den) == (-3, 2)
+    assert r == Ratio(-9, 6)
+    assert hash(r) == hash(Ratio(-9, 6))
+    assert Ratio(8, 4) == 2 and hash(Ratio(8, 4)) == hash(2)
+    product = Ratio(1)
+    for i in range(1, 30):
+        product = product * Ratio(i + 1, i)
+    assert (product.num, product.den) == (30, 1)
+    assert Ratio(2, 3) ** -2 == Ratio(9, 4)
+    assert Ratio(2, 3) ** 1 == Ratio(2, 3)
+    assert Ratio(1, 6) + Ratio(1, 3) == Ratio(1, 2)
+    assert Ratio(1, 2) / 3 == Ratio(1, 6)
+
+def test_conversions():
+    assert as_ratio(Decimal('-1.250')) == Ratio(-5, 4)
+    assert as_ratio(Decimal('2.5e3')) == 2500
+    assert as_ratio(SigFig('0.0450')) == Ratio(9, 200)
+    assert as_ratio(SigFig('4.5e-30')) == Ratio(45, 10**31)
+    assert as_ratio(Fraction(3, 9)) == Ratio(1, 3)
+    assert Ratio(1, 3).as_fraction() == Fraction(1, 3)
+    assert Ratio(-5, 4).as_decimal() == Decimal('-1.25')
+    assert str(Ratio(9, 200).as_sigfig()) == '0.045'
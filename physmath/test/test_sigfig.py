@@ -395,3 +395,18 @@ def test_binops():
         yield check_binop, l, o, r, a
 
 
+
+def test_coefficient():
+    sf = SigFig((0, (0, 1, 2, 0), -1))
+    assert (sf.coefficient, sf.ndigits) == (120, 4)
+    assert sf.digits == (0, 1, 2, 0)
+    assert sf.sigfigs == 3
+    # quotients are computed to the Decimal context precision
+    assert str(SigFig('1.00000') / SigFig('3.00000')) == '0.333333'
+
+def test_sort_key():
+    values = map(SigFig, ['-2.5', '-2.45', '-0.0', '0.001', '1', '1.0', '1.05', '10', '-1e3'])
+    ordered = sorted(values, key=SigFig.sort_key)
+    decimals = [sf.as_decimal() for sf in ordered]
+    assert decimals == sorted(decimals)
+    assert SigFig('1.0').sort_key() == SigFig('1.00').sort_key()
@@ -0,0 +1,85 @@
+import operator
+from decimal import Decimal
+
+from nose.plugins.skip import SkipTest
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+else:
+    from physmath.sigfigarray import SigFigArray
+
+from physmath.sigfig import SigFig
+from physmath.physnum import PhysNum, PhysNumArray
+from physmath.units import parse_unit
+
+def setup():
+    if numpy is None:
+        raise SkipTest('numpy is not available')
+
+values = map(SigFig, ['1.25', '1.35', '-9.96', '0.0', '-0.00', '2.5e3', '1.0',
+                      '7', '0.0451', '999.5', '12345678901234', '3.000'])
+others = [SigFig('0.5'), SigFig('-1.15'), SigFig('0.0'), 3, Decimal('-2.50')]
+
+def same(a, b):
+    return (a.sign, a.digits, a.power) == (b.sign, b.digits, b.power)
+
+def check_binary(op, other, values=values):
+    array = SigFigArray(values)
+    for result, reverse in [(op(array, other), False), (op(other, array), True)]:
+        for value, element in zip(values, result):
+            expected = op(other, value) if reverse else op(value, other)
+            assert same(element, expected), (value, other, element, expected)
+
+def test_binary_operations():
+    for op in [operator.mul, operator.add, operator.sub]:
+        for other in others:
+            yield check_binary, op, other
+    nonzero = filter(None, values)
+    for other in others:
+        if other:
+            yield check_binary, operator.div, other, nonzero
+
+def test_rounding():
+    array = SigFigArray(values)
+    for n in range(1, 5):
+        for value, element in zip(values, array.round_to_sigfigs(n)):
+            assert same(element, value.round_to_sigfigs(n))
+    for n in range(-3, 4):
+        for value, element in zip(values, array.round_to_place(n)):
+            assert same(element, value.round_to_place(n))
+
+def test_comparisons():
+    array = SigFigArray(values)
+    for op in [operator.gt, operator.ge, operator.eq, operator.lt]:
+        for other in others:
+            assert list(op(array, other)) == [op(value, other) for value in values]
+
+def test_physnum_array():
+    m = parse_unit('m')
+    a = PhysNumArray([SigFig('1.25'), SigFig('3.0')], m)
+    b = PhysNum(SigFig('2.0'), m)
+    for result, expected in zip(a * b, [a[0] * b, a[1] * b]):
+        assert same(result.quantity, expected.quantity)
+        assert result.unit == expected.unit
+    assert (a / PhysNum(SigFig('0'))).dne_mask.all()
+
+def test_overflow():
+    from physmath.dne import dne
+    wide = [SigFig('8.0817834e15'), SigFig('8.543e-7'), SigFig('1.2345678901234567890123')]
+    array = SigFigArray(wide + [SigFig('1.25')])
+    for value, element in zip(wide + [SigFig('1.25')], array.round_to_place(-3)):
+        assert same(element, value.round_to_place(-3)), (value, element)
+    for op in [operator.mul, operator.add, operator.sub]:
+        for other in [123456789, SigFig('2.0')]:
+            for value, element in zip(array, op(array, other)):
+                assert same(element, op(value, other)), (value, other, element)
+    for value, element in zip(array, -array):
+        assert same(element, -value)
+    quotient = SigFig('3.0') / SigFigArray([SigFig('1.0'), SigFig('0.0')])
+    assert same(quotient[0], SigFig('3.0')) and quotient[1] is dne
+    assert list(quotient.dne_mask) == [False, True]
+    assert list(PhysNumArray(quotient).dne_mask) == [False, True]
+    quotient = SigFigArray([SigFig('1.0'), SigFig('0.0')]) / SigFigArray([SigFig('2.0'), SigFig('0.0')])
+    assert same(quotient[0], SigFig('0.50')) and quotient[1] is dne
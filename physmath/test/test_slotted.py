@@ -0,0 +1,57 @@
+
+import cPickle as pickle
+
+from physmath.sigfig import SigFig
+from physmath.ratio import Ratio
+from physmath.physnum import parse_physical_number
+from physmath.units import parse_unit, PrimitiveUnit, Prefix
+from physmath.convert import convertion_graph
+
+def round_trip(obj, protocol):
+    copy = pickle.loads(pickle.dumps(obj, protocol))
+    assert type(copy) is type(obj)
+    return copy
+
+def check_pickle(obj, protocol):
+    copy = round_trip(obj, protocol)
+    assert repr(copy) == repr(obj), (copy, obj)
+    return copy
+
+def test_pickle_values():
+    for obj in [SigFig('-1.250e3'), Ratio(3, 4), parse_physical_number('2.50s kg*m/s^2'),
+                parse_unit('km/s^2')]:
+        for protocol in range(pickle.HIGHEST_PROTOCOL + 1):
+            yield check_pickle, obj, protocol
+
+def test_pickle_interned():
+    for obj in [PrimitiveUnit.names['m'], Prefix.names['k']]:
+        for protocol in range(pickle.HIGHEST_PROTOCOL + 1):
+            assert check_pickle(obj, protocol) is obj
+
+def test_pickle_convertion_node():
+    node = convertion_graph.unit_nodes.values()[0]
+    for protocol in range(pickle.HIGHEST_PROTOCOL + 1):
+        copy = round_trip(node, protocol)
+        assert copy.unit == node.unit
+        assert len(copy.convertion_arcs) == len(node.convertion_arcs)
+
+def test_pickle_compact():
+    from physmath.dne import dne
+    for obj in [SigFig('0.00'), SigFig('-1.20e-3'), Ratio(-6),
+                parse_physical_number('2.50s km/s^2'), dne]:
+        for protocol in range(pickle.HIGHEST_PROTOCOL + 1):
+            check_pickle(obj, protocol)
+    assert round_trip(dne, 2) is dne
+    leading_zeros = SigFig((0, (0, 1, 2), -1))
+    copy = round_trip(leading_zeros, 2)
+    assert ((copy.sign, copy.coefficient, copy.ndigits, copy.power) ==
+            (0, 12, 3, -1))
+    num = parse_physical_number('2.50s kg*m/s^2')
+    assert len(pickle.dumps(num, 2)) < 250
+
+def test_pickle_cannonical_unit():
+    unit = parse_unit('kg*m/s^2').cannonicalized()
+    for protocol in range(pickle.HIGHEST_PROTOCOL + 1):
+        assert round_trip(unit, protocol) is unit
+        copy = round_trip(parse_unit('km/s^2'), protocol)
+        assert copy.cannonicalized() is parse_unit('km/s^2').cannonicalized()
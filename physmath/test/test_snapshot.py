@@ -0,0 +1,37 @@
+import os
+import sys
+import shutil
+import tempfile
+import subprocess
+
+from physmath import snapshot
+
+def test_opt_in():
+    home = tempfile.mkdtemp(prefix='physmath-test-')
+    try:
+        env = dict(os.environ)
+        env.pop('PHYSMATH_SNAPSHOT_DIR', None)
+        env.pop('XDG_CACHE_HOME', None)
+        env['HOME'] = home
+        env['PYTHONPATH'] = os.pathsep.join(filter(None, sys.path))
+        subprocess.check_call([sys.executable, '-c', 'import physmath.convert'], env=env)
+        assert os.listdir(home) == []
+        directory = os.path.join(home, 'snapshots')
+        env['PHYSMATH_SNAPSHOT_DIR'] = directory
+        subprocess.check_call([sys.executable, '-c', 'import physmath.convert'], env=env)
+        assert sorted(os.listdir(directory)) == ['convert-registry.pickle',
+                                                 'units-registry.pickle']
+    finally:
+        shutil.rmtree(home)
+
+def test_digest_dependencies():
+    get_dependency_version = snapshot.get_dependency_version
+    try:
+        snapshot.source_digest = None
+        digest = snapshot.get_source_digest()
+        snapshot.source_digest = None
+        snapshot.get_dependency_version = lambda name: 'other'
+        assert snapshot.get_source_digest() != digest
+    finally:
+        snapshot.get_dependency_version = get_dependency_version
+        snapshot.source_digest = None
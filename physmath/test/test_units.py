@@ -0,0 +1,42 @@
+
+from physmath.units import parse_unit, parse_units, UnitSyntaxError
+
+def test_parse_units():
+    column = ['m/s', 'm / s', 'kg', 'm/s', 'mmol/L'] * 3
+    units = parse_units(column)
+    assert units == [parse_unit(u) for u in column]
+    assert units[0] is units[1] is units[3]
+
+def test_parse_units_error():
+    try:
+        parse_units(['m', 'm s'])
+    except UnitSyntaxError, e:
+        assert "'m s'" in str(e)
+    else:
+        assert False, 'expected UnitSyntaxError'
+
+def test_create_keeps_caches():
+    from physmath.units import unit_name_cache, unit_expression_cache
+    ms = parse_unit('m/s')
+    assert ('m/s', False) in unit_expression_cache
+    hits = unit_name_cache.stats()['hits']
+    widget = parse_unit('widgetron/s', create=True)
+    assert parse_unit('widgetron', create=True) == widget * parse_unit('s')
+    assert ('m/s', False) in unit_expression_cache
+    assert unit_name_cache.stats()['hits'] >= hits
+    assert parse_unit('m/s') is ms
+    assert parse_unit('widgetron') == parse_unit('widgetron', create=True)
+
+def test_cannonical_units_released():
+    import gc
+    from physmath.units import CompoundUnit
+    unit = parse_unit('widgetron^3/s^7', create=True)
+    key = unit.cannonicalized().atoms_and_powers, unit.cannonicalized().prefix
+    assert key in CompoundUnit.cannonical_units
+    unit_string = str(unit)
+    del unit
+    from physmath.units import unit_expression_cache
+    unit_expression_cache.clear()
+    gc.collect()
+    assert key not in CompoundUnit.cannonical_units
+    assert parse_unit(unit_string) == parse_unit('widgetron^3/s^7')
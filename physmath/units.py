@@ -5,6 +5,7 @@ from __future__ import division
 from __future__ import absolute_import
 
 import operator
+import weakref
 from math import log10
 import re
 from functools import partial
@@ -12,7 +13,6 @@ from collections import defaultdict
 from decimal import Decimal
 
 from hlab.bases import AutoRepr
-from hlab.memorize import memorize
 
 from jamenson.runtime.collections import OrderedDict, OrderedSet, OrderedDefaultDict
 from jamenson.runtime import atypes
@@ -21,10 +21,14 @@ from jamenson.runtime.multimethod import defmethod, MultiMethod
 from jamenson.runtime.as_string import as_string
 
 from . import algebra as A
+from .cache import LRUCache, memorize_in
+from . import snapshot
 
 
 class CompoundBase(AutoRepr, A.DivAlgebraBase):
 
+    __slots__ = ['atoms_and_powers']
+
     atom_base = None
     def __init__(self, atoms_and_powers=()):
         acc = []
@@ -166,7 +170,7 @@ class CompoundBase(AutoRepr, A.DivAlgebraBase):
 
 class BaseDimensionality(AutoRepr, A.DivAlgebraBase):
 
-    pass
+    __slots__ = ()
 
 as_dimensionality = MultiMethod('as_dimensionality')
 
@@ -177,11 +181,16 @@ def meth(d):
 class PrimitiveDimensionality(BaseDimensionality, A.DivAlgebraBase):
 
     names = {}
+    ordered = []
     def __init__(self, name):
         if name is not None:
             assert name not in self.names
             self.names[name] = self
         self.name = name
+        self.index = len(self.ordered)
+        self.ordered.append(self)
+        self.exponents = (0,) * self.index + (1,)
+        self._cannonical_compound = None
 
     def repr_args(self):
         return self.name,
@@ -199,6 +208,15 @@ class PrimitiveDimensionality(BaseDimensionality, A.DivAlgebraBase):
     def cannonicalized(self):
         return self
 
+    def cannonical_compound(self):
+        op = self._cannonical_compound
+        if op is None:
+            op = self._cannonical_compound = CompoundDimensionality.from_exponents(self.exponents)
+        return op
+
+    def get_exponents(self):
+        return self.exponents
+
     def get_name(self):
         return self.name
 
@@ -211,13 +229,78 @@ def load_primitive_dimensionality(name):
 
 compound_dimensionality_names = {}
 
+def add_exponents(a, b, power=1):
+    if len(a) < len(b):
+        a = a + (0,) * (len(b) - len(a))
+    return tuple(x + (b[i] * power if i < len(b) else 0)
+                 for i,x in enumerate(a))
+
 class CompoundDimensionality(BaseDimensionality, CompoundBase):
+    '''Cannonical dimensionalities are interned by their exponent vector; i.e.
+       the power of each PrimitiveDimensionality, indexed by the order in which
+       the primitives were created.
+    '''
+
+    __slots__ = ['_cannonical_dimensionality', '_exponents', '_hash']
 
     atom_base = BaseDimensionality
     atom_primitive = PrimitiveDimensionality
 
+    def __init__(self, atoms_and_powers=()):
+        CompoundBase.__init__(self, atoms_and_powers)
+        self._cannonical_dimensionality = None
+        self._exponents = None
+        self._hash = None
+
     def __hash__(self):
-        return CompoundBase.__hash__(self)
+        return self.cannonicalized()._hash
+
+    def __eq__(self, other):
+        if isinstance(other, BaseDimensionality):
+            return self.cannonicalized() is other.cannonical_compound()
+        return NotImplemented
+
+    def __getstate__(self):
+        return dict(atoms_and_powers=self.atoms_and_powers)
+
+    def __setstate__(self, state):
+        self.__init__(state['atoms_and_powers'])
+
+    def cannonicalized(self):
+        op = self._cannonical_dimensionality
+        if op is None:
+            exponents = ()
+            for atom,power in self.atoms_and_powers:
+                exponents = add_exponents(exponents, atom.get_exponents(), power)
+            op = self._cannonical_dimensionality = self.from_exponents(exponents)
+        return op
+
+    cannonical_compound = cannonicalized
+
+    def get_exponents(self):
+        return self.cannonicalized()._exponents
+
+    cannonical_dimensionalities = {}
+    @classmethod
+    def from_exponents(cls, exponents):
+        exponents = tuple(exponents)
+        while exponents and exponents[-1] == 0:
+            exponents = exponents[:-1]
+        try:
+            return cls.cannonical_dimensionalities[exponents]
+        except KeyError:
+            pass
+        atoms_and_powers = [(PrimitiveDimensionality.ordered[i], power)
+                            for i,power in enumerate(exponents) if power != 0]
+        op = CompoundDimensionality(atoms_and_powers)
+        op._cannonical_dimensionality = op
+        op._exponents = exponents
+        if len(atoms_and_powers) == 1 and atoms_and_powers[0][1] == 1:
+            op._hash = hash(atoms_and_powers[0][0])
+        else:
+            op._hash = hash(exponents)
+        cls.cannonical_dimensionalities[exponents] = op
+        return op
 
     @staticmethod
     def arg_to_atom(arg):
@@ -252,18 +335,18 @@ def primdim_to_compound(p):
 
 @A.defboth_mm_eq([CompoundDimensionality, PrimitiveDimensionality])
 def meth(c, p):
-    return c == primdim_to_compound(p)
+    return c.cannonicalized() is p.cannonical_compound()
 
-@defmethod(A.mm_pow, [CompoundDimensionality, (int,long)])
+@A.defmethod(A.mm_pow, [CompoundDimensionality, (int,long)])
 def meth(c, p):
     return c.pow(p)
 
 
-@defmethod(A.mm_pow, [PrimitiveDimensionality, (int,long)])
+@A.defmethod(A.mm_pow, [PrimitiveDimensionality, (int,long)])
 def meth(d, p):
     return primdim_to_compound(d).pow(p)
 
-@defmethod(A.mm_mul, [CompoundDimensionality, CompoundDimensionality])
+@A.defmethod(A.mm_mul, [CompoundDimensionality, CompoundDimensionality])
 def meth(a, b):
     return a.mul(b)
 
@@ -271,23 +354,23 @@ def meth(a, b):
 def meth(c, p):
     return c.mul(primdim_to_compound(p))
 
-@defmethod(A.mm_mul, [PrimitiveDimensionality, PrimitiveDimensionality])
+@A.defmethod(A.mm_mul, [PrimitiveDimensionality, PrimitiveDimensionality])
 def meth(a, b):
     return primdim_to_compound(a).mul(primdim_to_compound(b))
 
-@defmethod(A.mm_div, [CompoundDimensionality, CompoundDimensionality])
+@A.defmethod(A.mm_div, [CompoundDimensionality, CompoundDimensionality])
 def meth(a, b):
     return a.mul(b.invert())
 
-@defmethod(A.mm_div, [CompoundDimensionality, PrimitiveDimensionality])
+@A.defmethod(A.mm_div, [CompoundDimensionality, PrimitiveDimensionality])
 def meth(c, p):
     return c.mul(primdim_to_compound(p).invert())
 
-@defmethod(A.mm_div, [PrimitiveDimensionality, CompoundDimensionality])
+@A.defmethod(A.mm_div, [PrimitiveDimensionality, CompoundDimensionality])
 def meth(p, c):
     return primdim_to_compound(p).mul(c.invert())
 
-@defmethod(A.mm_div, [PrimitiveDimensionality, PrimitiveDimensionality])
+@A.defmethod(A.mm_div, [PrimitiveDimensionality, PrimitiveDimensionality])
 def meth(a, b):
     return primdim_to_compound(a).mul(primdim_to_compound(b).invert())
 
@@ -343,6 +426,8 @@ def meth(uname):
 
 class Prefix(A.DivAlgebraBase, AutoRepr):
 
+    __slots__ = ['power', 'name', 'abbrev']
+
     names = {}
     powers = {}
 
@@ -375,6 +460,9 @@ class Prefix(A.DivAlgebraBase, AutoRepr):
     def get_abbrev(self):
         return self.abbrev
 
+    def __reduce__(self):
+        return load_prefix, (self.power,)
+
     @classmethod
     def from_power(cls, power):
         assert isinstance(power, (int,long))
@@ -387,6 +475,9 @@ class Prefix(A.DivAlgebraBase, AutoRepr):
     def get_factor(self, base=10):
         return base**self.power
 
+def load_prefix(power):
+    return Prefix.from_power(power)
+
 
 @A.defboth_mm_mul([Prefix, (int,long,float)])
 def meth(pre, factor):
@@ -395,19 +486,19 @@ def meth(pre, factor):
         raise ValueError("bad factor %r" % (factor,))
     return Prefix.from_power(pre.power + power)
 
-@defmethod(A.mm_div, [Prefix, (int,long,float)])
+@A.defmethod(A.mm_div, [Prefix, (int,long,float)])
 def meth(pre, factor):
     return pre * factor**-1
 
-@defmethod(A.mm_mul, [Prefix, Prefix])
+@A.defmethod(A.mm_mul, [Prefix, Prefix])
 def meth(a, b):
     return Prefix.from_power(a.power + b.power)
 
-@defmethod(A.mm_div, [Prefix, Prefix])
+@A.defmethod(A.mm_div, [Prefix, Prefix])
 def meth(a, b):
     return Prefix.from_power(a.power - b.power)
 
-@defmethod(A.mm_pow, [Prefix, (int, long)])
+@A.defmethod(A.mm_pow, [Prefix, (int, long)])
 def meth(pre, power):
     return Prefix.from_power(pre.power * power)
 
@@ -449,6 +540,8 @@ P = prefixes = prefixes()
 
 class BaseUnit(AutoRepr, A.DivAlgebraBase):
 
+    __slots__ = ()
+
     def get_display_name(self):
         name = self.get_name().replace('_', ' ')
         if re.match('^.*[^\d]3$', name):
@@ -467,6 +560,8 @@ def meth(bu):
 
 class PrimitiveUnit(BaseUnit):
 
+    __slots__ = ['name', 'abbrev', 'dimensionality']
+
     names = {}
 
     def __init__(self, dimensionality, name, abbrev=None):
@@ -538,6 +633,8 @@ def load_primitive_unit(name):
 
 class CompoundUnit(BaseUnit, CompoundBase):
 
+    __slots__ = ['prefix', 'cannonical', '_cannonical_unit', '_hash', '_dimensionality']
+
     atom_base = BaseUnit
     atom_primitive = PrimitiveUnit
 
@@ -548,6 +645,9 @@ class CompoundUnit(BaseUnit, CompoundBase):
         assert isinstance(prefix, Prefix)
         self.prefix = prefix
         self.cannonical = cannonical
+        self._cannonical_unit = None
+        self._hash = None
+        self._dimensionality = None
 
     def repr_args(self):
         atoms_and_powers, = CompoundBase.repr_args(self)
@@ -569,24 +669,18 @@ class CompoundUnit(BaseUnit, CompoundBase):
         return self.__class__(atoms_and_powers, self.prefix)
 
     def __hash__(self):
-        op = self.cannonicalized()
-        if (op.prefix==P.no_prefix and len(op.atoms_and_powers) == 1):
-            [[atom,power]] = op.atoms_and_powers
-            if isinstance(atom, PrimitiveUnit) and power==1:
-                return hash(atom)
-        return hash(self.prefix) ^ super(CompoundUnit, self).__hash__()
+        return self.cannonicalized()._hash
 
     def __eq__(self, other):
+        #cannonical units are interned, so equality is identity
+        if isinstance(other, CompoundUnit):
+            return self.cannonicalized() is other.cannonicalized()
         if isinstance(other, PrimitiveUnit):
-            other = primunit_to_compound(other)
-        elif not isinstance(other, CompoundUnit):
-            return NotImplemented
-        a = self.cannonicalized()
-        b = other.cannonicalized()
-        x = super(CompoundUnit, a).__eq__(b)
-        if x is NotImplemented:
-            return x
-        return x and a.prefix == b.prefix
+            return self.cannonicalized() is self.intern_cannonical(((other, 1),), P.no_prefix)
+        return NotImplemented
+
+    def __reduce__(self):
+        return load_compound_unit, (unit_key(self),)
 
     def __req__(self, other):
         return self.__eq__(other)
@@ -640,19 +734,52 @@ class CompoundUnit(BaseUnit, CompoundBase):
         return self.get_abbrev()
 
     def cannonicalized(self):
-        if self.cannonical:
-            return self
+        op = self._cannonical_unit
+        if op is None:
+            if self.cannonical:
+                op = self.intern_cannonical(self.atoms_and_powers, self.prefix)
+            else:
+                op = self.intern_cannonical(*self.flattened())
+            self._cannonical_unit = op
+        return op
+
+    def flattened(self):
         acc = defaultdict(int)
-        prefix = self.prefix
+        power_of_ten = self.prefix.power
         for unit, power in self.atoms_and_powers:
             unit = unit.cannonicalized()
             if isinstance(unit, CompoundUnit):
-                prefix = prefix * unit.prefix ** power
+                power_of_ten += unit.prefix.power * power
                 for sub_unit, sub_power in unit.atoms_and_powers:
                     acc[sub_unit] += sub_power * power
             else:
                 acc[unit] += power
-        return CompoundUnit(sorted(acc.iteritems()), prefix, True)
+        atoms_and_powers = tuple((unit, power) for unit,power in
+                                 sorted(acc.iteritems(), key=lambda (unit,power): id(unit))
+                                 if power != 0)
+        return atoms_and_powers, Prefix.from_power(power_of_ten)
+
+    # Each distinct cannonical unit exists exactly once, keyed by its
+    # atoms, powers and prefix. Interned units know their own hash. Every
+    # unit holds its cannonical unit, so an interned unit is only dropped
+    # once no equal unit remains.
+    cannonical_units = weakref.WeakValueDictionary()
+    @classmethod
+    def intern_cannonical(cls, atoms_and_powers, prefix):
+        key = atoms_and_powers, prefix
+        try:
+            return cls.cannonical_units[key]
+        except KeyError:
+            pass
+        unit = CompoundUnit(atoms_and_powers, prefix, cannonical=True)
+        unit._cannonical_unit = unit
+        if (prefix is P.no_prefix and len(atoms_and_powers) == 1 and
+            atoms_and_powers[0][1] == 1):
+            unit._hash = hash(atoms_and_powers[0][0])
+        else:
+            unit._hash = hash(prefix) ^ hash(atoms_and_powers)
+        cls.cannonical_units[key] = unit
+        return unit
 
     def ordered(self):
         acc = OrderedDefaultDict(int)
@@ -663,10 +790,14 @@ class CompoundUnit(BaseUnit, CompoundBase):
         return CompoundUnit(sorted(acc.iteritems()), self.prefix)
 
     def get_dimensionality(self):
-        acc = D.dimensionless
-        for unit,power in self.atoms_and_powers:
-            acc *= unit.get_dimensionality() ** power
-        return acc
+        op = self.cannonicalized()
+        dimensionality = op._dimensionality
+        if dimensionality is None:
+            exponents = ()
+            for unit,power in op.atoms_and_powers:
+                exponents = add_exponents(exponents, unit.get_dimensionality().get_exponents(), power)
+            dimensionality = op._dimensionality = CompoundDimensionality.from_exponents(exponents)
+        return dimensionality
 
     def split_posneg(self):
         pos,neg = self.collect_posneg()
@@ -683,25 +814,25 @@ def meth(none):
 def meth(c, factor):
     return CompoundUnit(c.atoms_and_powers, c.prefix*factor)
 
-@defmethod(A.mm_div, [CompoundUnit, (int,long,float)])
+@A.defmethod(A.mm_div, [CompoundUnit, (int,long,float)])
 def meth(c, factor):
     return CompoundUnit(c.atoms_and_powers, c.prefix/factor)
 
-@defmethod(A.mm_mul, [(CompoundUnit,PrimitiveUnit), (CompoundUnit,PrimitiveUnit)])
+@A.defmethod(A.mm_mul, [(CompoundUnit,PrimitiveUnit), (CompoundUnit,PrimitiveUnit)])
 def meth(a, b):
     return CompoundUnit([[a,1], [b,1]])
 
-@defmethod(A.mm_div, [(CompoundUnit,PrimitiveUnit), (CompoundUnit,PrimitiveUnit)])
+@A.defmethod(A.mm_div, [(CompoundUnit,PrimitiveUnit), (CompoundUnit,PrimitiveUnit)])
 def meth(a, b):
     return CompoundUnit([[a,1], [b,-1]])
 
-@defmethod(A.mm_pow, [BaseUnit, (int,long)])
+@A.defmethod(A.mm_pow, [BaseUnit, (int,long)])
 def meth(c, p):
     #return c.pow(p)
     return CompoundUnit([(c, p)])
     #return CompoundUnit([(c, 1 if p>0 else -1)]*abs(p))
 
-@defmethod(A.mm_pow, [CompoundUnit, Decimal])
+@A.defmethod(A.mm_pow, [CompoundUnit, Decimal])
 def meth(c, p):
     if c != CompoundUnit([]):
         raise ValueError("can't raise %s to non-integer powers" % (c,))
@@ -714,7 +845,7 @@ def primunit_to_compound(p):
 def meth(p, factor):
     return primunit_to_compound(p) * factor
 
-@defmethod(A.mm_div, [PrimitiveUnit, (int, long, float)])
+@A.defmethod(A.mm_div, [PrimitiveUnit, (int, long, float)])
 def meth(p, factor):
     return primunit_to_compound(p) / factor
 
@@ -722,6 +853,36 @@ def meth(p, factor):
 #def meth(p, power):
 #    return primunit_to_compound(p) ** power
 
+
+# Compact keys for units that are valid across processes, for sending units
+# to worker processes.  A primitive unit is keyed by its name and a compound
+# unit by its prefix power, the keys of its atoms and whether it is
+# cannonical, so that a unit keeps the form in which it is written.
+
+def unit_key(unit):
+    if isinstance(unit, PrimitiveUnit):
+        return unit.name
+    assert isinstance(unit, CompoundUnit), 'bad unit %r' % (unit,)
+    return (unit.prefix.power,
+            tuple((unit_key(atom), power) for atom,power in unit.atoms_and_powers),
+            unit.cannonical)
+
+unit_key_cache = LRUCache('units.unit_from_key', maxsize=4096)
+
+@memorize_in(unit_key_cache)
+def unit_from_key(key):
+    if isinstance(key, str):
+        return PrimitiveUnit.names[key]
+    power, atoms_and_powers, cannonical = key
+    unit = CompoundUnit([(unit_from_key(atom), p) for atom,p in atoms_and_powers],
+                        Prefix.from_power(power))
+    # the atoms of cannonical units are ordered by id, which differs
+    # between processes, so they are interned afresh
+    return unit.cannonicalized() if cannonical else unit
+
+def load_compound_unit(key):
+    return unit_from_key(key)
+
 class UnitCollection(object):
     pass
 
@@ -734,6 +895,104 @@ def collect_units(ns):
 
 unit_namespaces = {}
 
+class UnitNameIndex(object):
+    '''Hash tables for resolving unit names, built from the registry on first
+       use after any namespace is registered.  Units outside of namespaces,
+       such as those created by parsing with create=True, are found through
+       PrimitiveUnit.names instead, so creating one leaves the index and the
+       caches of resolved names and expressions valid.
+
+       Names are resolved by, in order of precedence,
+         1. exact match in the namespaces, by namespace precedence
+         2. stripping a plural 's'
+         3. lowercasing
+         4. stripping a prefix name or abbreviation
+       with the latter three resolving the remainder by the same rules.
+    '''
+
+    def __init__(self):
+        self.names = None
+
+    def invalidate(self):
+        self.names = None
+        unit_name_cache.clear()
+        unit_expression_cache.clear()
+
+    def build(self):
+        names = {}
+        for namespace in sorted(unit_namespaces.itervalues(),
+                                key=lambda ns: ns._precedence):
+            for name,unit in namespace._units.iteritems():
+                if isinstance(unit, BaseUnit):
+                    names.setdefault(name, unit)
+        self.namespace_names = dict((ns_name, dict((name,unit) for name,unit in ns._units.iteritems()
+                                                   if isinstance(unit, BaseUnit)))
+                                    for ns_name,ns in unit_namespaces.iteritems())
+        self.prefixes_by_initial = defaultdict(list)
+        for prefix in vars(prefixes).itervalues():
+            if not isinstance(prefix, Prefix):
+                continue
+            for pre in [prefix.name, prefix.abbrev]:
+                if pre:
+                    self.prefixes_by_initial[pre[0]].append((pre, prefix))
+        self.names = names
+
+    def resolve(self, name, ns_name=None):
+        if self.names is None:
+            self.build()
+        if ns_name is None and '.' in name:
+            ns_name,name = name.split('.',1)
+        if ns_name:
+            try:
+                names = self.namespace_names[ns_name]
+            except KeyError:
+                return None
+        else:
+            names = self.names
+        return self.derive(name, names, {})
+
+    def derive(self, name, names, derived):
+        name = name.strip()
+        try:
+            return derived[name]
+        except KeyError:
+            pass
+        unit = names.get(name)
+        if unit is None and len(name) > 1:
+            if name.endswith('s'):
+                unit = self.derive(name[:-1:], names, derived)
+            if unit is None and name != name.lower():
+                unit = self.derive(name.lower(), names, derived)
+            if unit is None:
+                for pre,prefix in self.prefixes_by_initial.get(name[0], ()):
+                    if name.startswith(pre):
+                        unit = self.derive(name[len(pre):], names, derived)
+                        if unit is not None:
+                            unit = unit * 10 ** prefix.power
+                            break
+        derived[name] = unit
+        return unit
+
+unit_name_index = UnitNameIndex()
+unit_name_cache = LRUCache('units.get_unit_by_name', maxsize=4096)
+unit_expression_cache = LRUCache('units.parse_unit', maxsize=4096)
+
+
+# tables of (unit name, attribute) for each namespace, loaded from the
+# snapshot if available (saved once all namespaces are defined)
+namespace_tables = snapshot.load('units')
+save_namespace_tables = namespace_tables is None
+if save_namespace_tables:
+    namespace_tables = {}
+
+def build_namespace_table(dct):
+    units = list((n,v) for n,v in dct.iteritems()
+                 if isinstance(v, BaseUnit) and not n.startswith('_'))
+    table = [(n.rstrip('_'),n) for n,u in units]
+    table.extend((u.get_name(),n) for n,u in units)
+    table.extend((u.get_abbrev(),n) for n,u in units)
+    return table
+
 class unit_namespace(object):
     _abbrev = None
     _precedence = 10
@@ -745,15 +1004,16 @@ class unit_namespace(object):
             if ns._abbrev:
                 assert ns._abbrev not in unit_namespaces
                 unit_namespaces[ns._abbrev] = ns
-            units = list((n.rstrip('_'),v) for n,v in dct.iteritems()
-                         if isinstance(v, BaseUnit) and not n.startswith('_'))
-            ns._units = dict((n,u) for n,u in units)
-            ns._units.update((u.get_name(),u) for n,u in units)
-            ns._units.update((u.get_abbrev(),u) for n,u in units)
+            try:
+                table = namespace_tables[name]
+            except KeyError:
+                table = namespace_tables[name] = build_namespace_table(dct)
+            ns._units = dict((n,dct[attr]) for n,attr in table)
+            unit_name_index.invalidate()
             return ns
 
 
-@memorize
+@memorize_in(unit_name_cache)
 def get_unit_by_name(name, ns_name=None):
     return find_unit_by_name(name.strip(), ns_name and ns_name.strip())
 
@@ -762,45 +1022,7 @@ def meth(name):
     return get_unit_by_name(name)
 
 def find_unit_by_name(name, ns_name=None):
-    if ns_name is None and '.' in name:
-        ns_name,name = name.split('.',1)
-    if ns_name:
-        try:
-            namespace = unit_namespaces[ns_name]
-        except KeyError:
-            return None
-        unit = namespace._units.get(name, None)
-        if not isinstance(unit, BaseUnit):
-            unit = None
-    else:
-        for namespace in sorted(unit_namespaces.itervalues(),
-                                key=lambda ns: ns._precedence):
-            unit = namespace._units.get(name, None)
-            if isinstance(unit, BaseUnit):
-                break
-    if unit is not None:
-        return unit
-    if len(name) == 1:
-        return None
-    if unit is None:
-        if name.endswith('s'):
-            unit = get_unit_by_name(name[:-1:], ns_name)
-        if unit is None and name != name.lower():
-            unit = get_unit_by_name(name.lower(), ns_name)
-    if unit is None:
-        for prefix in vars(prefixes).itervalues():
-            if not isinstance(prefix, Prefix):
-                continue
-            for pre in [prefix.name, prefix.abbrev]:
-                if pre and name.startswith(pre):
-                    unit = get_unit_by_name(name[len(pre):], ns_name)
-                    if unit is not None:
-                        unit = unit * 10 ** prefix.power
-                if unit is not None:
-                    break
-            if unit is not None:
-                break
-    return unit
+    return unit_name_index.resolve(name, ns_name)
 
 unit_scanner = re.Scanner([
     (r'\s+',  lambda s, b: ('space',b)),
@@ -829,6 +1051,9 @@ class UnitStringParser(object):
 
     def parse(self):
         tokens, extra = unit_scanner.scan(self.bytes)
+        return self.evaluate(tokens, extra)
+
+    def evaluate(self, tokens, extra=''):
         l_extra = ''
         itr_tokens = iter(tokens)
         for tp,value in itr_tokens:
@@ -906,14 +1131,54 @@ class UnitStringParser(object):
             raise RuntimeError('unandled operator %s' % (op,))
         self.output_queue.append(v)
 
-def ex_parse_unit(bytes, **kwds):
-    return UnitStringParser(bytes, **kwds).parse()
+def ex_parse_unit(bytes, create=False):
+    key = bytes, create
+    result = unit_expression_cache.get(key)
+    if result is None:
+        result = UnitStringParser(bytes, create=create).parse()
+        unit_expression_cache.put(key, result)
+    return result
+
+def parse_unit(bytes, create=False):
+    unit,extra = ex_parse_unit(bytes, create=create)
+    if extra:
+        UnitStringParser(bytes).syntax_error('extra input %r', extra)
+    return unit
 
-def parse_unit(bytes, **kwds):
-    parser = UnitStringParser(bytes, **kwds)
-    unit,extra = parser.parse()
+def parse_units(iterable, create=False):
+    '''Parse a sequence of unit strings, such as a column of a table, into
+       a list of units. Each distinct string is tokenized once, and each
+       distinct sequence of tokens (ignoring whitespace) is evaluated once.
+    '''
+    by_bytes = {}
+    by_tokens = {}
+    units = []
+    for bytes in iterable:
+        try:
+            unit = by_bytes[bytes]
+        except KeyError:
+            unit = by_bytes[bytes] = parse_distinct_unit(bytes, create, by_tokens)
+        units.append(unit)
+    return units
+
+def parse_distinct_unit(bytes, create, by_tokens):
+    result = unit_expression_cache.get((bytes, create))
+    if result is None:
+        tokens, extra = unit_scanner.scan(bytes)
+        key = tuple(token for token in tokens if token[0] != 'space')
+        if extra or not key:
+            return parse_unit(bytes, create=create)
+        try:
+            result = by_tokens[key]
+        except KeyError:
+            result = by_tokens[key] = UnitStringParser(bytes, create=create).evaluate(key)
+        if result[1]:
+            # report the error against this string
+            return parse_unit(bytes, create=create)
+        unit_expression_cache.put((bytes, create), result)
+    unit,extra = result
     if extra:
-        parser.syntax_error('extra input %r', extra)
+        return parse_unit(bytes, create=create)
     return unit
 
 
@@ -1094,6 +1359,9 @@ del name
 #print (metric.km * metric.kg / metric.s).get_dimensionality()
 #print metric.N, metric.kN, metric.N.get_name(), metric.kN.get_name()
 
+if save_namespace_tables:
+    snapshot.save('units', namespace_tables)
+
 dimensionless = CompoundUnit()
 
 
@@ -1106,7 +1374,8 @@ class UnitDimensionalityType(atypes.TypeBase):
     '''
     __slots__ = ['dimensionalities']
     def __init__(self, *dimensionalities):
-        self.dimensionalities = OrderedSet(map(as_dimensionality, dimensionalities))
+        self.dimensionalities = OrderedSet(as_dimensionality(d).cannonical_compound()
+                                           for d in dimensionalities)
 
 class UnitWithoutPrefixType(atypes.TypeBase):
     '''Matches units without their prefixes
@@ -1171,7 +1440,8 @@ def meth(uw):
 # typep
 @defmethod(typep, [object, UnitDimensionalityType])
 def meth(op, ud):
-    return isinstance(op, BaseUnit) and op.get_dimensionality() in ud.dimensionalities
+    return (isinstance(op, BaseUnit) and
+            op.get_dimensionality().cannonical_compound() in ud.dimensionalities)
 @defmethod(typep, [object, UnitWithoutPrefixType])
 def meth(op, uw):
     return isinstance(op, BaseUnit) and op.without_prefix() in uw.units
@@ -1196,7 +1466,7 @@ def meth(op):
 def unit_dimensionality_keyer_func(op):
     if not isinstance(op, BaseUnit):
         return None
-    return op.get_dimensionality()
+    return op.get_dimensionality().cannonical_compound()
 @defmethod(atypes.keyer_getfunc, [UnitDimensionalityKeyer])
 def meth(op):
     return unit_dimensionality_keyer_func